@@ -0,0 +1,336 @@
+'''
+Python build engine: builds the same '.elf', '.hex' and '.bin' files as CubeMX Makefile, directly from 'buildData.json'
+(without 'make', 'vpath' search and Makefile dependency of all objects):
+    python ideScripts/build.py [-j N]
+
+Object file is compiled again only if:
+    - object file does not exist,
+    - its command line (flags, defines, includes) changed since the last build (command hashes are stored in
+      'buildState.json' in build folder),
+    - source file or any header listed in its '.d' file is newer (or missing). Dependency files are read through
+      dependency database, so only changed '.d' files are parsed (see 'dependencyDatabase.py'). If command does not
+      write '.d' file (user flags without '-MMD'), only source file is checked.
+Executable is linked (and '.hex', '.bin' created) only if its command line changed or any object file (or linker
+script) is newer.
+Objects are compiled in parallel (default: number of CPUs, 'Build project (Python)' task selects it with
+'buildLauncher.py') and compiler messages are printed unchanged (once each file is compiled), so the task problem
+matcher handles them as with 'make'. Compile peak memory of each object is stored in 'buildState.json', so
+'buildLauncher.py' can limit number of jobs by available memory.
+If compiler cache is enabled ('user_compilerCache' in 'c_cpp_properties.json'), files are compiled through
+'compilerCache.py'.
+'''
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+import concurrent.futures
+
+import utilities as utils
+import updateBuildData as build
+import updateNinja as ninja
+import dependencyDatabase as deps
+
+__version__ = utils.__version__
+
+buildStateFileName = 'buildState.json'
+
+
+class Builder():
+    def __init__(self, workspace=None, jobs=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.jobs = jobs or os.cpu_count()
+        self.bData = build.BuildData(self.workspace)
+        self.bStr = build.BuildDataStrings()
+        self.buildData = self.bData.getCachedBuildData()
+
+        self.buildDir = self.buildData[self.bStr.buildDirPath]
+        self.buildStatePath = os.path.join(self.workspace.resolvePath(self.buildDir), buildStateFileName)
+        self.commandHashes = {}  # output file: hash of command line that created it
+        self.peakMemory = {}  # object file: peak memory (bytes) of its last compilation (see runCommand())
+        self.fileTimes = {}  # file path: modification time (ns) or None if file does not exist, see getFileTime()
+
+    def getBuildState(self):
+        '''
+        Get command hashes and compile peak memory of the last build from 'buildState.json'. Missing or invalid file
+        means that all objects are compiled.
+        '''
+        if not utils.pathExists(self.buildStatePath):
+            return {}
+
+        try:
+            with open(self.buildStatePath, 'r') as stateFile:
+                data = json.load(stateFile)
+
+            if data["VERSION"] == __version__:
+                return data
+
+        except Exception as err:
+            print("Invalid '" + buildStateFileName + "' file, all files will be compiled. Error:\n" + str(err))
+
+        return {}
+
+    def overwriteBuildState(self):
+        data = {
+            "ABOUT1": "This file holds command line hashes of 'build.py' output files.",
+            "VERSION": __version__,
+            "commands": self.commandHashes,
+            "memory": self.peakMemory
+        }
+        try:
+            utils.writeFileAtomic(self.buildStatePath, json.dumps(data, indent=4, sort_keys=True))
+
+        except Exception as err:
+            msg = "WARNING: unable to write '" + buildStateFileName + "' (all files will be compiled next time):\n"
+            print(msg + str(err))
+
+    def getFileTime(self, filePath):
+        '''
+        Returns modification time (ns) of file (path relative to workspace folder) or None if it does not exist.
+        Headers are shared by many objects, so each file is checked only once per build.
+        '''
+        if filePath not in self.fileTimes:
+            try:
+                self.fileTimes[filePath] = os.stat(self.workspace.resolvePath(filePath)).st_mtime_ns
+            except OSError:
+                self.fileTimes[filePath] = None
+
+        return self.fileTimes[filePath]
+
+    def getCommandHash(self, arguments):
+        return hashlib.sha256(json.dumps(arguments).encode('utf-8')).hexdigest()
+
+    def getCompileCommand(self, sourceFilePath, objectFilePath):
+        '''
+        Returns command line (list) that compiles 'sourceFilePath' to 'objectFilePath', through compiler cache if
+        enabled. Command is the same as 'Compile current file' task command, except object file path.
+        '''
+        arguments = self.bData.getCompileArguments(self.buildData, sourceFilePath, objectFilePath)
+        if self.buildData.get(self.bStr.compilerCache, False):
+            compilerCachePath = os.path.join(self.workspace.ideScriptsPath, 'compilerCache.py')
+            arguments = [sys.executable, compilerCachePath] + arguments
+
+        return arguments
+
+    def isObjectUpToDate(self, sourceFile, objectFile, arguments, oldCommandHashes, database):
+        '''
+        Returns True if 'objectFile' exists, was created with the same command line and is newer than its source and
+        headers (from '.d' file, only source if there is no '.d' file).
+        '''
+        objectTime = self.getFileTime(objectFile)
+        if objectTime is None:
+            return False
+        if oldCommandHashes.get(objectFile) != self.getCommandHash(arguments):
+            return False
+
+        entry = database.objects.get(objectFile)
+        if entry is None:  # no '.d' file, headers are not known
+            dependencies = [sourceFile]
+        else:
+            dependencies = [entry["source"]] + entry["headers"]
+        for filePath in dependencies:
+            fileTime = self.getFileTime(filePath)
+            if (fileTime is None) or (fileTime > objectTime):
+                return False
+
+        return True
+
+    def runCommand(self, arguments):
+        '''
+        Execute command in workspace folder. Returns [return code, command output (stdout and stderr), peak memory].
+        Peak memory (bytes) is the largest resident set size of command and its subprocesses (compiler driver spawns
+        'cc1', 'as'), None if it can't be measured (Windows).
+        '''
+        try:
+            process = subprocess.Popen(arguments, cwd=self.workspace.workspacePath,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            output = process.stdout.read()
+            process.stdout.close()
+
+            peakMemory = None
+            if hasattr(os, 'wait4'):
+                pid, status, resourceUsage = os.wait4(process.pid, 0)
+                process.returncode = getReturnCode(status)
+                peakMemory = resourceUsage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)  # Linux: kB
+            else:
+                process.wait()
+
+            return [process.returncode, output.decode('utf-8', errors='replace'), peakMemory]
+        except Exception as err:
+            return [-1, "Exception error executing '" + arguments[0] + "':\n" + str(err) + "\n", None]
+
+    def printCommandResult(self, description, output):
+        print(description)
+        if output:
+            print(output.rstrip())
+        sys.stdout.flush()
+
+    def compileObjects(self, objects):
+        '''
+        Compile 'objects' ([source file, object file, command line]) in parallel. New command hashes are stored as
+        objects are compiled. On the first error, objects that are not yet compiling are skipped.
+        Returns number of objects that were compiled successfully.
+        '''
+        numOfCompiled = 0
+        success = True
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {}
+            for sourceFile, objectFile, arguments in objects:
+                folderPath = os.path.dirname(self.workspace.resolvePath(objectFile))
+                if not os.path.isdir(folderPath):
+                    os.makedirs(folderPath, exist_ok=True)
+                self.commandHashes.pop(objectFile, None)  # until compiled successfully
+                futures[executor.submit(self.runCommand, arguments)] = [sourceFile, objectFile, arguments]
+
+            for future in concurrent.futures.as_completed(futures):
+                if future.cancelled():
+                    continue
+                sourceFile, objectFile, arguments = futures[future]
+                returnCode, output, peakMemory = future.result()
+                if os.path.splitext(sourceFile)[1] in ['.s', '.S']:
+                    self.printCommandResult("AS " + sourceFile, output)
+                else:
+                    self.printCommandResult("CC " + sourceFile, output)
+                if peakMemory is not None:
+                    self.peakMemory[objectFile] = peakMemory
+
+                self.fileTimes.pop(objectFile, None)
+                if returnCode == 0:
+                    self.commandHashes[objectFile] = self.getCommandHash(arguments)
+                    numOfCompiled = numOfCompiled + 1
+                elif success:
+                    success = False
+                    for otherFuture in futures:
+                        otherFuture.cancel()
+
+        return numOfCompiled
+
+    def isOutputUpToDate(self, outputFile, inputFiles, arguments):
+        '''
+        Returns True if 'outputFile' exists, was created with the same command line and is newer than all 'inputFiles'.
+        '''
+        outputTime = self.getFileTime(outputFile)
+        if (outputTime is None) or (self.commandHashes.get(outputFile) != self.getCommandHash(arguments)):
+            return False
+
+        for inputFile in inputFiles:
+            inputTime = self.getFileTime(inputFile)
+            if (inputTime is None) or (inputTime > outputTime):
+                return False
+
+        return True
+
+    def link(self, objectFiles):
+        '''
+        Link 'objectFiles' to executable and create '.hex' and '.bin' files (only if command line changed or any input
+        file is newer). Returns True on success.
+        '''
+        gccExePath = self.buildData[self.bStr.gccExePath]
+        objcopyPath = ninja.NinjaFile(self.workspace).getToolPath(gccExePath, 'objcopy')
+        sizePath = ninja.NinjaFile(self.workspace).getToolPath(gccExePath, 'size')
+
+        targetExecutablePath = self.buildData[self.bStr.targetExecutablePath]
+        targetBasePath = os.path.splitext(targetExecutablePath)[0]
+        ldFlags = [flag for flag in self.buildData[self.bStr.ldFlags] if flag != '-MF']
+        linkerScripts = ninja.NinjaFile(self.workspace).getLinkerScripts(ldFlags)
+
+        # [output file, input files, command line]
+        commands = [
+            [targetExecutablePath, objectFiles + linkerScripts,
+             [gccExePath] + objectFiles + ldFlags + ["-o", targetExecutablePath]],
+            [targetBasePath + ".hex", [targetExecutablePath],
+             [objcopyPath, "-O", "ihex", targetExecutablePath, targetBasePath + ".hex"]],
+            [targetBasePath + ".bin", [targetExecutablePath],
+             [objcopyPath, "-O", "binary", "-S", targetExecutablePath, targetBasePath + ".bin"]]
+        ]
+        for outputFile, inputFiles, arguments in commands:
+            if self.isOutputUpToDate(outputFile, inputFiles, arguments):
+                continue
+
+            self.commandHashes.pop(outputFile, None)
+            returnCode, output, peakMemory = self.runCommand(arguments)
+            self.fileTimes.pop(outputFile, None)
+            if outputFile == targetExecutablePath:
+                self.printCommandResult("LINK " + outputFile, output)
+            else:
+                self.printCommandResult("OBJCOPY " + outputFile, output)
+            if returnCode != 0:
+                return False
+            self.commandHashes[outputFile] = self.getCommandHash(arguments)
+
+            if outputFile == targetExecutablePath and utils.commandExists(sizePath):
+                returnCode, output, peakMemory = self.runCommand([sizePath, targetExecutablePath])
+                print(output.rstrip())
+
+        return True
+
+    def build(self):
+        '''
+        Compile out of date objects and link executable. Returns True on success.
+        '''
+        startTime = time.perf_counter()
+
+        database = deps.DependencyDatabase(self.workspace)
+        database.update(self.buildDir)
+
+        sources = self.buildData[self.bStr.cSources] + self.buildData[self.bStr.asmSources]
+        objectFiles = ninja.NinjaFile(self.workspace).getObjectFiles(sources, self.buildDir)
+
+        buildState = self.getBuildState()
+        oldCommandHashes = buildState.get("commands", {})
+        self.commandHashes = dict(oldCommandHashes)
+        self.peakMemory = {objectFile: memory for objectFile, memory in buildState.get("memory", {}).items()
+                           if objectFile in objectFiles}
+
+        outOfDateObjects = []
+        for sourceFile, objectFile in zip(sources, objectFiles):
+            arguments = self.getCompileCommand(sourceFile, objectFile)
+            if not self.isObjectUpToDate(sourceFile, objectFile, arguments, oldCommandHashes, database):
+                outOfDateObjects.append([sourceFile, objectFile, arguments])
+
+        numOfCompiled = self.compileObjects(outOfDateObjects)
+        success = (numOfCompiled == len(outOfDateObjects))
+        if success:
+            success = self.link(objectFiles)
+        self.overwriteBuildState()
+
+        msg = str(numOfCompiled) + " of " + str(len(objectFiles)) + " file(s) compiled ("
+        msg += "%.2f" % (time.perf_counter() - startTime) + " seconds)."
+        print(msg)
+        if not success:
+            print("Build failed.")
+        elif not outOfDateObjects:
+            print("Build is up to date.")
+
+        return success
+
+
+def getReturnCode(status):
+    '''
+    Returns process return code from 'os.wait4()' status (negative signal number if process was killed, as in
+    'subprocess').
+    '''
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def getPeakJobMemory(workspace=None):
+    '''
+    Returns the largest compile peak memory (bytes) of objects compiled by previous builds or None if it is not known
+    (project not built with 'build.py' yet, or memory can't be measured on this OS).
+    '''
+    peakMemory = Builder(workspace).getBuildState().get("memory", {})
+    if not peakMemory:
+        return None
+    return max(peakMemory.values())
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    builder = Builder(jobs=utils.getJobs(sys.argv[1:]))
+    if not builder.build():
+        sys.exit(1)
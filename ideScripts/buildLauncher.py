@@ -0,0 +1,220 @@
+'''
+Build command launcher: number of parallel jobs is selected when build starts, not when 'tasks.json' is generated (so
+shared 'tasks.json' fits any machine):
+    python ideScripts/buildLauncher.py <build command> [<arguments>]
+    python ideScripts/buildLauncher.py make GCC_PATH=... -> make GCC_PATH=... -j<jobs>
+
+Number of jobs is limited by:
+    - CPU cores available to this process (1.5 jobs per core, since compile jobs also wait for disk) minus current
+      system load (1 minute load average, where available),
+    - available memory divided by the largest compile peak memory of previous builds, or by 'defaultJobMemory' if it
+      is not known yet (see getPeakJobMemory()).
+If build command already has '-j' option, command is executed as it is.
+Peak memory of the largest build command subprocess (compiler of 'make' and 'ninja' builds) is stored in
+'buildLauncher.json' in build folder (not measured on Windows).
+'''
+import os
+import sys
+import json
+import subprocess
+
+import utilities as utils
+import build
+
+__version__ = utils.__version__
+
+jobsPerCore = 1.5  # https://stackoverflow.com/questions/15289250/make-j4-or-j8/15295032
+defaultJobMemory = 256 * 1024 * 1024  # bytes, assumed peak memory of one compile job if it was not measured yet
+memoryReserve = 0.8  # only this part of available memory is used by build jobs
+
+launcherStateFileName = 'buildLauncher.json'
+
+
+def getCpuCount():
+    '''
+    Returns number of CPU cores this process may run on (container/affinity limits) or number of all cores.
+    '''
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def getLoadAverage():
+    '''
+    Returns system load average of the last minute or 0 if it is not available (Windows).
+    '''
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def getAvailableMemory():
+    '''
+    Returns memory (bytes) available for new processes without swapping, None if it can't be determined.
+    '''
+    try:
+        osIs = utils.detectOs()
+        if osIs == "windows":
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            memoryStatus = MemoryStatus()
+            memoryStatus.dwLength = ctypes.sizeof(MemoryStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memoryStatus)):
+                return memoryStatus.ullAvailPhys
+            return None
+
+        if os.path.isfile('/proc/meminfo'):
+            with open('/proc/meminfo', 'r') as memInfoFile:
+                for line in memInfoFile:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024  # kB
+
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')  # free memory only, without caches
+
+    except Exception:
+        return None
+
+
+def getChildrenPeakMemory():
+    '''
+    Returns peak memory (bytes) of the largest finished subprocess of this process (including their own subprocesses,
+    like 'make' -> 'gcc' -> 'cc1') or None if it can't be measured (Windows).
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peakMemory = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if not peakMemory:
+        return None
+    return peakMemory * (1 if sys.platform == 'darwin' else 1024)  # Linux: kB
+
+
+def getLauncherStatePath(workspace=None):
+    '''
+    Returns path to 'buildLauncher.json' file in build folder.
+    '''
+    workspace = utils.getWorkspace(workspace)
+    return os.path.join(workspace.resolvePath(build.Builder(workspace).buildDir), launcherStateFileName)
+
+
+def getLauncherPeakJobMemory(workspace=None):
+    '''
+    Returns the largest peak memory (bytes) of build commands executed by this launcher or None if it is not known.
+    '''
+    statePath = getLauncherStatePath(workspace)
+    if not utils.pathExists(statePath):
+        return None
+
+    with open(statePath, 'r') as stateFile:
+        data = json.load(stateFile)
+    if data['VERSION'] != __version__:
+        return None
+
+    return data['peakMemory']
+
+
+def recordPeakJobMemory(peakMemory, workspace=None):
+    '''
+    Store peak memory (bytes) of build command to 'buildLauncher.json' file, if it is larger than the stored one (commands
+    that compile nothing, like 'make clean' or up to date build, don't lower it). Errors are reported but not fatal.
+    '''
+    if peakMemory is None:
+        return
+
+    try:
+        oldPeakMemory = getLauncherPeakJobMemory(workspace)
+        if (oldPeakMemory is not None) and (oldPeakMemory >= peakMemory):
+            return
+
+        statePath = getLauncherStatePath(workspace)
+        if not os.path.isdir(os.path.dirname(statePath)):
+            return  # build folder was deleted ('make clean')
+
+        data = {
+            "ABOUT1": "This file holds peak memory of build commands, executed by 'buildLauncher.py'.",
+            "VERSION": __version__,
+            "peakMemory": peakMemory
+        }
+        utils.writeFileAtomic(statePath, json.dumps(data, indent=4, sort_keys=True))
+
+    except Exception as err:
+        print("WARNING: unable to write '" + launcherStateFileName + "':\n" + str(err))
+
+
+def getPeakJobMemory(workspace=None):
+    '''
+    Returns the largest compile peak memory (bytes) of previous builds or None if it is not known yet. Peak memory is
+    measured by 'build.py' (see 'build.getPeakJobMemory()'), by profiled build (see
+    'compileProfiler.getPeakJobMemory()') and by this launcher for other build commands ('make', 'ninja').
+    '''
+    import compileProfiler as profiler  # imports this module
+
+    peakMemories = []
+    for getMemory in [build.getPeakJobMemory, profiler.getPeakJobMemory, getLauncherPeakJobMemory]:
+        try:
+            peakMemory = getMemory(workspace)
+        except Exception:  # no 'buildData.json' or invalid state file, not an error
+            peakMemory = None
+        if peakMemory is not None:
+            peakMemories.append(peakMemory)
+
+    if not peakMemories:
+        return None
+    return max(peakMemories)
+
+
+def getAdaptiveJobs(workspace=None):
+    '''
+    Returns [number of parallel build jobs, description of values it was selected from] (see module description).
+    '''
+    cpuCount = getCpuCount()
+    loadAverage = getLoadAverage()
+    jobs = max(int(cpuCount * jobsPerCore - loadAverage), 1)
+    description = "CPUs: " + str(cpuCount) + ", load: " + "%.1f" % loadAverage
+
+    availableMemory = getAvailableMemory()
+    if availableMemory is not None:
+        jobMemory = getPeakJobMemory(workspace)
+        measured = jobMemory is not None
+        if not measured:
+            jobMemory = defaultJobMemory
+
+        jobs = max(min(jobs, int(availableMemory * memoryReserve / jobMemory)), 1)
+        description += ", available memory: " + str(availableMemory // (1024 * 1024)) + " MB, memory per job: "
+        description += str(jobMemory // (1024 * 1024)) + " MB" + ("" if measured else " (default)")
+
+    return [jobs, description]
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    command = sys.argv[1:]
+    if not command:
+        utils.printAndQuit("Build command is missing.\nUsage: python buildLauncher.py <build command> [<arguments>]")
+
+    if utils.getJobs(command[1:]) is None:
+        jobs, description = getAdaptiveJobs()
+        print("Parallel build jobs: " + str(jobs) + " (" + description + ")")
+        command.append("-j" + str(jobs))
+    sys.stdout.flush()
+
+    try:
+        returnCode = subprocess.call(command)
+        recordPeakJobMemory(getChildrenPeakMemory())
+        sys.exit(returnCode)
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except Exception as err:
+        utils.printAndQuit("Exception error executing build command '" + command[0] + "':\n" + str(err))
@@ -0,0 +1,202 @@
+'''
+Compile current file (called by 'Compile current file' task):
+    python ideScripts/compileFile.py <file path relative to workspace folder>
+
+Source file ('.c', '.s', '.S' or any file listed in project sources) is compiled with flags from 'buildData.json', the
+same as in Makefile. If file is a header (or any other non-source file), compiling it alone is meaningless: all source
+files (translation units) that include it are found in dependency database (GCC '.d' files in build folder, see
+'dependencyDatabase.py') and compiled in parallel, so header edit can be checked without building the whole project.
+Only sources that were already built at least once (have '.d' file) are known to include the header.
+
+If compiler cache is enabled ('user_compilerCache' in 'c_cpp_properties.json'), files are compiled through
+'compilerCache.py'.
+If precompiled header is enabled ('user_precompiledHeader' in 'c_cpp_properties.json'), C sources include it as in
+Makefile, and '.gch' file is (re)built first, if it is missing or outdated.
+'''
+import os
+import sys
+import time
+import subprocess
+import concurrent.futures
+
+import utilities as utils
+import updateBuildData as build
+import dependencyDatabase as deps
+
+__version__ = utils.__version__
+
+sourceFileExtensions = ['.c', '.s', '.S']
+
+
+class FileCompiler():
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.bData = build.BuildData(self.workspace)
+        self.bStr = build.BuildDataStrings()
+        self.buildData = self.bData.getCachedBuildData()
+
+    def isSourceFile(self, filePath):
+        '''
+        Returns True if 'filePath' (relative to workspace folder) is a source file (compiled to object file).
+        '''
+        if os.path.splitext(filePath)[1] in sourceFileExtensions:
+            return True
+
+        return filePath in (self.buildData[self.bStr.cSources] + self.buildData[self.bStr.asmSources])
+
+    def getSourceFiles(self, filePath):
+        '''
+        Returns list of source files that must be compiled to check 'filePath': file itself if it is a source file,
+        otherwise all source files that include it (see 'dependencyDatabase.py').
+        '''
+        if self.isSourceFile(filePath):
+            return [filePath]
+
+        database = deps.DependencyDatabase(self.workspace)
+        database.update(self.buildData[self.bStr.buildDirPath])
+        return database.getDependentSources(filePath)
+
+    def getCompileCommand(self, sourceFilePath):
+        '''
+        Returns command line (list) that compiles 'sourceFilePath', through compiler cache if enabled.
+        '''
+        arguments = self.bData.getCompileArguments(self.buildData, sourceFilePath, precompiledHeader=True)
+        return self.getCompilerCacheCommand(arguments)
+
+    def getCompilerCacheCommand(self, arguments):
+        '''
+        Returns compiler command line 'arguments' executed through compiler cache, if it is enabled.
+        '''
+        if self.buildData.get(self.bStr.compilerCache, False):
+            compilerCachePath = os.path.join(self.workspace.ideScriptsPath, 'compilerCache.py')
+            arguments = [sys.executable, compilerCachePath] + arguments
+
+        return arguments
+
+    def isPrecompiledHeaderUpToDate(self, precompiledHeaderPath):
+        '''
+        Returns True if '.gch' file of 'precompiledHeaderPath' is newer than 'buildData.json' (flags) and all files in
+        its dependency file (header and headers it includes).
+        '''
+        gchFilePath = self.workspace.resolvePath(precompiledHeaderPath + ".gch")
+        dependencyFilePath = self.workspace.resolvePath(precompiledHeaderPath + ".d")
+        if not (os.path.isfile(gchFilePath) and os.path.isfile(dependencyFilePath)):
+            return False
+
+        try:
+            with open(dependencyFilePath, 'r') as dependencyFile:
+                targets, prerequisites = deps.parseDependencyData(dependencyFile.read())
+        except Exception:
+            return False
+
+        gchFileTime = os.path.getmtime(gchFilePath)
+        for filePath in [self.workspace.buildDataPath] + prerequisites:
+            filePath = self.workspace.resolvePath(filePath)
+            if (not os.path.isfile(filePath)) or (os.path.getmtime(filePath) > gchFileTime):
+                return False
+
+        return True
+
+    def precompileHeader(self):
+        '''
+        Create header that C sources include (same as Makefile '$(PCH)' rule) and build its '.gch' file, if it is not
+        up to date. If build fails, '.gch' file is deleted, so C sources are compiled with header itself.
+        '''
+        precompiledHeaderPath = self.bData.getPrecompiledHeaderPath(self.buildData)
+        headerPath = self.buildData[self.bStr.precompiledHeader]
+
+        filePath = self.workspace.resolvePath(precompiledHeaderPath)
+        if not os.path.isfile(filePath):
+            os.makedirs(os.path.dirname(filePath), exist_ok=True)
+            includePath = utils.pathWithForwardSlashes(os.path.abspath(self.workspace.resolvePath(headerPath)))
+            with open(filePath, 'w') as headerFile:
+                headerFile.write('#include "' + includePath + '"\n')
+
+        if self.isPrecompiledHeaderUpToDate(precompiledHeaderPath):
+            return
+
+        print("Precompiling: " + headerPath)
+        arguments = self.bData.getCompileArguments(self.buildData, headerPath, precompiledHeaderPath + ".gch")
+        arguments[1:1] = ['-x', 'c-header']
+        sourceFile, returnCode, output = self.runCompileCommand(headerPath, self.getCompilerCacheCommand(arguments))
+        if output:
+            print(output.rstrip())
+        if returnCode != 0:
+            print("WARNING: precompiled header not built, sources are compiled without it.")
+            gchFilePath = self.workspace.resolvePath(precompiledHeaderPath + ".gch")
+            if os.path.isfile(gchFilePath):
+                os.remove(gchFilePath)
+
+    def compileFile(self, sourceFilePath):
+        '''
+        Compile one source file. Returns [source file, return code, compiler output].
+        '''
+        outputFolderPath = self.workspace.resolvePath(self.buildData[self.bStr.buildDirPath])
+        if not os.path.isdir(outputFolderPath):
+            os.makedirs(outputFolderPath, exist_ok=True)
+
+        return self.runCompileCommand(sourceFilePath, self.getCompileCommand(sourceFilePath))
+
+    def runCompileCommand(self, sourceFilePath, command):
+        '''
+        Execute compiler 'command' in workspace folder. Returns [source file, return code, compiler output].
+        '''
+        try:
+            process = subprocess.run(command, cwd=self.workspace.workspacePath,
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            return [sourceFilePath, process.returncode, process.stdout.decode('utf-8', errors='replace')]
+        except Exception as err:
+            return [sourceFilePath, -1, "Exception error calling compiler:\n" + str(err) + "\n"]
+
+    def compile(self, filePath, jobs=None):
+        '''
+        Compile 'filePath' (see getSourceFiles()) in 'jobs' parallel processes (default: number of CPUs).
+        Compiler output of each file is printed as a whole, once file is compiled.
+        Returns True if all files were compiled successfully.
+        '''
+        filePath = utils.pathWithForwardSlashes(os.path.relpath(self.workspace.resolvePath(filePath),
+                                                                self.workspace.workspacePath))
+        sourceFiles = self.getSourceFiles(filePath)
+        if not sourceFiles:
+            errorMsg = "No source files that include '" + filePath + "' found in build folder dependency files.\n"
+            errorMsg += "Build project first ('.d' files are generated by compiler)."
+            utils.printAndQuit(errorMsg)
+
+        if sourceFiles != [filePath]:
+            print("'" + filePath + "' is included by " + str(len(sourceFiles)) + " source file(s).")
+
+        startTime = time.perf_counter()
+        if self.bData.getPrecompiledHeaderPath(self.buildData):
+            if any(os.path.splitext(sourceFile)[1] not in ['.s', '.S'] for sourceFile in sourceFiles):
+                self.precompileHeader()
+
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            futures = [executor.submit(self.compileFile, sourceFile) for sourceFile in sourceFiles]
+            for future in concurrent.futures.as_completed(futures):
+                sourceFile, returnCode, output = future.result()
+                print("Compiling: " + sourceFile)
+                if output:
+                    print(output.rstrip())
+                sys.stdout.flush()
+                if returnCode != 0:
+                    failed.append(sourceFile)
+
+        msg = str(len(sourceFiles) - len(failed)) + " file(s) compiled, " + str(len(failed)) + " failed ("
+        msg += "%.2f" % (time.perf_counter() - startTime) + " seconds)."
+        print(msg)
+
+        return not failed
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    if len(sys.argv) != 2:
+        utils.printAndQuit("File path is missing.\nUsage: python compileFile.py <file path>")
+
+    filePath = sys.argv[1].strip().strip('\'"')  # path might be quoted (see 'Compile current file' task)
+    compiler = FileCompiler()
+    if not compiler.compile(filePath):
+        sys.exit(1)
@@ -0,0 +1,328 @@
+'''
+Build profiler: compile time, CPU time, peak memory and number of included headers of each object file.
+    python ideScripts/compileProfiler.py --build [-j N]   # full 'make' build with profiled compiler, create reports
+    python ideScripts/compileProfiler.py --report         # create reports from the last profiled build again
+
+'--build' (used by 'Profile build' task) deletes all object files in build folder and builds project with 'make', with
+Makefile 'CC' and 'AS' replaced by this script, which wraps GCC:
+    python compileProfiler.py <path to gcc> <gcc arguments>
+Wrapper executes GCC and appends one record of each compiled object to file given with 'COMPILE_PROFILE' environment
+variable ('compileProfile.jsonl' in build folder). Other commands (linking) are executed without records. Compiler cache
+is not used while profiling.
+
+Reports in build folder:
+    - 'compileProfile.json': summary and records of all objects, the slowest first
+    - 'compileProfile.csv': the same records, for spreadsheets
+    - 'compileProfile.trace.json': Chrome trace events (open in 'chrome://tracing' or https://ui.perfetto.dev), one row
+      per parallel job, so it is visible how well compilation is parallelized
+CPU time and peak memory (of compiler and its subprocesses 'cc1', 'as') are not measured on Windows. Number of headers
+is read from GCC dependency file ('-MMD', project headers only).
+'''
+import os
+import sys
+import csv
+import json
+import time
+import subprocess
+
+import utilities as utils
+import updateBuildData as build
+import compilerCache as cache
+import dependencyDatabase as deps
+import buildLauncher as launcher
+import build as engine
+
+__version__ = utils.__version__
+
+profileEnvVariable = 'COMPILE_PROFILE'
+buildOption = '--build'
+reportOption = '--report'
+
+recordsFileName = 'compileProfile.jsonl'
+jsonReportFileName = 'compileProfile.json'
+csvReportFileName = 'compileProfile.csv'
+traceReportFileName = 'compileProfile.trace.json'
+numOfPrintedRecords = 10  # the slowest objects printed after profiled build
+
+csvColumns = ['source', 'object', 'start', 'wall', 'cpu', 'peakMemory', 'headers', 'returnCode']
+
+
+def profileCompile(compilerPath, arguments, recordsPath):
+    '''
+    Execute compiler command and, if it compiles one source file, append its record to 'recordsPath' file.
+    Returns compiler exit code.
+    '''
+    command = cache.CompileCommand(compilerPath, arguments)
+
+    startTime = time.time()
+    process = subprocess.Popen([compilerPath] + arguments)
+    cpuTime = None
+    peakMemory = None
+    if hasattr(os, 'wait4'):
+        pid, status, resourceUsage = os.wait4(process.pid, 0)
+        process.returncode = engine.getReturnCode(status)
+        cpuTime = resourceUsage.ru_utime + resourceUsage.ru_stime
+        peakMemory = resourceUsage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)  # Linux: kB
+    else:
+        process.wait()
+    wallTime = time.time() - startTime
+
+    if (not command.isCacheable) or (not recordsPath):
+        return process.returncode
+
+    record = {
+        'source': command.sourceFile,
+        'object': command.outputFiles[cache.outputObject],
+        'start': startTime,
+        'wall': wallTime,
+        'cpu': cpuTime,
+        'peakMemory': peakMemory,
+        'headers': getNumOfHeaders(command),
+        'returnCode': process.returncode,
+        'pid': os.getpid()
+    }
+    try:
+        # one short line per write, so records of parallel compilers are not mixed
+        with open(recordsPath, 'a') as recordsFile:
+            recordsFile.write(json.dumps(record) + "\n")
+    except Exception as err:
+        print("WARNING: compile profile record not stored (" + str(err) + ").", file=sys.stderr)
+
+    return process.returncode
+
+
+def getNumOfHeaders(command):
+    '''
+    Returns number of headers in dependency file of compiled 'command' or None if there is no dependency file.
+    '''
+    dependencyFilePath = command.outputFiles.get(cache.outputDependency)
+    if (dependencyFilePath is None) or (not os.path.isfile(dependencyFilePath)):
+        return None
+
+    try:
+        with open(dependencyFilePath, 'r') as dependencyFile:
+            targets, prerequisites = deps.parseDependencyData(dependencyFile.read())
+    except Exception:
+        return None
+
+    return len(set(prerequisites[1:]))
+
+
+def quoteMakeArgument(arguments):
+    '''
+    Returns command (list) as one string for Makefile variable (arguments with spaces are double quoted).
+    '''
+    return ' '.join(('"' + argument + '"') if ' ' in argument else argument for argument in arguments)
+
+
+class CompileProfiler():
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.bData = build.BuildData(self.workspace)
+        self.bStr = build.BuildDataStrings()
+        self.buildData = self.bData.getCachedBuildData()
+
+        self.buildDirPath = self.workspace.resolvePath(self.buildData[self.bStr.buildDirPath])
+        self.recordsPath = os.path.join(self.buildDirPath, recordsFileName)
+
+    def profileBuild(self, jobs=None):
+        '''
+        Delete all object files and build project with 'make', with profiled compiler. Other files in build folder
+        ('compile_commands.json', ...) are not deleted. Returns 'make' exit code.
+        '''
+        if jobs is None:
+            jobs, description = launcher.getAdaptiveJobs(self.workspace)
+            print("Parallel build jobs: " + str(jobs) + " (" + description + ")")
+
+        if not os.path.isdir(self.buildDirPath):
+            os.makedirs(self.buildDirPath, exist_ok=True)
+        if os.path.exists(self.recordsPath):
+            os.remove(self.recordsPath)
+        for folderPath, folders, files in os.walk(self.buildDirPath):
+            for fileName in files:
+                if fileName.endswith('.o'):
+                    os.remove(os.path.join(folderPath, fileName))
+
+        gccExePath = self.buildData[self.bStr.gccExePath]
+        wrapper = [sys.executable, os.path.abspath(__file__), gccExePath]
+        command = [
+            self.buildData[self.bStr.buildToolsPath],
+            "GCC_PATH=" + utils.pathWithForwardSlashes(os.path.dirname(gccExePath)),
+            "CC=" + quoteMakeArgument(wrapper),
+            "AS=" + quoteMakeArgument(wrapper + ['-x', 'assembler-with-cpp']),
+            "COMPILER_CACHE=0",
+            "-j" + (str(jobs) if jobs != utils.unlimitedJobs else "")
+        ]
+        environment = dict(os.environ)
+        environment[profileEnvVariable] = self.recordsPath
+        sys.stdout.flush()
+
+        return subprocess.call(command, cwd=self.workspace.workspacePath, env=environment)
+
+    def getRecords(self):
+        '''
+        Returns list of records of the last profiled build, the slowest object first.
+        '''
+        records = []
+        if not os.path.isfile(self.recordsPath):
+            return records
+
+        with open(self.recordsPath, 'r') as recordsFile:
+            for line in recordsFile:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass  # incomplete record (build interrupted)
+
+        return sorted(records, key=lambda record: record['wall'], reverse=True)
+
+    def getSummary(self, records):
+        '''
+        Returns summary of 'records': total compile and CPU time, build span (from the first compile start to the last
+        compile end) and average parallelism (how many objects were compiled at the same time).
+        '''
+        totalWallTime = sum(record['wall'] for record in records)
+        cpuTimes = [record['cpu'] for record in records if record['cpu'] is not None]
+        peakMemories = [record['peakMemory'] for record in records if record['peakMemory'] is not None]
+
+        buildSpan = 0
+        if records:
+            buildSpan = max(record['start'] + record['wall'] for record in records)
+            buildSpan -= min(record['start'] for record in records)
+
+        summary = {
+            'objects': len(records),
+            'failed': len([record for record in records if record['returnCode'] != 0]),
+            'totalWall': totalWallTime,
+            'totalCpu': sum(cpuTimes) if cpuTimes else None,
+            'maxPeakMemory': max(peakMemories) if peakMemories else None,
+            'buildSpan': buildSpan,
+            'parallelism': (totalWallTime / buildSpan) if buildSpan else None
+        }
+        return summary
+
+    def getTraceEvents(self, records):
+        '''
+        Returns Chrome trace events ('X' complete events, in microseconds from the first compile start). Each
+        object is placed on the first free row ('tid'), so the number of rows shows actual parallelism.
+        '''
+        if not records:
+            return []
+
+        buildStart = min(record['start'] for record in records)
+        rowEnds = []  # end time of the last event on each row
+        events = []
+        for record in sorted(records, key=lambda record: record['start']):
+            for row, rowEnd in enumerate(rowEnds):
+                if rowEnd <= record['start']:
+                    break
+            else:
+                row = len(rowEnds)
+                rowEnds.append(0)
+            rowEnds[row] = record['start'] + record['wall']
+
+            args = {key: record[key] for key in ['object', 'cpu', 'peakMemory', 'headers', 'returnCode']}
+            event = {
+                'name': record['source'],
+                'cat': 'compile',
+                'ph': 'X',
+                'ts': int((record['start'] - buildStart) * 1e6),
+                'dur': int(record['wall'] * 1e6),
+                'pid': 1,
+                'tid': row + 1,
+                'args': args
+            }
+            events.append(event)
+
+        return events
+
+    def createReports(self):
+        '''
+        Create JSON, CSV and Chrome trace reports from records of the last profiled build. Returns records.
+        '''
+        records = self.getRecords()
+
+        data = {
+            'VERSION': __version__,
+            'summary': self.getSummary(records),
+            'objects': records
+        }
+        utils.writeFileAtomic(os.path.join(self.buildDirPath, jsonReportFileName), json.dumps(data, indent=4))
+
+        with open(os.path.join(self.buildDirPath, csvReportFileName), 'w', newline='') as csvFile:
+            writer = csv.DictWriter(csvFile, fieldnames=csvColumns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+
+        traceData = {
+            'traceEvents': self.getTraceEvents(records),
+            'displayTimeUnit': 'ms'
+        }
+        utils.writeFileAtomic(os.path.join(self.buildDirPath, traceReportFileName), json.dumps(traceData))
+
+        return records
+
+    def printReport(self, records):
+        summary = self.getSummary(records)
+        msg = "\nCompile profile: " + str(summary['objects']) + " object(s), total compile time "
+        msg += "%.2f" % summary['totalWall'] + " s"
+        if summary['totalCpu'] is not None:
+            msg += " (CPU: " + "%.2f" % summary['totalCpu'] + " s)"
+        msg += ", build span " + "%.2f" % summary['buildSpan'] + " s"
+        if summary['parallelism'] is not None:
+            msg += ", average parallelism " + "%.1f" % summary['parallelism']
+        print(msg + ".")
+
+        print("The slowest objects (wall time, CPU time, peak memory, headers):")
+        for record in records[:numOfPrintedRecords]:
+            msg = "%8.2f s" % record['wall']
+            msg += ("%8.2f s" % record['cpu']) if (record['cpu'] is not None) else "       - s"
+            if record['peakMemory'] is not None:
+                msg += "%8.1f MB" % (record['peakMemory'] / 1024 / 1024)
+            else:
+                msg += "       - MB"
+            msg += "%6s  " % (record['headers'] if (record['headers'] is not None) else '-')
+            print(msg + record['source'])
+
+        print("Reports: " + ", ".join([jsonReportFileName, csvReportFileName, traceReportFileName]) + " in '" +
+              self.buildData[self.bStr.buildDirPath] + "' folder.")
+
+
+def getPeakJobMemory(workspace=None):
+    '''
+    Returns the largest compile peak memory (bytes) of the last profiled build ('compileProfile.json' report) or None if
+    it is not known (project not profiled yet, or memory can't be measured on this OS).
+    '''
+    reportPath = os.path.join(CompileProfiler(workspace).buildDirPath, jsonReportFileName)
+    if not utils.pathExists(reportPath):
+        return None
+
+    with open(reportPath, 'r') as reportFile:
+        data = json.load(reportFile)
+    if data['VERSION'] != __version__:
+        return None
+
+    return data['summary']['maxPeakMemory']
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    if arguments and not arguments[0].startswith('--'):
+        # compiler wrapper, called by 'make' (no workspace paths and output, except compiler output)
+        sys.exit(profileCompile(arguments[0], arguments[1:], os.environ.get(profileEnvVariable)))
+
+    if (not arguments) or (arguments[0] not in [buildOption, reportOption]):
+        print(__doc__)
+        sys.exit(1)
+
+    utils.verifyFolderStructure()
+    profiler = CompileProfiler()
+
+    returnCode = 0
+    if arguments[0] == buildOption:
+        returnCode = profiler.profileBuild(utils.getJobs(arguments[1:]))
+
+    records = profiler.createReports()
+    profiler.printReport(records)
+    sys.exit(returnCode)
@@ -0,0 +1,323 @@
+'''
+Compiler results cache (similar to 'ccache'): GCC compile commands are called through this script, and results ('.o',
+'.d' and listing '.lst' files, compiler warnings) of the same compile command are restored from the local cache instead
+of compiling the same source again (after 'Delete build folder' task, switching branches, ...).
+
+Usage (generated Makefile does this if compiler cache is enabled, see 'user_compilerCache' in 'c_cpp_properties.json'):
+    python compilerCache.py <path to gcc> <gcc arguments>
+    python compilerCache.py --stats     # print cache folder, size and number of entries
+    python compilerCache.py --clear     # delete all cached results
+
+Cache key is a hash of preprocessed source, full command line, working directory and compiler identity (path, size and
+modification time). Only single source compile commands ('-c', '-o') are cached, all other commands (linking, ...)
+are passed to compiler as they are. Any cache error falls back to normal compilation.
+
+Cache is stored in 'compilerCache' folder next to 'toolsPaths.json' (shared by all workspaces) or in folder given with
+'COMPILER_CACHE_DIR' environment variable. Cache size is limited to 'COMPILER_CACHE_SIZE' MB (default: 1024), least
+recently used results are deleted first.
+'''
+import os
+import sys
+import shutil
+import hashlib
+import subprocess
+
+import utilities as utils
+
+__version__ = utils.__version__
+
+cacheFolderEnvVariable = 'COMPILER_CACHE_DIR'
+cacheSizeEnvVariable = 'COMPILER_CACHE_SIZE'
+defaultCacheSize = 1024  # MB
+cacheFolderName = 'compilerCache'
+evictionTargetRatio = 0.8  # once cache size exceeds its limit, results are deleted until it is below this ratio of limit
+
+statsOption = '--stats'
+clearOption = '--clear'
+
+# GCC options with a separate argument ('-MF file', '-D SOMETHING')
+optionsWithArgument = ['-o', '-MF', '-MT', '-MQ', '-x', '-D', '-U', '-I', '-include', '-imacros', '-isystem', '-iquote',
+                       '-idirafter', '-L', '-T']
+# options that only affect outputs (not preprocessing): removed from preprocessor command line
+dependencyOptions = ['-MMD', '-MD', '-MP']
+dependencyOptionsWithArgument = ['-MF', '-MT', '-MQ']
+
+# cached output files names in cache entry folder
+outputObject = 'object'
+outputDependency = 'dependency'
+outputListing = 'listing'
+outputStderr = 'stderr'
+
+
+class CompileCommand():
+    '''
+    GCC command line split to its parts: source file and output files.
+    '''
+
+    def __init__(self, compilerPath, arguments):
+        self.compilerPath = compilerPath
+        self.arguments = arguments
+        self.sourceFile = None
+        self.outputFiles = {}  # output name: file path
+        self.isCacheable = self.parse()
+
+    def parse(self):
+        '''
+        Find source and output files. Returns True if command compiles one source file to object file.
+        '''
+        sourceFiles = []
+        hasDependencyOutput = False
+        argumentIndex = 0
+        while argumentIndex < len(self.arguments):
+            argument = self.arguments[argumentIndex]
+            if argument in optionsWithArgument:
+                if argumentIndex + 1 >= len(self.arguments):
+                    return False
+                value = self.arguments[argumentIndex + 1]
+                if argument == '-o':
+                    self.outputFiles[outputObject] = value
+                elif argument == '-MF':
+                    self.outputFiles[outputDependency] = value
+                argumentIndex += 2
+                continue
+
+            if argument.startswith('-MF'):
+                self.outputFiles[outputDependency] = argument[len('-MF'):]
+            elif argument in ['-MMD', '-MD']:
+                hasDependencyOutput = True
+            elif argument.startswith('-Wa,'):
+                for assemblerOption in argument.split(',')[1:]:
+                    if assemblerOption.startswith('-a') and ('=' in assemblerOption):
+                        self.outputFiles[outputListing] = assemblerOption.split('=', 1)[1]
+            elif argument in ['-E', '-S', '-M', '-MM', '-']:
+                return False  # not a compile command
+            elif not argument.startswith('-'):
+                sourceFiles.append(argument)
+            argumentIndex += 1
+
+        if ('-c' not in self.arguments) or (len(sourceFiles) != 1) or (outputObject not in self.outputFiles):
+            return False
+        self.sourceFile = sourceFiles[0]
+
+        if hasDependencyOutput and (outputDependency not in self.outputFiles):
+            self.outputFiles[outputDependency] = os.path.splitext(self.outputFiles[outputObject])[0] + ".d"
+        if not hasDependencyOutput:
+            self.outputFiles.pop(outputDependency, None)
+
+        return True
+
+    def getPreprocessorArguments(self):
+        '''
+        Returns command line that prints preprocessed source to stdout: the same options without output options.
+        '''
+        arguments = [self.compilerPath, '-E']
+        argumentIndex = 0
+        while argumentIndex < len(self.arguments):
+            argument = self.arguments[argumentIndex]
+            if argument in ['-o'] + dependencyOptionsWithArgument:
+                argumentIndex += 2
+                continue
+            if (argument not in ['-c'] + dependencyOptions) and not argument.startswith(('-MF', '-MT', '-MQ', '-Wa,')):
+                arguments.append(argument)
+            argumentIndex += 1
+
+        return arguments
+
+    def isPreprocessed(self):
+        '''
+        Returns True if source is preprocessed by compiler. Plain assembler sources ('.s' without
+        '-x assembler-with-cpp') are not.
+        '''
+        if os.path.splitext(self.sourceFile)[1] != '.s':
+            return True
+        return 'assembler-with-cpp' in self.arguments
+
+    def getHash(self):
+        '''
+        Returns cache key of this command or None if source can't be preprocessed (compiler reports this error when
+        command is executed).
+        '''
+        hasher = hashlib.sha256()
+        for item in [__version__, os.path.abspath(self.compilerPath), utils.getFileVersion(self.compilerPath), os.getcwd()]:
+            hasher.update(str(item).encode('utf-8') + b'\0')
+        for argument in self.arguments:
+            hasher.update(argument.encode('utf-8') + b'\0')
+
+        if self.isPreprocessed():
+            process = subprocess.run(self.getPreprocessorArguments(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            if process.returncode != 0:
+                return None
+            hasher.update(process.stdout)
+        else:
+            with open(self.sourceFile, 'rb') as sourceFile:
+                hasher.update(sourceFile.read())
+
+        return hasher.hexdigest()
+
+
+class CompilerCache():
+    def __init__(self, cacheFolderPath=None, maxCacheSize=None):
+        if cacheFolderPath is None:
+            cacheFolderPath = getDefaultCacheFolderPath()
+        self.cacheFolderPath = cacheFolderPath
+
+        if maxCacheSize is None:
+            maxCacheSize = int(os.environ.get(cacheSizeEnvVariable, defaultCacheSize)) * 1024 * 1024
+        self.maxCacheSize = maxCacheSize  # bytes
+
+    def getEntryPath(self, commandHash):
+        return os.path.join(self.cacheFolderPath, commandHash[:2], commandHash)
+
+    def restore(self, command, commandHash):
+        '''
+        Copy cached outputs of 'command' to their output paths and print cached compiler messages.
+        Returns True on cache hit, False if results are not cached.
+        '''
+        entryPath = self.getEntryPath(commandHash)
+        if not os.path.isfile(os.path.join(entryPath, outputObject)):
+            return False
+
+        for outputName, outputPath in command.outputFiles.items():
+            if not os.path.isfile(os.path.join(entryPath, outputName)):
+                continue  # output was not generated by compiler (and was not stored)
+            outputFolderPath = os.path.dirname(outputPath)
+            if outputFolderPath and not os.path.isdir(outputFolderPath):
+                os.makedirs(outputFolderPath, exist_ok=True)
+            shutil.copyfile(os.path.join(entryPath, outputName), outputPath)
+
+        stderrPath = os.path.join(entryPath, outputStderr)
+        if os.path.isfile(stderrPath):
+            with open(stderrPath, 'rb') as stderrFile:
+                sys.stderr.buffer.write(stderrFile.read())
+                sys.stderr.flush()
+
+        os.utime(entryPath)  # least recently used entries are evicted first
+        return True
+
+    def store(self, command, commandHash, stderrData):
+        '''
+        Store outputs of successful 'command' and compiler messages. Entry is written to temporary folder first and
+        renamed, so parallel compile processes never see partially stored entry.
+        '''
+        entryPath = self.getEntryPath(commandHash)
+        if os.path.isdir(entryPath):
+            return
+
+        tmpEntryPath = entryPath + "." + str(os.getpid()) + ".tmp"
+        os.makedirs(tmpEntryPath, exist_ok=True)
+        try:
+            for outputName, outputPath in command.outputFiles.items():
+                if os.path.isfile(outputPath):
+                    shutil.copyfile(outputPath, os.path.join(tmpEntryPath, outputName))
+            if stderrData:
+                with open(os.path.join(tmpEntryPath, outputStderr), 'wb') as stderrFile:
+                    stderrFile.write(stderrData)
+            os.replace(tmpEntryPath, entryPath)
+        finally:
+            if os.path.isdir(tmpEntryPath):
+                shutil.rmtree(tmpEntryPath, ignore_errors=True)
+
+        self.evict()
+
+    def getEntries(self):
+        '''
+        Returns list of all cache entries: [last use time, size, entry path].
+        '''
+        entries = []
+        if not os.path.isdir(self.cacheFolderPath):
+            return entries
+
+        for prefixFolder in os.scandir(self.cacheFolderPath):
+            if not prefixFolder.is_dir():
+                continue
+            for entry in os.scandir(prefixFolder.path):
+                if entry.name.endswith('.tmp') or not entry.is_dir():
+                    continue
+                size = sum(entryFile.stat().st_size for entryFile in os.scandir(entry.path))
+                entries.append([entry.stat().st_mtime, size, entry.path])
+
+        return entries
+
+    def evict(self):
+        '''
+        Delete least recently used entries if cache size exceeds 'maxCacheSize'.
+        '''
+        entries = self.getEntries()
+        cacheSize = sum(entry[1] for entry in entries)
+        if cacheSize <= self.maxCacheSize:
+            return
+
+        for lastUseTime, size, entryPath in sorted(entries):
+            if cacheSize <= self.maxCacheSize * evictionTargetRatio:
+                break
+            shutil.rmtree(entryPath, ignore_errors=True)
+            cacheSize -= size
+
+    def compile(self, compilerPath, arguments):
+        '''
+        Execute compile command (or restore its results from cache). Returns compiler exit code.
+        '''
+        command = CompileCommand(compilerPath, arguments)
+        commandHash = None
+        if command.isCacheable:
+            try:
+                commandHash = command.getHash()
+                if (commandHash is not None) and self.restore(command, commandHash):
+                    return 0
+            except Exception as err:
+                print("WARNING: compiler cache is not used (" + str(err) + ").", file=sys.stderr)
+                commandHash = None
+
+        if commandHash is None:
+            return subprocess.call([compilerPath] + arguments)
+
+        process = subprocess.run([compilerPath] + arguments, stderr=subprocess.PIPE)
+        sys.stderr.buffer.write(process.stderr)
+        sys.stderr.flush()
+
+        if process.returncode == 0:
+            try:
+                self.store(command, commandHash, process.stderr)
+            except Exception as err:
+                print("WARNING: compile results not stored to compiler cache (" + str(err) + ").", file=sys.stderr)
+
+        return process.returncode
+
+    def printStats(self):
+        entries = self.getEntries()
+        cacheSize = sum(entry[1] for entry in entries)
+        print("Compiler cache folder: " + self.cacheFolderPath)
+        print("Cached results: " + str(len(entries)))
+        msg = "Cache size: " + "%.1f" % (cacheSize / 1024 / 1024) + " MB (limit: "
+        msg += "%.0f" % (self.maxCacheSize / 1024 / 1024) + " MB)"
+        print(msg)
+
+    def clear(self):
+        if os.path.isdir(self.cacheFolderPath):
+            shutil.rmtree(self.cacheFolderPath)
+        print("Compiler cache cleared: " + self.cacheFolderPath)
+
+
+def getDefaultCacheFolderPath():
+    '''
+    Returns path to cache folder: 'COMPILER_CACHE_DIR' environment variable or folder next to 'toolsPaths.json'.
+    '''
+    if os.environ.get(cacheFolderEnvVariable):
+        return os.environ[cacheFolderEnvVariable]
+
+    return os.path.join(utils.getVsCodeSettingsFolderPath(), cacheFolderName)
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    cache = CompilerCache()
+
+    if sys.argv[1:] == [statsOption]:
+        cache.printStats()
+    elif sys.argv[1:] == [clearOption]:
+        cache.clear()
+    elif len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    else:
+        sys.exit(cache.compile(sys.argv[1], sys.argv[2:]))
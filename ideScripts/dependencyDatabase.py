@@ -0,0 +1,351 @@
+'''
+Header dependency database: index of GCC dependency files ('-MMD -MP -MF"$(@:%.o=%.d)"', one '.d' file per object in
+build folder), stored in '.vscode/dependencies.json'.
+
+Index holds forward map (object file: source file and included headers) and reverse map (header or source file: object
+files that include it), so questions like "which objects are invalidated by editing 'stm32f0xx_hal_conf.h'?" are
+answered without scanning sources or calling compiler. Index is updated incrementally: only '.d' files with changed
+size or modification time are parsed again, entries of deleted '.d' files are removed.
+Dependency files are created by build, so index only knows objects that were already built at least once.
+If precompiled header is used ('user_precompiledHeader'), '.d' file of each C object lists only its source file, while
+headers are listed in '.d' file of '.gch' file. Therefore objects that depend on '.gch' file also include all C objects.
+
+This script can be called standalone:
+    python ideScripts/dependencyDatabase.py                         # update index and print its statistics
+    python ideScripts/dependencyDatabase.py <file> [<file> ...]     # print objects invalidated by editing files
+    python ideScripts/dependencyDatabase.py --headers <source/object file>   # print headers of a source file
+File can be given as a path (absolute or relative to workspace folder) or just a file name ('stm32f0xx_hal_conf.h').
+'''
+import os
+import re
+import sys
+import json
+
+import utilities as utils
+import updateBuildData as build
+
+__version__ = utils.__version__
+
+dependencyFileExtension = '.d'
+precompiledHeaderExtension = '.gch'
+headersOption = '--headers'
+
+
+class DependencyDatabase():
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.bStr = build.BuildDataStrings()
+
+        self.buildDir = None
+        # object file: {"dependencyFile": '.d' file, "version": '.d' file version, "source": file, "headers": [files]}
+        self.objects = {}
+        self.dependents = {}  # source or header file: [object files], built from 'objects' (see updateDependents())
+
+        self.loadDatabaseFile()
+
+    def loadDatabaseFile(self):
+        '''
+        Load index from 'dependencies.json'. Missing or invalid file (or file of other 'ideScripts' version) is treated
+        as an empty index.
+        '''
+        if not utils.pathExists(self.workspace.dependencyDatabasePath):
+            return
+
+        try:
+            with open(self.workspace.dependencyDatabasePath, 'r') as databaseFile:
+                data = json.load(databaseFile)
+
+            if data["VERSION"] == __version__:
+                # files are stored once in 'files' list, objects refer to them by index
+                files = data["files"]
+                self.buildDir = data["buildDir"]
+                for objectFile, (dependencyFile, version, sourceIndex, headerIndexes) in data["objects"].items():
+                    self.objects[objectFile] = {
+                        "dependencyFile": dependencyFile,
+                        "version": version,
+                        "source": files[sourceIndex],
+                        "headers": [files[headerIndex] for headerIndex in headerIndexes]
+                    }
+
+        except Exception as err:
+            print("Invalid 'dependencies.json' file, dependency database will be rebuilt. Error:\n" + str(err))
+            self.buildDir = None
+            self.objects = {}
+
+        self.updateDependents()
+
+    def overwriteDatabaseFile(self):
+        '''
+        Write index to 'dependencies.json'. Index is a cache, so failure is not an error.
+        '''
+        files = []
+        fileIndexes = {}
+        objects = {}
+        for objectFile in sorted(self.objects):
+            entry = self.objects[objectFile]
+            indexes = []
+            for filePath in [entry["source"]] + entry["headers"]:
+                if filePath not in fileIndexes:
+                    fileIndexes[filePath] = len(files)
+                    files.append(filePath)
+                indexes.append(fileIndexes[filePath])
+            objects[objectFile] = [entry["dependencyFile"], entry["version"], indexes[0], indexes[1:]]
+
+        data = {
+            "ABOUT1": "This file is an index of GCC '.d' dependency files in build folder. It can be deleted at any time.",
+            "VERSION": __version__,
+            "buildDir": self.buildDir,
+            "files": files,
+            "objects": objects
+        }
+        try:
+            utils.writeFileAtomic(self.workspace.dependencyDatabasePath, json.dumps(data, separators=(',', ':')))
+
+        except Exception as err:
+            print("WARNING: unable to write dependency database 'dependencies.json':\n" + str(err))
+
+    def updateDependents(self):
+        '''
+        Build reverse map (source or header file: object files) from forward map of objects.
+        '''
+        self.dependents = {}
+        for objectFile in sorted(self.objects):
+            entry = self.objects[objectFile]
+            for filePath in [entry["source"]] + entry["headers"]:
+                objectFiles = self.dependents.setdefault(filePath, [])
+                if objectFile not in objectFiles:
+                    objectFiles.append(objectFile)
+
+    def getBuildDir(self):
+        '''
+        Returns build folder from 'buildData.json' or None if it does not exist yet.
+        '''
+        if not utils.pathExists(self.workspace.buildDataPath):
+            return None
+
+        bData = build.BuildData(self.workspace)
+        return bData.getCachedBuildData().get(self.bStr.buildDirPath)
+
+    def update(self, buildDir=None):
+        '''
+        Parse new and changed '.d' files in 'buildDir' (default: build folder from 'buildData.json') and remove entries
+        of deleted '.d' files. 'dependencies.json' is written only if index changed.
+        Returns number of added, changed and removed objects.
+        '''
+        if buildDir is None:
+            buildDir = self.getBuildDir()
+            if buildDir is None:
+                return 0
+
+        numOfChanges = 0
+        if buildDir != self.buildDir:  # build folder changed, old entries are invalid
+            numOfChanges += len(self.objects)
+            self.buildDir = buildDir
+            self.objects = {}
+
+        oldEntries = {}  # '.d' file: [object file, entry]
+        for objectFile, entry in self.objects.items():
+            oldEntries[entry["dependencyFile"]] = [objectFile, entry]
+
+        objects = {}
+        for dependencyFilePath in self.findDependencyFiles(self.workspace.resolvePath(buildDir)):
+            dependencyFilePath = self.workspace.normalizePath(dependencyFilePath)
+            version = utils.getFileVersion(self.workspace.resolvePath(dependencyFilePath))
+            objectFile, entry = oldEntries.get(dependencyFilePath, [None, None])
+
+            if (entry is None) or (entry["version"] != version):
+                objectFile, entry = self.parseDependencyFile(dependencyFilePath)
+                if entry is None:
+                    continue
+                entry["version"] = version
+                numOfChanges += 1
+            objects[objectFile] = entry
+
+        numOfChanges += len(set(self.objects) - set(objects))
+        self.objects = objects
+        if numOfChanges:
+            self.updateDependents()
+            self.overwriteDatabaseFile()
+
+        return numOfChanges
+
+    def findDependencyFiles(self, buildDirPath):
+        '''
+        Returns sorted list of all '.d' files in build folder (and its subfolders).
+        '''
+        dependencyFiles = []
+        for folderPath, folders, files in os.walk(buildDirPath):
+            for fileName in files:
+                if fileName.endswith(dependencyFileExtension):
+                    dependencyFiles.append(os.path.join(folderPath, fileName))
+
+        return sorted(dependencyFiles)
+
+    def parseDependencyFile(self, dependencyFilePath):
+        '''
+        Parse GCC '.d' file: 'build/main.o: Src/main.c Inc/main.h \\' (+ '-MP' phony header targets, which are ignored).
+        Returns object file and its new entry, or (None, None) if file is not a valid dependency file.
+        '''
+        try:
+            with open(self.workspace.resolvePath(dependencyFilePath), 'r') as dependencyFile:
+                data = dependencyFile.read()
+        except Exception as err:
+            print("WARNING: unable to read dependency file '" + dependencyFilePath + "':\n" + str(err))
+            return None, None
+
+        targets, prerequisites = parseDependencyData(data)
+        if not prerequisites:
+            return None, None
+
+        entry = {
+            "source": self.workspace.normalizePath(prerequisites[0]),
+            "headers": [],
+            "dependencyFile": dependencyFilePath
+        }
+        for header in prerequisites[1:]:
+            header = self.workspace.normalizePath(header)
+            if header not in entry["headers"]:
+                entry["headers"].append(header)
+
+        return self.workspace.normalizePath(targets[0]), entry
+
+    def findFiles(self, filePath):
+        '''
+        Returns list of indexed files (sources, headers and objects) that match 'filePath': exact path (absolute or
+        relative to workspace folder) or, if there is no such file in index, all files with the same file name.
+        '''
+        filePath = self.workspace.normalizePath(filePath)
+        if (filePath in self.dependents) or (filePath in self.objects):
+            return [filePath]
+
+        fileName = os.path.basename(filePath)
+        files = [indexedFile for indexedFile in self.dependents if os.path.basename(indexedFile) == fileName]
+        files += [objectFile for objectFile in self.objects if os.path.basename(objectFile) == fileName]
+        return sorted(set(files))
+
+    def getDependentObjects(self, filePath):
+        '''
+        Returns sorted list of object files that must be rebuilt if source or header file 'filePath' is modified.
+        '''
+        objectFiles = set()
+        for indexedFile in self.findFiles(filePath):
+            objectFiles.update(self.dependents.get(indexedFile, []))
+
+        if any(isPrecompiledHeader(objectFile) for objectFile in objectFiles):
+            objectFiles.update(self.getPrecompiledHeaderObjects())
+
+        return sorted(objectFiles)
+
+    def getPrecompiledHeaderObjects(self):
+        '''
+        Returns list of objects that are compiled with precompiled header ('-include', all C objects).
+        '''
+        return [objectFile for objectFile, entry in self.objects.items()
+                if (not isPrecompiledHeader(objectFile)) and (os.path.splitext(entry["source"])[1] not in ['.s', '.S'])]
+
+    def getDependentSources(self, filePath):
+        '''
+        Returns sorted list of source files (translation units) that include source or header file 'filePath'.
+        Precompiled header itself is not a translation unit and is not listed.
+        '''
+        objectFiles = [objectFile for objectFile in self.getDependentObjects(filePath)
+                       if not isPrecompiledHeader(objectFile)]
+        return sorted(set(self.objects[objectFile]["source"] for objectFile in objectFiles))
+
+    def getHeaders(self, filePath):
+        '''
+        Returns sorted list of headers included (directly or indirectly) by source or object file 'filePath'.
+        '''
+        objectFiles = set()
+        for indexedFile in self.findFiles(filePath):
+            if indexedFile in self.objects:
+                objectFiles.add(indexedFile)
+            else:
+                objectFiles.update(objectFile for objectFile, entry in self.objects.items()
+                                   if entry["source"] == indexedFile)
+
+        # headers of precompiled header are listed only in '.d' file of '.gch' file
+        if objectFiles.intersection(self.getPrecompiledHeaderObjects()):
+            objectFiles.update(objectFile for objectFile in self.objects if isPrecompiledHeader(objectFile))
+
+        headers = set()
+        for objectFile in objectFiles:
+            if isPrecompiledHeader(objectFile):
+                headers.add(self.objects[objectFile]["source"])
+            headers.update(self.objects[objectFile]["headers"])
+
+        return sorted(headers)
+
+    def getObjectsToRebuild(self, modifiedFiles):
+        '''
+        Returns sorted list of object files invalidated by any of 'modifiedFiles' (selective rebuild).
+        '''
+        objectFiles = set()
+        for filePath in modifiedFiles:
+            objectFiles.update(self.getDependentObjects(filePath))
+
+        return sorted(objectFiles)
+
+
+def isPrecompiledHeader(objectFile):
+    '''
+    Returns True if 'objectFile' is precompiled header ('.gch' file).
+    '''
+    return objectFile.endswith(precompiledHeaderExtension)
+
+
+def parseDependencyData(data):
+    '''
+    Parse the first rule of GCC '.d' file content ('-MP' phony header targets are ignored).
+    Returns [targets, prerequisites] (source file first, then headers) or [[], []] if data is not a valid rule.
+    '''
+    rule = data.replace('\\\r\n', ' ').replace('\\\n', ' ').strip().splitlines()
+    if not rule:
+        return [[], []]
+
+    # paths with spaces are escaped ('\ '), Windows paths may contain ':' ('C:/...')
+    items = [unescapePath(item) for item in re.findall(r"(?:\\.|\S)+", rule[0])]
+    for itemIndex, item in enumerate(items):
+        if item.endswith(':'):
+            targets = items[:itemIndex] + [item[:-1]]
+            if not targets[0]:
+                break
+            return [targets, items[itemIndex + 1:]]
+
+    return [[], []]
+
+
+def unescapePath(path):
+    '''
+    Returns path from dependency file with make escapes removed: '\\ ' (space), '\\#' and '$$'.
+    '''
+    return path.replace('\\ ', ' ').replace('\\#', '#').replace('$$', '$')
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    database = DependencyDatabase()
+    numOfChanges = database.update()
+
+    arguments = sys.argv[1:]
+    if not arguments:
+        msg = "Dependency database (build folder '" + str(database.buildDir) + "'): " + str(len(database.objects))
+        msg += " objects, " + str(len(database.dependents)) + " source and header files, " + str(numOfChanges)
+        msg += " changes since last update."
+        print(msg)
+
+    elif arguments[0] == headersOption:
+        for filePath in arguments[1:]:
+            headers = database.getHeaders(filePath)
+            print("Headers of '" + filePath + "' (" + str(len(headers)) + "):")
+            for header in headers:
+                print("\t" + header)
+
+    else:
+        for filePath in arguments:
+            objectFiles = database.getDependentObjects(filePath)
+            print("Objects invalidated by '" + filePath + "' (" + str(len(objectFiles)) + "):")
+            for objectFile in objectFiles:
+                print("\t" + objectFile)
@@ -0,0 +1,224 @@
+'''
+Header cost analysis: which headers (CMSIS, HAL, project) contribute most preprocessing work to this project.
+    python ideScripts/headerCost.py [-j N]
+
+Each C source file from 'buildData.json' is preprocessed with the same flags as compiled, with GCC '-H' option (prints
+tree of included headers). For each header, across all source files:
+    - sources: number of source files that include it
+    - inclusions: number of times it is included (header without include guard can be included more times)
+    - own bytes: size of preprocessed output that comes from this header itself (from preprocessor line markers)
+    - inclusive bytes: own bytes plus bytes of all headers it includes (whole include chain)
+Headers with large inclusive bytes in (almost) all sources are candidates for precompiled header, headers with large
+own bytes are candidates for trimming (for example, disabled HAL modules in 'stm32f0xx_hal_conf.h').
+Full report is stored in 'headerCost.json' in build folder.
+'''
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+import concurrent.futures
+
+import utilities as utils
+import updateBuildData as build
+import compilerCache as cache
+
+__version__ = utils.__version__
+
+reportFileName = 'headerCost.json'
+numOfPrintedHeaders = 15
+
+lineMarkerRegex = re.compile(r'^# \d+ "(.*)"')  # '# 1 "Drivers/CMSIS/Include/core_cm0.h" 1'
+includeTreeRegex = re.compile(r'^(\.+)[!x]? (.+)$')  # '.. Drivers/CMSIS/Include/core_cm0.h'
+
+
+class HeaderCostAnalysis():
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.bData = build.BuildData(self.workspace)
+        self.bStr = build.BuildDataStrings()
+        self.buildData = self.bData.getCachedBuildData()
+
+    def getPreprocessorArguments(self, sourceFilePath):
+        '''
+        Returns command line that prints preprocessed 'sourceFilePath' and its include tree ('-H', to stderr).
+        '''
+        arguments = self.bData.getCompileArguments(self.buildData, sourceFilePath)
+        command = cache.CompileCommand(arguments[0], arguments[1:])
+
+        return command.getPreprocessorArguments() + ['-H']
+
+    def getOwnBytes(self, preprocessedData):
+        '''
+        Returns dictionary of file: number of preprocessed output bytes that come from this file (line markers set
+        current file). Built-in and command line pseudo files are ignored.
+        '''
+        ownBytes = {}
+        currentFile = None
+        for line in preprocessedData.splitlines(keepends=True):
+            match = lineMarkerRegex.match(line.decode('utf-8', errors='replace'))
+            if match:
+                currentFile = match.group(1)
+                if currentFile.startswith('<'):
+                    currentFile = None
+                else:
+                    currentFile = self.workspace.normalizePath(currentFile.replace('\\\\', '\\'))
+                continue
+
+            if currentFile is not None:
+                ownBytes[currentFile] = ownBytes.get(currentFile, 0) + len(line)
+
+        return ownBytes
+
+    def getIncludeTree(self, includeData):
+        '''
+        Returns list of root nodes of '-H' include tree: [header, [child nodes]]. Lines that are not part of include
+        tree (compiler messages, 'Multiple include guards may be useful for:' list) are ignored.
+        '''
+        roots = []
+        stack = []  # nodes of current include path, 'stack[depth - 1]' is node at 'depth'
+        for line in includeData.decode('utf-8', errors='replace').splitlines():
+            match = includeTreeRegex.match(line)
+            if not match:
+                continue
+
+            depth = len(match.group(1))
+            node = [self.workspace.normalizePath(match.group(2).strip()), []]
+            del stack[depth - 1:]
+            if stack:
+                stack[-1][1].append(node)
+            else:
+                roots.append(node)
+            stack.append(node)
+
+        return roots
+
+    def analyzeSource(self, sourceFilePath):
+        '''
+        Preprocess one source file. Returns [source file, result or None, error message]. Result holds total
+        preprocessed bytes and, for each header: inclusions, own bytes and inclusive bytes (see module description).
+        '''
+        try:
+            process = subprocess.run(self.getPreprocessorArguments(sourceFilePath), cwd=self.workspace.workspacePath,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except Exception as err:
+            return [sourceFilePath, None, str(err)]
+
+        if process.returncode != 0:
+            errorLines = [line for line in process.stderr.decode('utf-8', errors='replace').splitlines()
+                          if not includeTreeRegex.match(line)]
+            return [sourceFilePath, None, "\n".join(errorLines[-5:])]
+
+        ownBytes = self.getOwnBytes(process.stdout)
+        headers = {}
+
+        def addNode(node):
+            header, children = node
+            inclusiveBytes = ownBytes.get(header, 0)
+            for child in children:
+                inclusiveBytes += addNode(child)
+
+            headerData = headers.setdefault(header, {'inclusions': 0, 'ownBytes': ownBytes.get(header, 0),
+                                                     'inclusiveBytes': 0})
+            headerData['inclusions'] += 1
+            headerData['inclusiveBytes'] = max(headerData['inclusiveBytes'], inclusiveBytes)
+            return inclusiveBytes
+
+        for root in self.getIncludeTree(process.stderr):
+            addNode(root)
+
+        result = {
+            'bytes': len(process.stdout),
+            'sourceBytes': ownBytes.get(self.workspace.normalizePath(sourceFilePath), 0),
+            'headers': headers
+        }
+        return [sourceFilePath, result, '']
+
+    def analyze(self, jobs=None):
+        '''
+        Analyze all C source files in 'jobs' parallel processes (default: number of CPUs). Returns report data.
+        '''
+        sources = {}
+        headers = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            futures = [executor.submit(self.analyzeSource, source) for source in self.buildData[self.bStr.cSources]]
+            for future in concurrent.futures.as_completed(futures):
+                sourceFile, result, errorMsg = future.result()
+                if result is None:
+                    print("WARNING: unable to preprocess '" + sourceFile + "', source is not analyzed:\n" + errorMsg)
+                    continue
+
+                sources[sourceFile] = {'bytes': result['bytes'], 'sourceBytes': result['sourceBytes'],
+                                       'headers': len(result['headers'])}
+                for header, headerData in result['headers'].items():
+                    total = headers.setdefault(header, {'sources': 0, 'inclusions': 0, 'ownBytes': 0,
+                                                        'inclusiveBytes': 0})
+                    total['sources'] += 1
+                    for key in ['inclusions', 'ownBytes', 'inclusiveBytes']:
+                        total[key] += headerData[key]
+
+        totalBytes = sum(source['bytes'] for source in sources.values())
+        summary = {
+            'sources': len(sources),
+            'headers': len(headers),
+            'preprocessedBytes': totalBytes,
+            'headerBytes': totalBytes - sum(source['sourceBytes'] for source in sources.values())
+        }
+        data = {
+            'VERSION': __version__,
+            'summary': summary,
+            'headers': dict(sorted(headers.items(), key=lambda item: item[1]['inclusiveBytes'], reverse=True)),
+            'sources': dict(sorted(sources.items(), key=lambda item: item[1]['bytes'], reverse=True))
+        }
+        return data
+
+    def overwriteReportFile(self, data):
+        '''
+        Write report to 'headerCost.json' in build folder. Returns report file path.
+        '''
+        buildDirPath = self.workspace.resolvePath(self.buildData[self.bStr.buildDirPath])
+        if not os.path.isdir(buildDirPath):
+            os.makedirs(buildDirPath, exist_ok=True)
+
+        reportFilePath = os.path.join(buildDirPath, reportFileName)
+        utils.writeFileAtomic(reportFilePath, json.dumps(data, indent=4))
+
+        return reportFilePath
+
+    def printReport(self, data):
+        summary = data['summary']
+        msg = "\n" + str(summary['sources']) + " source file(s) preprocessed: " + formatBytes(summary['preprocessedBytes'])
+        msg += ", " + formatBytes(summary['headerBytes']) + " from " + str(summary['headers']) + " header(s)."
+        print(msg)
+
+        columns = "    sources  inclusions   own bytes   inclusive bytes  header"
+        for title, key in [["Largest include chains (precompiled header candidates):", 'inclusiveBytes'],
+                           ["Headers with the most own preprocessed bytes (trimming candidates):", 'ownBytes']]:
+            print("\n" + title)
+            print(columns)
+            headers = sorted(data['headers'].items(), key=lambda item: item[1][key], reverse=True)
+            for header, headerData in headers[:numOfPrintedHeaders]:
+                msg = "%11d" % headerData['sources'] + "%12d" % headerData['inclusions']
+                msg += "%12s" % formatBytes(headerData['ownBytes']) + "%18s" % formatBytes(headerData['inclusiveBytes'])
+                print(msg + "  " + header)
+
+
+def formatBytes(numOfBytes):
+    if numOfBytes >= 1024 * 1024:
+        return "%.1f MB" % (numOfBytes / 1024 / 1024)
+    return "%.1f kB" % (numOfBytes / 1024)
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    startTime = time.perf_counter()
+    analysis = HeaderCostAnalysis()
+    reportData = analysis.analyze(utils.getJobs(sys.argv[1:]))
+    analysis.printReport(reportData)
+
+    reportFilePath = analysis.overwriteReportFile(reportData)
+    reportFilePath = utils.pathWithForwardSlashes(os.path.relpath(reportFilePath, analysis.workspace.workspacePath))
+    print("\nFull report: " + reportFilePath + " (" + "%.2f" % (time.perf_counter() - startTime) + " seconds)")
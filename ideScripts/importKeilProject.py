@@ -11,6 +11,7 @@ import subprocess
 import sys
 from xml.dom import minidom
 
+import makefileParser as mkfParser
 import templateStrings as tmpStr
 import updateMakefile as mkf
 import utilities as utils
@@ -387,23 +388,22 @@ def cleanTempMakefile(paths: Paths):
     try:
         with open(paths.tmpMakefile, 'r') as makefileHandler:
             data = makefileHandler.readlines()
+        document = mkfParser.MakefileDocument(data)
 
         # do not change project name intentionally
-        # data = makefile.searchAndCleanData(data, makefile.mkfStr.projectName)
+        # makefile.cleanVariable(document, makefile.mkfStr.projectName)
 
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.cSources)
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.asmSources)
+        makefile.cleanVariable(document, makefile.mkfStr.cSources)
+        makefile.cleanVariable(document, makefile.mkfStr.asmSources)
 
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.cDefines)
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.asmDefines)
+        makefile.cleanVariable(document, makefile.mkfStr.cDefines)
+        makefile.cleanVariable(document, makefile.mkfStr.asmDefines)
 
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.cIncludes)
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.asmIncludes)
-
-        data = makefile.searchAndCleanData(data, makefile.mkfStr.cIncludes)
+        makefile.cleanVariable(document, makefile.mkfStr.cIncludes)
+        makefile.cleanVariable(document, makefile.mkfStr.asmIncludes)
 
         print("Makefile template prepared.")
-        return data
+        return document.getLines()
 
     except Exception as err:
         errorMsg = "Exception during Makefile template preparation:\n" + str(err)
@@ -416,22 +416,24 @@ def createNewMakefile(paths: Paths, keilProjData: KeilProjectData, newMakefileDa
     '''
     makefile = mkf.Makefile()
     try:
+        document = mkfParser.MakefileDocument(newMakefileData)
+
         # sources
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.cSources, keilProjData.cSources)
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.asmSources, keilProjData.asmSources)
+        makefile.appendToVariable(document, makefile.mkfStr.cSources, keilProjData.cSources)
+        makefile.appendToVariable(document, makefile.mkfStr.asmSources, keilProjData.asmSources)
 
         # includes
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.cIncludes, keilProjData.cIncludes, preappend='-I')
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.asmIncludes, keilProjData.asmIncludes, preappend='-I')
+        makefile.appendToVariable(document, makefile.mkfStr.cIncludes, keilProjData.cIncludes, preappend='-I')
+        makefile.appendToVariable(document, makefile.mkfStr.asmIncludes, keilProjData.asmIncludes, preappend='-I')
 
         # defines
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.cDefines, keilProjData.cDefines, preappend='-D')
-        data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.asmDefines, keilProjData.asmDefines, preappend='-D')
+        makefile.appendToVariable(document, makefile.mkfStr.cDefines, keilProjData.cDefines, preappend='-D')
+        makefile.appendToVariable(document, makefile.mkfStr.asmDefines, keilProjData.asmDefines, preappend='-D')
 
         # compiler flags
         # TODO should import?
-        # data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.cFlags, keilProjData.cCompilerSettings)
-        # data = makefile.searchAndAppend(newMakefileData, makefile.mkfStr.asmFlags, keilProjData.asmCompilerSettings)
+        # makefile.appendToVariable(document, makefile.mkfStr.cFlags, keilProjData.cCompilerSettings)
+        # makefile.appendToVariable(document, makefile.mkfStr.asmFlags, keilProjData.asmCompilerSettings)
         if keilProjData.cCompilerSettings:
             print("WARNING: C compiler settings not imported (user must handle manualy):", str(keilProjData.cCompilerSettings))
         if keilProjData.asmCompilerSettings:
@@ -440,7 +442,7 @@ def createNewMakefile(paths: Paths, keilProjData: KeilProjectData, newMakefileDa
             print("WARNING: Linker settings not imported (user must handle manualy):", str(keilProjData.linkerSettings))
 
         with open(paths.outputMakefile, 'w+') as newMakefileHandler:
-            newMakefileHandler.writelines(data)
+            newMakefileHandler.writelines(document.getLines())
 
         print("Makefile created in: " + paths.outputMakefile)
 
@@ -0,0 +1,951 @@
+'''
+In-process evaluation of CubeMX generated Makefiles.
+
+Makefile variables (C_SOURCES, CFLAGS, LDFLAGS, ...) are resolved with python, without calling 'make'. Only the subset
+of GNU Make syntax that CubeMX (and 'update*.py' scripts) emit is supported:
+    - '=', ':=', '::=', '+=' and '?=' variable assignments, line continuations ('\\') and comments
+    - 'ifdef', 'ifndef', 'ifeq', 'ifneq', 'else' and 'endif' conditionals
+    - variable references, substitution references ($(VAR:.c=.o)) and automatic variables ($@, $*, ...)
+    - common text and file name functions: $(addprefix ...), $(notdir ...), $(sort $(dir ...)), ...
+
+Rules and recipes are skipped. If any other construct is found, MakefileEvaluatorError is raised and caller should
+fall back to calling 'make' (see 'updateMakefile.py').
+Variable values are raw Makefile text (quotes and backslashes as written). What 'make' passes to a command (or prints
+with '@echo') is the same text after shell quote removal, see getShellEchoOutput().
+
+MakefileDocument is an editable model of Makefile lines, used to modify variable blocks (C_SOURCES, C_DEFS, ...) and
+Makefile header without rescanning Makefile for each change.
+'''
+import glob
+import os
+import re
+
+import utilities as utils
+
+__version__ = utils.__version__
+
+
+class MakefileEvaluatorError(Exception):
+    '''
+    Raised when Makefile contains a construct that can't be evaluated by MakefileEvaluator.
+    '''
+    pass
+
+
+class MakefileEvaluator():
+    # variable flavors and origins
+    RECURSIVE = 'recursive'
+    SIMPLE = 'simple'
+
+    ORIGIN_ENVIRONMENT = 'environment'
+    ORIGIN_FILE = 'file'
+    ORIGIN_COMMAND_LINE = 'command line'
+    ORIGIN_OVERRIDE = 'override'
+
+    # directives that are ignored (they have no effect on variable values)
+    ignoredDirectives = ['vpath', 'unexport']
+    # directives that could change variable values, but are not supported
+    unsupportedDirectives = ['define', 'endef', 'undefine', 'include', 'sinclude', 'load', 'private']
+
+    assignmentRegex = re.compile(r'^([A-Za-z0-9_.\-]+)\s*(::=|:=|\+=|\?=|!=|=)\s*(.*)$')
+
+    def __init__(self, makefileLines, commandLineVariables=None, basePath=None, environment=None):
+        '''
+        'makefileLines' is a list of Makefile lines (as returned by readlines()).
+        'commandLineVariables' are variables passed to 'make' in a command line (ex.: {'GCC_PATH': '...'}).
+        'basePath' is a folder where 'make' would be executed (relative paths, $(wildcard ...)).
+        'environment' is a dictionary of environment variables ('os.environ' by default).
+        '''
+        if basePath is None:
+            basePath = os.getcwd()
+        self.basePath = basePath
+
+        if environment is None:
+            environment = os.environ
+
+        self.variables = {}  # name: [flavor, value, origin]
+        for name, value in environment.items():
+            self.variables[name] = [self.RECURSIVE, value, self.ORIGIN_ENVIRONMENT]
+        self.variables['CURDIR'] = [self.SIMPLE, utils.pathWithForwardSlashes(basePath), self.ORIGIN_FILE]
+
+        if commandLineVariables is not None:
+            for name, value in commandLineVariables.items():
+                self.variables[name] = [self.RECURSIVE, value, self.ORIGIN_COMMAND_LINE]
+
+        self.expanding = []  # names of recursive variables that are currently expanded (self reference check)
+
+        self.parseMakefile(makefileLines)
+
+    ####################################################################################################################
+    # Makefile parsing
+    ####################################################################################################################
+    def parseMakefile(self, makefileLines):
+        '''
+        Evaluate all variable assignments and conditionals in Makefile.
+        '''
+        conditionals = []  # stack of [isActive, wasAnyBranchActive, isParentActive]
+        inRuleContext = False
+
+        for lineNumber, line, isRecipe in self.getLogicalLines(makefileLines, lambda: inRuleContext):
+            isActive = (not conditionals) or conditionals[-1][0]
+            if isRecipe:
+                continue  # recipe lines don't change variables
+
+            line = self.stripComment(line).strip()
+            if line == '':
+                continue
+
+            directive, arguments = (re.split(r'\s+', line, 1) + [''])[:2]
+
+            # conditionals are tracked even if inside inactive block
+            if directive in ['ifdef', 'ifndef', 'ifeq', 'ifneq']:
+                if isActive:
+                    result = self.evaluateConditional(directive, arguments, lineNumber)
+                else:
+                    result = False
+                conditionals.append([result, result, isActive])
+                continue
+
+            elif directive == 'else':
+                if not conditionals:
+                    self.raiseError("'else' without 'if'", lineNumber)
+                conditional = conditionals[-1]
+                if arguments == '':
+                    conditional[0] = conditional[2] and (not conditional[1])
+                else:  # 'else ifeq ...'
+                    elseDirective, elseArguments = (re.split(r'\s+', arguments, 1) + [''])[:2]
+                    if elseDirective not in ['ifdef', 'ifndef', 'ifeq', 'ifneq']:
+                        self.raiseError("invalid 'else' syntax", lineNumber)
+                    if conditional[2] and (not conditional[1]):
+                        conditional[0] = self.evaluateConditional(elseDirective, elseArguments, lineNumber)
+                    else:
+                        conditional[0] = False
+                conditional[1] = conditional[1] or conditional[0]
+                continue
+
+            elif directive == 'endif':
+                if not conditionals:
+                    self.raiseError("'endif' without 'if'", lineNumber)
+                conditionals.pop()
+                continue
+
+            if not isActive:
+                continue
+
+            if directive in self.ignoredDirectives:
+                continue
+            elif directive in self.unsupportedDirectives:
+                self.raiseError("unsupported '" + directive + "' directive", lineNumber)
+            elif directive == '-include':
+                self.checkOptionalInclude(arguments, lineNumber)
+                continue
+
+            origin = self.ORIGIN_FILE
+            if directive == 'export':
+                if self.assignmentRegex.match(arguments) is None:
+                    continue  # 'export VARIABLE' has no effect on variable values
+                line = arguments
+            elif directive == 'override':
+                origin = self.ORIGIN_OVERRIDE
+                line = arguments
+
+            assignment = self.assignmentRegex.match(line)
+            if assignment is not None:
+                inRuleContext = False
+                name, operator, value = assignment.groups()
+                self.assignVariable(name, operator, value, origin, lineNumber)
+
+            elif self.getRuleSeparatorIndex(line) != -1:
+                inRuleContext = True
+                separatorIndex = self.getRuleSeparatorIndex(line)
+                if line[separatorIndex + 1:].split(';')[0].find('=') != -1:
+                    self.raiseError("target-specific variables are not supported", lineNumber)
+
+            else:
+                self.raiseError("unknown Makefile syntax: '" + line + "'", lineNumber)
+
+        if conditionals:
+            self.raiseError("missing 'endif'", None)
+
+    def getLogicalLines(self, makefileLines, isInRuleContext):
+        '''
+        Generator of (lineNumber, logicalLine, isRecipe) tuples. Lines that end with '\\' are joined with the next line
+        (backslash, new line and surrounding white space are replaced with a single space).
+        Lines starting with a tab character inside rule context are recipe lines.
+        '''
+        lineIndex = 0
+        numOfLines = len(makefileLines)
+        while lineIndex < numOfLines:
+            lineNumber = lineIndex + 1
+            line = makefileLines[lineIndex].rstrip('\r\n')
+            isRecipe = line.startswith('\t') and isInRuleContext()
+
+            while self.isContinuedLine(line) and (lineIndex + 1 < numOfLines):
+                lineIndex = lineIndex + 1
+                nextLine = makefileLines[lineIndex].rstrip('\r\n')
+                if isRecipe:
+                    line = line + '\n' + nextLine
+                else:
+                    line = line[:-1].rstrip() + ' ' + nextLine.lstrip()
+            lineIndex = lineIndex + 1
+
+            yield lineNumber, line, isRecipe
+
+    def isContinuedLine(self, line):
+        '''
+        Return True if line ends with an odd number of '\\' characters.
+        '''
+        numOfBackslashes = len(line) - len(line.rstrip('\\'))
+        return (numOfBackslashes % 2) == 1
+
+    def stripComment(self, line):
+        '''
+        Remove comment (starting with '#' that is not escaped with '\\') from line.
+        '''
+        charIndex = line.find('#')
+        while charIndex != -1:
+            if (charIndex > 0) and (line[charIndex - 1] == '\\'):
+                line = line[:charIndex - 1] + line[charIndex:]  # '\#' is a literal '#'
+                charIndex = line.find('#', charIndex)
+            else:
+                return line[:charIndex]
+
+        return line
+
+    def getRuleSeparatorIndex(self, line):
+        '''
+        Return index of ':' character that separates targets from prerequisites (outside of variable references).
+        Returns -1 if this is not a rule.
+        '''
+        depth = 0
+        for charIndex, char in enumerate(line):
+            if char in '({':
+                depth = depth + 1
+            elif char in ')}':
+                depth = depth - 1
+            elif (char == ':') and (depth == 0):
+                return charIndex
+
+        return -1
+
+    def checkOptionalInclude(self, arguments, lineNumber):
+        '''
+        Optional includes of dependency files ('-include $(wildcard $(BUILD_DIR)/*.d)') contain only rules and are
+        ignored. Any other existing optional include file can define variables and is not supported.
+        '''
+        for fileName in self.expand(arguments).split():
+            if fileName.endswith('.d'):
+                continue
+            if os.path.exists(os.path.join(self.basePath, fileName)):
+                self.raiseError("unsupported include of '" + fileName + "'", lineNumber)
+
+    def evaluateConditional(self, directive, arguments, lineNumber):
+        '''
+        Evaluate 'ifdef', 'ifndef', 'ifeq' or 'ifneq' conditional. Returns True if condition is met.
+        '''
+        if directive in ['ifdef', 'ifndef']:
+            name = self.expand(arguments).strip()
+            isDefined = (name in self.variables) and (self.variables[name][1] != '')  # value is not expanded
+            if directive == 'ifdef':
+                return isDefined
+            else:
+                return not isDefined
+
+        # 'ifeq'/'ifneq': '(a,b)', '"a" "b"' or "'a' 'b'" syntax
+        if arguments.startswith('(') and arguments.endswith(')'):
+            items = self.splitArguments(arguments[1:-1], 2)
+            if len(items) != 2:
+                self.raiseError("invalid '" + directive + "' syntax", lineNumber)
+            first = items[0].strip()
+            second = items[1].strip()
+        else:
+            quotedItems = re.match(r'''^("[^"]*"|'[^']*')\s+("[^"]*"|'[^']*')$''', arguments)
+            if quotedItems is None:
+                self.raiseError("invalid '" + directive + "' syntax", lineNumber)
+            first = quotedItems.group(1)[1:-1]
+            second = quotedItems.group(2)[1:-1]
+
+        isEqual = (self.expand(first) == self.expand(second))
+        if directive == 'ifeq':
+            return isEqual
+        else:
+            return not isEqual
+
+    def assignVariable(self, name, operator, value, origin, lineNumber):
+        '''
+        Assign variable according to GNU Make assignment operator and variable origin priorities.
+        '''
+        if name in self.variables:
+            currentOrigin = self.variables[name][2]
+            if currentOrigin in [self.ORIGIN_COMMAND_LINE, self.ORIGIN_OVERRIDE] and origin != self.ORIGIN_OVERRIDE:
+                return  # command line variables can't be changed by Makefile
+        else:
+            currentOrigin = None
+
+        if operator == '!=':
+            self.raiseError("shell assignment ('!=') is not supported", lineNumber)
+
+        elif operator == '=':
+            self.variables[name] = [self.RECURSIVE, value, origin]
+
+        elif operator in [':=', '::=']:
+            self.variables[name] = [self.SIMPLE, self.expand(value), origin]
+
+        elif operator == '?=':
+            if currentOrigin is None:
+                self.variables[name] = [self.RECURSIVE, value, origin]
+
+        elif operator == '+=':
+            if currentOrigin is None:
+                self.variables[name] = [self.RECURSIVE, value, origin]
+            else:
+                flavor, currentValue, _ = self.variables[name]
+                if flavor == self.SIMPLE:
+                    value = self.expand(value)
+                if currentValue != '':
+                    value = currentValue + ' ' + value
+                self.variables[name] = [flavor, value, origin]
+
+    def raiseError(self, msg, lineNumber):
+        if lineNumber is not None:
+            msg = "line " + str(lineNumber) + ": " + msg
+        raise MakefileEvaluatorError(msg)
+
+    ####################################################################################################################
+    # Expansion
+    ####################################################################################################################
+    def getVariable(self, name, automaticVariables=None):
+        '''
+        Return expanded value of a variable (empty string for undefined variables).
+        'automaticVariables' is a dictionary of automatic variables values, ex.: {'@': 'build/main.o', '<': 'main.c'}
+        '''
+        return self.expand('$(' + name + ')', automaticVariables)
+
+    def expand(self, text, automaticVariables=None):
+        '''
+        Expand all variable and function references in 'text'.
+        '''
+        if automaticVariables is None:
+            automaticVariables = {}
+
+        result = []
+        charIndex = 0
+        textLength = len(text)
+        while charIndex < textLength:
+            dollarIndex = text.find('$', charIndex)
+            if dollarIndex == -1:
+                result.append(text[charIndex:])
+                break
+            result.append(text[charIndex:dollarIndex])
+
+            if dollarIndex + 1 >= textLength:
+                break  # single '$' at the end is ignored
+            char = text[dollarIndex + 1]
+
+            if char == '$':
+                result.append('$')
+                charIndex = dollarIndex + 2
+
+            elif char in '({':
+                closingChar = ')' if char == '(' else '}'
+                endIndex = self.findClosingBracket(text, dollarIndex + 1, char, closingChar)
+                reference = text[dollarIndex + 2:endIndex]
+                result.append(self.expandReference(reference, automaticVariables))
+                charIndex = endIndex + 1
+
+            else:  # single character variable name
+                result.append(self.expandVariable(char, automaticVariables))
+                charIndex = dollarIndex + 2
+
+        return ''.join(result)
+
+    def findClosingBracket(self, text, openIndex, openingChar, closingChar):
+        depth = 0
+        for charIndex in range(openIndex, len(text)):
+            if text[charIndex] == openingChar:
+                depth = depth + 1
+            elif text[charIndex] == closingChar:
+                depth = depth - 1
+                if depth == 0:
+                    return charIndex
+
+        raise MakefileEvaluatorError("unterminated variable reference: '" + text + "'")
+
+    def expandReference(self, reference, automaticVariables):
+        '''
+        Expand content of '$(...)': function call, substitution reference or variable reference.
+        '''
+        functionMatch = re.match(r'^([a-z\-]+)\s', reference)
+        if functionMatch is not None:
+            functionName = functionMatch.group(1)
+            if functionName in self.functions:
+                functionArguments = reference[functionMatch.end():].lstrip()
+                return self.functions[functionName](self, functionArguments, automaticVariables)
+            elif functionName in self.unsupportedFunctions:
+                raise MakefileEvaluatorError("unsupported function: '" + functionName + "'")
+
+        colonIndex = self.getTopLevelCharIndex(reference, ':')
+        if colonIndex != -1:
+            # substitution reference: $(VARIABLE:a=b) or $(VARIABLE:%.a=%.b)
+            name = self.expand(reference[:colonIndex], automaticVariables)
+            substitution = reference[colonIndex + 1:]
+            if substitution.find('=') == -1:
+                raise MakefileEvaluatorError("invalid variable reference: '" + reference + "'")
+            pattern, _, replacement = substitution.partition('=')
+            pattern = self.expand(pattern, automaticVariables)
+            replacement = self.expand(replacement, automaticVariables)
+            if pattern.find('%') == -1:
+                pattern = '%' + pattern
+                replacement = '%' + replacement
+            words = self.expandVariable(name, automaticVariables).split()
+            return ' '.join(self.patternSubstitute(pattern, replacement, words))
+
+        name = self.expand(reference, automaticVariables)
+        return self.expandVariable(name, automaticVariables)
+
+    def expandVariable(self, name, automaticVariables):
+        if name in automaticVariables:
+            return automaticVariables[name]
+
+        if (len(name) == 2) and (name[1] in 'DF') and (name[0] in automaticVariables):
+            # $(@D), $(@F), ...
+            value = automaticVariables[name[0]]
+            if name[1] == 'D':
+                return ' '.join([self.getDirectory(word).rstrip('/') or '.' for word in value.split()])
+            else:
+                return ' '.join([word.rpartition('/')[2] for word in value.split()])
+
+        if name not in self.variables:
+            return ''
+
+        flavor, value, _ = self.variables[name]
+        if flavor == self.SIMPLE:
+            return value
+
+        if name in self.expanding:
+            raise MakefileEvaluatorError("recursive variable '" + name + "' references itself")
+        self.expanding.append(name)
+        try:
+            return self.expand(value, automaticVariables)
+        finally:
+            self.expanding.pop()
+
+    def getTopLevelCharIndex(self, text, char):
+        '''
+        Return index of 'char' in 'text', that is not inside nested variable reference. Returns -1 if not found.
+        '''
+        depth = 0
+        for charIndex, textChar in enumerate(text):
+            if textChar in '({':
+                depth = depth + 1
+            elif textChar in ')}':
+                depth = depth - 1
+            elif (textChar == char) and (depth == 0):
+                return charIndex
+
+        return -1
+
+    def splitArguments(self, text, maxNumOfArguments):
+        '''
+        Split function arguments on top-level commas. The last argument contains all remaining commas.
+        '''
+        arguments = []
+        while len(arguments) < (maxNumOfArguments - 1):
+            commaIndex = self.getTopLevelCharIndex(text, ',')
+            if commaIndex == -1:
+                break
+            arguments.append(text[:commaIndex])
+            text = text[commaIndex + 1:]
+        arguments.append(text)
+
+        return arguments
+
+    def getArguments(self, text, numOfArguments, automaticVariables):
+        '''
+        Split and expand function arguments.
+        '''
+        arguments = self.splitArguments(text, numOfArguments)
+        if len(arguments) != numOfArguments:
+            raise MakefileEvaluatorError("invalid number of function arguments: '" + text + "'")
+
+        return [self.expand(argument, automaticVariables) for argument in arguments]
+
+    def matchPattern(self, pattern, word):
+        '''
+        Match 'word' with 'pattern' that can contain '%' wildcard. Returns matched stem or None if word doesn't match.
+        '''
+        if pattern.find('%') == -1:
+            if word == pattern:
+                return ''
+            return None
+
+        prefix, _, suffix = pattern.partition('%')
+        if word.startswith(prefix) and word.endswith(suffix) and (len(word) >= len(prefix) + len(suffix)):
+            return word[len(prefix):len(word) - len(suffix)]
+
+        return None
+
+    def patternSubstitute(self, pattern, replacement, words):
+        '''
+        Replace words matching 'pattern' (containing '%' wildcard) with 'replacement'. Other words are unchanged.
+        '''
+        newWords = []
+        for word in words:
+            stem = self.matchPattern(pattern, word)
+            if stem is not None:
+                if pattern.find('%') != -1:
+                    word = replacement.replace('%', stem, 1)
+                else:
+                    word = replacement
+            newWords.append(word)
+
+        return newWords
+
+    def getDirectory(self, word):
+        slashIndex = word.rfind('/')
+        if slashIndex == -1:
+            return './'
+        return word[:slashIndex + 1]
+
+    ####################################################################################################################
+    # Functions
+    ####################################################################################################################
+    def functionSubst(self, text, automaticVariables):
+        fromString, toString, text = self.getArguments(text, 3, automaticVariables)
+        return text.replace(fromString, toString)
+
+    def functionPatsubst(self, text, automaticVariables):
+        pattern, replacement, text = self.getArguments(text, 3, automaticVariables)
+        return ' '.join(self.patternSubstitute(pattern.strip(), replacement.strip(), text.split()))
+
+    def functionStrip(self, text, automaticVariables):
+        return ' '.join(self.expand(text, automaticVariables).split())
+
+    def functionFindstring(self, text, automaticVariables):
+        findString, text = self.getArguments(text, 2, automaticVariables)
+        if text.find(findString) != -1:
+            return findString
+        return ''
+
+    def functionFilter(self, text, automaticVariables, filterOut=False):
+        patterns, text = self.getArguments(text, 2, automaticVariables)
+        patterns = patterns.split()
+
+        words = []
+        for word in text.split():
+            isMatch = False
+            for pattern in patterns:
+                if self.matchPattern(pattern, word) is not None:
+                    isMatch = True
+                    break
+            if isMatch != filterOut:
+                words.append(word)
+
+        return ' '.join(words)
+
+    def functionFilterOut(self, text, automaticVariables):
+        return self.functionFilter(text, automaticVariables, filterOut=True)
+
+    def functionSort(self, text, automaticVariables):
+        return ' '.join(sorted(set(self.expand(text, automaticVariables).split())))
+
+    def functionWord(self, text, automaticVariables):
+        index, text = self.getArguments(text, 2, automaticVariables)
+        words = text.split()
+        index = int(index.strip())
+        if index < 1:
+            raise MakefileEvaluatorError("invalid 'word' index: " + str(index))
+        if index > len(words):
+            return ''
+        return words[index - 1]
+
+    def functionWordlist(self, text, automaticVariables):
+        start, end, text = self.getArguments(text, 3, automaticVariables)
+        words = text.split()
+        return ' '.join(words[int(start.strip()) - 1:int(end.strip())])
+
+    def functionWords(self, text, automaticVariables):
+        return str(len(self.expand(text, automaticVariables).split()))
+
+    def functionFirstword(self, text, automaticVariables):
+        words = self.expand(text, automaticVariables).split()
+        return words[0] if words else ''
+
+    def functionLastword(self, text, automaticVariables):
+        words = self.expand(text, automaticVariables).split()
+        return words[-1] if words else ''
+
+    def functionDir(self, text, automaticVariables):
+        return ' '.join([self.getDirectory(word) for word in self.expand(text, automaticVariables).split()])
+
+    def functionNotdir(self, text, automaticVariables):
+        return ' '.join([word.rpartition('/')[2] for word in self.expand(text, automaticVariables).split()])
+
+    def functionSuffix(self, text, automaticVariables):
+        suffixes = []
+        for word in self.expand(text, automaticVariables).split():
+            _, extension = os.path.splitext(word.rpartition('/')[2])
+            if extension != '':
+                suffixes.append(extension)
+        return ' '.join(suffixes)
+
+    def functionBasename(self, text, automaticVariables):
+        names = []
+        for word in self.expand(text, automaticVariables).split():
+            folder, _, fileName = word.rpartition('/')
+            fileName, _ = os.path.splitext(fileName)
+            if folder != '' or word.startswith('/'):
+                fileName = folder + '/' + fileName
+            names.append(fileName)
+        return ' '.join(names)
+
+    def functionAddsuffix(self, text, automaticVariables):
+        suffix, text = self.getArguments(text, 2, automaticVariables)
+        return ' '.join([word + suffix for word in text.split()])
+
+    def functionAddprefix(self, text, automaticVariables):
+        prefix, text = self.getArguments(text, 2, automaticVariables)
+        return ' '.join([prefix + word for word in text.split()])
+
+    def functionJoin(self, text, automaticVariables):
+        first, second = self.getArguments(text, 2, automaticVariables)
+        firstWords = first.split()
+        secondWords = second.split()
+        words = []
+        for wordIndex in range(max(len(firstWords), len(secondWords))):
+            word = ''
+            if wordIndex < len(firstWords):
+                word += firstWords[wordIndex]
+            if wordIndex < len(secondWords):
+                word += secondWords[wordIndex]
+            words.append(word)
+        return ' '.join(words)
+
+    def functionWildcard(self, text, automaticVariables):
+        files = []
+        for pattern in self.expand(text, automaticVariables).split():
+            for filePath in sorted(glob.glob(os.path.join(self.basePath, pattern))):
+                if not os.path.isabs(pattern):
+                    filePath = os.path.relpath(filePath, self.basePath)
+                files.append(utils.pathWithForwardSlashes(filePath))
+        return ' '.join(files)
+
+    def functionIf(self, text, automaticVariables):
+        arguments = self.splitArguments(text, 3)
+        if len(arguments) < 2:
+            raise MakefileEvaluatorError("invalid number of function arguments: '" + text + "'")
+
+        if self.expand(arguments[0], automaticVariables).strip() != '':
+            return self.expand(arguments[1], automaticVariables)
+        elif len(arguments) == 3:
+            return self.expand(arguments[2], automaticVariables)
+        return ''
+
+    def functionOr(self, text, automaticVariables):
+        for argument in self.splitArguments(text, len(text) + 1):
+            value = self.expand(argument, automaticVariables).strip()
+            if value != '':
+                return value
+        return ''
+
+    def functionAnd(self, text, automaticVariables):
+        value = ''
+        for argument in self.splitArguments(text, len(text) + 1):
+            value = self.expand(argument, automaticVariables).strip()
+            if value == '':
+                return ''
+        return value
+
+    def functionForeach(self, text, automaticVariables):
+        arguments = self.splitArguments(text, 3)
+        if len(arguments) != 3:
+            raise MakefileEvaluatorError("invalid number of function arguments: '" + text + "'")
+        name = self.expand(arguments[0], automaticVariables).strip()
+        words = self.expand(arguments[1], automaticVariables).split()
+
+        results = []
+        for word in words:
+            loopVariables = dict(automaticVariables)
+            loopVariables[name] = word
+            results.append(self.expand(arguments[2], loopVariables))
+        return ' '.join(results)
+
+    functions = {
+        'subst': functionSubst,
+        'patsubst': functionPatsubst,
+        'strip': functionStrip,
+        'findstring': functionFindstring,
+        'filter': functionFilter,
+        'filter-out': functionFilterOut,
+        'sort': functionSort,
+        'word': functionWord,
+        'wordlist': functionWordlist,
+        'words': functionWords,
+        'firstword': functionFirstword,
+        'lastword': functionLastword,
+        'dir': functionDir,
+        'notdir': functionNotdir,
+        'suffix': functionSuffix,
+        'basename': functionBasename,
+        'addsuffix': functionAddsuffix,
+        'addprefix': functionAddprefix,
+        'join': functionJoin,
+        'wildcard': functionWildcard,
+        'if': functionIf,
+        'or': functionOr,
+        'and': functionAnd,
+        'foreach': functionForeach
+    }
+
+    # functions with side effects or values that depend on 'make' internals
+    unsupportedFunctions = [
+        'shell', 'eval', 'call', 'value', 'origin', 'flavor', 'file', 'error', 'warning', 'info', 'abspath',
+        'realpath', 'guile', 'let', 'intcmp'
+    ]
+
+
+# unquoted characters that POSIX shell would expand or interpret (variables, commands, globs, redirections, ...)
+shellSpecialCharacters = '$`*?[;&|<>()'
+shellSpecialWordStartCharacters = '#~'  # comment, home folder
+
+
+def getShellEchoOutput(text):
+    '''
+    Returns output of POSIX shell 'echo <text>' (as Makefile recipe '@echo' prints it, and the same arguments as
+    compiler receives from 'make'): words are split on unquoted whitespace, quotes are removed, backslash escapes are
+    resolved and words are joined with single spaces. For example: '-DVER=\\"1.0\\" -MF"a.d"' -> '-DVER="1.0" -MFa.d'.
+    Raises MakefileEvaluatorError if 'text' contains shell syntax that would be expanded or executed by shell
+    (variables, commands, globs, ...) or unbalanced quotes, since output then depends on shell.
+    '''
+    words = []
+    word = None  # None: between words
+    quote = None
+    charIndex = 0
+    while charIndex < len(text):
+        char = text[charIndex]
+        if quote == "'":
+            if char == "'":
+                quote = None
+            else:
+                word += char
+        elif quote == '"':
+            if char == '"':
+                quote = None
+            elif (char == '\\') and (text[charIndex + 1:charIndex + 2] in ['$', '`', '"', '\\']):
+                charIndex += 1
+                word += text[charIndex]
+            elif char in '$`':
+                raise MakefileEvaluatorError("shell expansion in value: '" + text + "'")
+            else:
+                word += char
+        elif char in ' \t':
+            if word is not None:
+                words.append(word)
+                word = None
+        else:
+            if (word is None) and (char in shellSpecialWordStartCharacters):
+                raise MakefileEvaluatorError("shell syntax in value: '" + text + "'")
+            if word is None:
+                word = ''
+
+            if char in ['"', "'"]:
+                quote = char
+            elif char == '\\':
+                if charIndex + 1 == len(text):
+                    raise MakefileEvaluatorError("trailing backslash in value: '" + text + "'")
+                charIndex += 1
+                word += text[charIndex]
+            elif char in shellSpecialCharacters:
+                raise MakefileEvaluatorError("shell syntax in value: '" + text + "'")
+            else:
+                word += char
+        charIndex += 1
+
+    if quote is not None:
+        raise MakefileEvaluatorError("unbalanced quotes in value: '" + text + "'")
+    if word is not None:
+        words.append(word)
+
+    return ' '.join(words)
+
+
+class MakefileDocument():
+    '''
+    Makefile lines split to chunks: header, variable blocks (assignment line with its '\\' continuation lines) and
+    other lines in between. Index of variable blocks (first assignment of each variable) is built once, so any
+    variable block can be edited in place, without shifting the rest of Makefile lines. Edited document is serialized
+    to lines with getLines() in one pass.
+    '''
+    assignmentRegex = re.compile(r'^([A-Za-z0-9_.\-]+)\s*(::=|:=|\+=|\?=|!=|=)')
+
+    def __init__(self, makefileLines, headerEndString="# target"):
+        '''
+        'makefileLines' is a list of Makefile lines (as returned by readlines()). Items with multiple lines are split.
+        Header are all lines before the first '######' line above 'headerEndString' line (excluding empty line).
+        '''
+        lines = ''.join(makefileLines).splitlines(True)
+
+        self.chunks = []  # list of list of lines
+        self.variableBlocks = {}  # variable name: chunk index
+        self.headerChunkIndex = None
+
+        headerEndLineIndex = self.getHeaderEndLineIndex(lines, headerEndString)
+        if headerEndLineIndex is not None:
+            self.headerChunkIndex = len(self.chunks)
+            self.chunks.append(lines[:headerEndLineIndex])
+        else:
+            headerEndLineIndex = 0
+
+        otherLines = []
+        lineIndex = headerEndLineIndex
+        numOfLines = len(lines)
+        while lineIndex < numOfLines:
+            blockEndLineIndex = self.getBlockEndLineIndex(lines, lineIndex)
+
+            assignment = None
+            if not lines[lineIndex].startswith('\t'):  # recipe lines are not assignments
+                assignment = self.assignmentRegex.match(lines[lineIndex])
+            if (assignment is not None) and (assignment.group(1) not in self.variableBlocks):
+                if otherLines:
+                    self.chunks.append(otherLines)
+                    otherLines = []
+                self.variableBlocks[assignment.group(1)] = len(self.chunks)
+                self.chunks.append(lines[lineIndex:blockEndLineIndex])
+            else:
+                otherLines.extend(lines[lineIndex:blockEndLineIndex])
+
+            lineIndex = blockEndLineIndex
+
+        if otherLines:
+            self.chunks.append(otherLines)
+
+    def getHeaderEndLineIndex(self, lines, headerEndString):
+        '''
+        Return index of the first line after header or None if 'headerEndString' is not found.
+        '''
+        for lineIndex in range(len(lines) - 2):
+            if lines[lineIndex + 2].find(headerEndString) != -1:  # first line is ######... and second is '# target'
+                return lineIndex
+
+        return None
+
+    def getBlockEndLineIndex(self, lines, lineIndex):
+        '''
+        Return index of the first line after line 'lineIndex' and its '\\' continuation lines. Continuation ends on
+        an empty line.
+        '''
+        lineIndex = lineIndex + 1
+        while (lineIndex < len(lines)) and lines[lineIndex - 1].rstrip('\n').endswith('\\'):
+            if lines[lineIndex].rstrip('\n') == '':
+                break
+            lineIndex = lineIndex + 1
+
+        return lineIndex
+
+    def getLines(self):
+        '''
+        Return list of all document lines.
+        '''
+        lines = []
+        for chunk in self.chunks:
+            lines.extend(chunk)
+
+        return lines
+
+    def hasVariable(self, name):
+        return name in self.variableBlocks
+
+    def getVariableBlock(self, name):
+        '''
+        Return list of lines of variable 'name' block (the first assignment of this variable).
+        '''
+        return self.chunks[self.variableBlocks[name]]
+
+    def getVariableItems(self, name):
+        '''
+        Return list of items of variable 'name' block, as written in Makefile:
+            - one-liner: all text after '=' as a single item (empty list if there is no text)
+            - multi-liner: one item per continuation line (text in the first line is ignored)
+        '''
+        block = self.getVariableBlock(name)
+
+        if len(block) == 1:
+            value = block[0].rstrip('\n')
+            value = value[value.find('=') + 1:].lstrip(' ')
+            if value != '':
+                return [value]
+            return []
+
+        items = []
+        for line in block[1:]:
+            line = line.rstrip('\n')
+            line = line.rstrip('\\')  # strip of '\'
+            line = line.rstrip(' ')   # strip of ' '
+            items.append(line)
+
+        return items
+
+    def appendToVariable(self, name, items):
+        '''
+        Append list of 'items' to variable 'name' block according to Makefile syntax:
+            - one-liner with one item: item is appended to the same line
+            - one-liner with multiple items: one-liner becomes multi-liner, each item in its own line
+            - multi-liner: items are added at the beginning of block, each item in its own line
+        '''
+        if not items:
+            return
+
+        block = self.getVariableBlock(name)
+        firstLine = block[0].rstrip('\n')
+
+        if len(block) == 1 and not firstLine.endswith('\\'):
+            if len(items) == 1:  # add it without '\'
+                if firstLine[-1] != ' ':  # avoid double spaces
+                    firstLine += " "
+                block[0] = firstLine + items[0] + "\n"
+            else:
+                # this is list with multiple items, '\' will be needed
+                block[0] = firstLine + " \\\n"
+                for itemIndex, item in enumerate(items):
+                    if itemIndex != len(items) - 1:  # for last item do not append "\"
+                        item += "\\"
+                    block.append(item + "\n")
+        else:
+            block[1:1] = [item + " \\\n" for item in items]
+
+    def clearVariable(self, name):
+        '''
+        Delete all items of variable 'name' block. Only 'NAME =' is kept.
+        '''
+        block = self.getVariableBlock(name)
+        firstLine = block[0]
+        equalitySignCharIndex = firstLine.find('=')
+
+        del block[:]
+        block.append(firstLine[:equalitySignCharIndex + 1] + ' \n')
+
+    def replaceHeader(self, headerLines):
+        '''
+        Replace all header lines with 'headerLines'. Returns False if document does not have a header.
+        '''
+        if self.headerChunkIndex is None:
+            return False
+
+        self.chunks[self.headerChunkIndex] = list(headerLines)
+        return True
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    with open(utils.makefilePath, 'r') as makefile:
+        makefileLines = makefile.readlines()
+
+    try:
+        evaluator = MakefileEvaluator(makefileLines, basePath=utils.workspacePath)
+        for name in sorted(evaluator.variables):
+            if evaluator.variables[name][2] != MakefileEvaluator.ORIGIN_ENVIRONMENT:
+                print(name + " = " + evaluator.getVariable(name))
+    except MakefileEvaluatorError as err:
+        print("Makefile can't be evaluated without 'make': " + str(err))
@@ -0,0 +1,329 @@
+'''
+Index of OpenOCD 'scripts' folder: interface, target and board configuration files.
+
+Index is stored in 'openOcdScripts.json' (next to 'toolsPaths.json', shared by all projects) and is built only once per
+OpenOCD executable path and version (size and modification time), so configuration files are found without walking
+OpenOCD folder tree on every update.
+Target configuration files are also indexed by device family (file name without 'x' and suffixes, for example
+'target/stm32f0x.cfg': 'stm32f0'), so target configuration can be suggested from the device name in CubeMX '.ioc'
+file or Makefile defines (for example 'STM32F051x8').
+
+This script can be called standalone to print OpenOCD configuration files detected for this project.
+'''
+import os
+import re
+import json
+import shutil
+
+import utilities as utils
+import updateProfiler as prof
+import updateBuildData as build
+
+__version__ = utils.__version__
+
+configCategories = ['interface', 'target', 'board']  # indexed 'scripts' subfolders
+configFileExtension = '.cfg'
+defaultInterfaceFileName = 'stlink.cfg'  # TODO: currently only ST-Link is supported
+
+
+class OpenOcdScripts():
+    def __init__(self, openOcdPath, workspace=None):
+        '''
+        'openOcdPath' is a path to 'openocd.exe' or a command.
+        '''
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.openOcdPath = openOcdPath
+        self.index = self.getIndex()
+        self.scriptsPath = self.index["scriptsPath"]
+
+    def getIndex(self):
+        '''
+        Returns index of this OpenOCD scripts from 'openOcdScripts.json'. If there is no valid index for this OpenOCD
+        path and version, index is built and stored.
+        '''
+        openOcdVersion = utils.getFileVersion(self.openOcdPath)
+
+        data = self.getIndexFileData()
+        if self.openOcdPath in data["openOcd"]:
+            index = data["openOcd"][self.openOcdPath]
+            if (openOcdVersion is not None) and (index["version"] == openOcdVersion):
+                if utils.pathExists(index["scriptsPath"]):
+                    return index
+
+        index = self.buildIndex(openOcdVersion)
+        if index["scriptsPath"] is not None:
+            data["openOcd"][self.openOcdPath] = index
+            self.overwriteIndexFile(data)
+
+        return index
+
+    def getIndexFileData(self):
+        '''
+        Get data from 'openOcdScripts.json' file. Missing or invalid file (or file of other 'ideScripts' version) is
+        treated as an empty index.
+        '''
+        if utils.pathExists(self.workspace.openOcdScriptsIndexPath):
+            try:
+                with open(self.workspace.openOcdScriptsIndexPath, 'r') as indexFile:
+                    data = json.load(indexFile)
+
+                if data["VERSION"] == __version__:
+                    return data
+
+            except Exception as err:
+                print("Invalid 'openOcdScripts.json' file, OpenOCD scripts index will be rebuilt. Error:\n" + str(err))
+
+        return {"VERSION": __version__, "openOcd": {}}
+
+    def overwriteIndexFile(self, data):
+        '''
+        Overwrite (create) 'openOcdScripts.json' file with new data. Index is a cache, so failure is not an error.
+        '''
+        try:
+            utils.writeFileAtomic(self.workspace.openOcdScriptsIndexPath, json.dumps(data, indent=4, sort_keys=False))
+
+            print("'openOcdScripts.json' file updated!")
+
+        except Exception as err:
+            print("WARNING: unable to write OpenOCD scripts index 'openOcdScripts.json':\n" + str(err))
+
+    def buildIndex(self, openOcdVersion):
+        '''
+        Walk OpenOCD 'scripts' folder and return new index:
+            "configs": {category: {file name: path relative to 'scripts' folder}}
+            "families": {device family: [target configuration paths relative to 'scripts' folder]}
+        If the same file name exists in more subfolders of a category, the least nested one is indexed.
+        '''
+        index = {
+            "version": openOcdVersion,
+            "scriptsPath": self.findScriptsFolder(),
+            "configs": {},
+            "families": {}
+        }
+        for category in configCategories:
+            index["configs"][category] = {}
+        if index["scriptsPath"] is None:
+            return index
+
+        print("Building OpenOCD scripts index: " + index["scriptsPath"])
+        with prof.measure(prof.eventFolderWalk, index["scriptsPath"]):
+            for category in configCategories:
+                categoryPath = os.path.join(index["scriptsPath"], category)
+                configs = {}
+                for dirPath, dirNames, fileNames in os.walk(categoryPath):
+                    dirNames.sort()
+                    for fileName in fileNames:
+                        if fileName.endswith(configFileExtension):
+                            configPath = os.path.relpath(os.path.join(dirPath, fileName), index["scriptsPath"])
+                            configPath = utils.pathWithForwardSlashes(configPath)
+                            if (fileName not in configs) or (configPath.count('/') < configs[fileName].count('/')):
+                                configs[fileName] = configPath
+                index["configs"][category] = configs
+
+        for fileName in sorted(index["configs"]['target'], key=lambda name: (len(name), name)):
+            family = getDeviceFamily(fileName)
+            index["families"].setdefault(family, []).append(index["configs"]['target'][fileName])
+
+        return index
+
+    def findScriptsFolder(self):
+        '''
+        Returns absolute path to OpenOCD 'scripts' folder or None if it can't be found.
+        Official packages have 'scripts' folder in OpenOCD root folder ('../bin/openocd.exe'), system installations
+        in 'share/openocd/scripts'. If none of these exist, folder of 'interface/stlink.cfg' is searched for.
+        '''
+        openOcdExePath = self.openOcdPath
+        if not os.path.isfile(openOcdExePath):
+            with prof.measure(prof.eventCommandLookup, self.openOcdPath):
+                openOcdExePath = shutil.which(self.openOcdPath)
+            if openOcdExePath is None:
+                return None
+
+        rootPaths = []
+        for exePath in [openOcdExePath, os.path.realpath(openOcdExePath)]:
+            rootPath = os.path.dirname(os.path.dirname(os.path.abspath(exePath)))
+            if rootPath not in rootPaths:
+                rootPaths.append(rootPath)
+
+        for rootPath in rootPaths:
+            for scriptsPath in [os.path.join(rootPath, 'scripts'), os.path.join(rootPath, 'share', 'openocd', 'scripts')]:
+                if os.path.isdir(os.path.join(scriptsPath, 'target')):
+                    return utils.pathWithForwardSlashes(scriptsPath)
+
+        for rootPath in rootPaths:
+            interfacePath = utils.findFileInFolderTree(rootPath, defaultInterfaceFileName)
+            if interfacePath is not None:
+                return os.path.dirname(os.path.dirname(interfacePath))  # .../scripts/interface/stlink.cfg
+
+        return None
+
+    def getAbsolutePath(self, configPath):
+        return utils.pathWithForwardSlashes(os.path.join(self.scriptsPath, configPath))
+
+    def getInterfaceConfig(self, fileName=defaultInterfaceFileName):
+        '''
+        Returns absolute path to interface configuration file (like 'stlink.cfg') or None if it is not indexed.
+        '''
+        configPath = self.index["configs"]['interface'].get(fileName)
+        if configPath is None:
+            return None
+        return self.getAbsolutePath(configPath)
+
+    def getTargetConfigs(self, deviceName):
+        '''
+        Returns list of absolute paths to candidate target configuration files for 'deviceName' (like 'STM32F051x8' or
+        'STM32F0'). Device family is the longest indexed family that device name starts with.
+        '''
+        deviceName = deviceName.lower()
+        for length in range(len(deviceName), 0, -1):
+            if deviceName[:length] in self.index["families"]:
+                return [self.getAbsolutePath(path) for path in self.index["families"][deviceName[:length]]]
+
+        return []
+
+    def resolveConfig(self, configPath):
+        '''
+        Returns absolute path to configuration file given by user: absolute path, path relative to OpenOCD 'scripts'
+        folder ('target/stm32f0x.cfg') or just indexed file name ('stm32f0x.cfg'). Returns None if file does not exist.
+        '''
+        if utils.pathExists(configPath):  # file is an absolute path
+            return configPath
+
+        if self.scriptsPath is not None:
+            configPathAbs = self.getAbsolutePath(configPath)
+            if utils.pathExists(configPathAbs):
+                return configPathAbs
+
+            for category in configCategories:
+                if configPath in self.index["configs"][category]:
+                    return self.getAbsolutePath(self.index["configs"][category][configPath])
+
+        return None
+
+
+def getDeviceFamily(fileName):
+    '''
+    Returns device family of target configuration file name: lower case name without extension, suffixes (after '_')
+    and trailing 'x'. For example: 'stm32f0x.cfg', 'stm32f0x_stlink.cfg': 'stm32f0'
+    '''
+    family = fileName[:-len(configFileExtension)].lower()
+    family = family.split('_')[0]
+    if family.endswith('x') and len(family) > 1:
+        family = family[:-1]
+
+    return family
+
+
+def getDeviceNames(workspace=None):
+    '''
+    Returns device names of this project, from the most to the least specific: 'Mcu.Name' and 'Mcu.Family' from CubeMX
+    '.ioc' file and defines from Makefile (like 'STM32F051x8' in 'C_DEFS'). Files are only read, not evaluated.
+    '''
+    workspace = utils.getWorkspace(workspace)
+    deviceNames = []
+
+    if workspace.cubeMxProjectFilePath is not None:
+        iocFilePath = os.path.join(workspace.workspacePath, workspace.cubeMxProjectFilePath)
+        iocData = {}
+        try:
+            with open(iocFilePath, 'r') as iocFile:
+                for line in iocFile:
+                    key, separator, value = line.partition('=')
+                    iocData[key.strip()] = value.strip()
+        except Exception as err:
+            print("WARNING: unable to read CubeMX project file '" + iocFilePath + "':\n" + str(err))
+
+        for key in ['Mcu.Name', 'Mcu.Family']:
+            if iocData.get(key):
+                deviceNames.append(iocData[key])
+
+    makefilePaths = [workspace.makefilePath, workspace.makefileBackupPath]
+    for makefilePath in makefilePaths:
+        if utils.pathExists(makefilePath):
+            with open(makefilePath, 'r') as makefile:
+                for define in re.findall(r"-D(\w+)", makefile.read()):
+                    if define not in deviceNames:
+                        deviceNames.append(define)
+            break
+
+    return deviceNames
+
+
+def getOpenOcdInterface(openOcdPath, workspace=None):
+    '''
+    Get OpenOCD interface file (TODO: currently hard-coded 'stlink.cfg') from OpenOCD scripts index.
+    If such file can't be found ask user for update.
+    Returns absolute path to 'stlink.cfg' file.
+    '''
+    openOcdInterfacePath = OpenOcdScripts(openOcdPath, workspace).getInterfaceConfig()
+    if openOcdInterfacePath is None:
+        openOcdInterfacePath = utils.getUserPath("stlink.cfg interface")
+
+    return openOcdInterfacePath
+
+
+def getOpenOcdConfig(openOcdPath, workspace=None):
+    '''
+    Get OpenOCD target configuration files. If target configuration for this project device is found in OpenOCD scripts
+    index (see getDeviceNames()), user is only asked to confirm it. Otherwise, paths are requested from user,
+    eg. 'interface/stlink.cfg, target/stm32f0x.cfg'. Paths can be passed in absolute or relative form or as file
+    names, separated by comma. Optionally enclosed in " or '.
+    Returns the list of absolute paths to these config files.
+    '''
+    scripts = OpenOcdScripts(openOcdPath, workspace)
+
+    for deviceName in getDeviceNames(workspace):
+        targetConfigs = scripts.getTargetConfigs(deviceName)
+        if targetConfigs:
+            msg = "\n\tOpenOCD target configuration file for '" + deviceName + "' detected: '" + targetConfigs[0] + "'"
+            for targetConfig in targetConfigs[1:]:
+                msg += "\n\t\tOther candidate: '" + targetConfig + "'"
+            msg += "\n\tUse this file? [y/n]: "
+            if utils.getYesNoAnswer(msg):
+                return [targetConfigs[0]]
+            break
+
+    while(True):
+        msg = "\n\tEnter path(s) to OpenOCD configuration file(s):\n\t\t"
+        msg += "Example: 'target/stm32f0x.cfg'. Absolute, relative to OpenOCD /scripts/ folder or just file name.\n\t\t"
+        msg += "If more than one file is needed, separate with comma.\n\t\t"
+        msg += "Paste here and press Enter: "
+        configFilesStr = utils.getUserInput(msg)
+
+        allConfigFiles = []
+        configFiles = configFilesStr.split(',')
+        for theFile in configFiles:
+            # ex.: " C:/asd/foo bar/fail.cfg " , ' C:/asd/bar foo/fail.cfg' ,
+            theFile = theFile.strip()
+            theFile = theFile.strip('\'')
+            theFile = theFile.strip('\"')
+            theFile = theFile.strip()
+            theFile = utils.pathWithForwardSlashes(theFile)
+
+            theFileAbs = scripts.resolveConfig(theFile)
+            if theFileAbs is not None:
+                allConfigFiles.append(theFileAbs)
+            else:
+                msg = "\tConfiguration invalid (file not found): \'" + theFile + "\'"
+                print(msg)
+                break
+        else:
+            break  # break loop if config detected successfully
+        continue  # continue if unsuccessful
+
+    return allConfigFiles
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    bData = build.BuildData()
+    toolsPathsData = bData.getToolsPathsData()
+    openOcdPath = toolsPathsData[bData.bStr.openOcdPath]
+
+    scripts = OpenOcdScripts(openOcdPath)
+    print("\nOpenOCD scripts folder:", scripts.scriptsPath)
+    print("Interface configuration file:", scripts.getInterfaceConfig())
+    for deviceName in getDeviceNames():
+        print("Target configuration files for '" + deviceName + "':", scripts.getTargetConfigs(deviceName))
@@ -11,6 +11,9 @@ launchName_Debug = "Cortex debug"
 launchName_Python = "Debug current Python file"
 
 taskName_build = "Build project"
+taskName_buildNinja = "Build project (Ninja)"
+taskName_buildPython = "Build project (Python)"
+taskName_profileBuild = "Profile build"
 taskName_compile = "Compile current file"
 taskName_clean = "Delete build folder"
 
@@ -39,6 +42,8 @@ c_cpp_template = """{
         "user_cFlags": [],
         "user_asmFlags": [],
         "user_ldFlags": [],
+        "user_compilerCache": "false",
+        "user_precompiledHeader": "false",
 
         "____________________DO_NOT_MODIFY_FIELDS_BELOW____________________": "",
         "cubemx_sourceFiles": [],
@@ -78,6 +83,7 @@ c_cpp_template = """{
             "forcedInclude": [
             ],
             "compilerPath": "${gccExePath}",
+            "compileCommands": "${workspaceFolder}/build/compile_commands.json",
             "cStandard": "c11",
             "cppStandard": "c++17"
         }
@@ -116,6 +122,102 @@ cleanBuildDirFunction += "\t@echo Build folder: '$(BUILD_DIR)' clean request (fi
 cleanBuildDirFunction += "\t@$(foreach file, $(wildcard $(BUILD_DIR)/*), rm -f $(file))\n"
 cleanBuildDirFunction += "\t@echo OK.\n"
 
+#########################################################################################################
+# Command line fingerprints replace 'Makefile' prerequisite of CubeMX rules. Each fingerprinted rule:
+#   fingerprint variable name: [CubeMX rule start, fingerprint file]
+# Fingerprint variable holds rule recipe, expanded when make starts. Fingerprint file holds the recipe of the last build
+# and is rewritten (with all objects that are older) when it differs. Reading files ('$(file <...)') needs GNU make 4.2,
+# older versions keep 'Makefile' prerequisite.
+commandFingerprintRules = {
+    "C_FINGERPRINT": ["$(BUILD_DIR)/%.o: %.c", "$(BUILD_DIR)/c.cmd"],
+    "ASM_FINGERPRINT": ["$(BUILD_DIR)/%.o: %.s", "$(BUILD_DIR)/asm.cmd"],
+    "LD_FINGERPRINT": ["$(BUILD_DIR)/$(TARGET).elf:", "$(BUILD_DIR)/ld.cmd"]
+}
+commandFingerprintFileSuffix = "_FILE"  # fingerprint file variable name: C_FINGERPRINT_FILE, ...
+commandFingerprintChanged = "FINGERPRINT_CHANGED"  # prerequisite of fingerprint file when recipe changed
+commandFingerprintHeader = "#######################################\n"
+commandFingerprintHeader += "# Command line fingerprints\n"
+commandFingerprintHeader += "#######################################\n"
+commandFingerprintHeader += "# Generated by updateMakefile.py: object/target is rebuilt only if its own command line changes.\n"
+commandFingerprintHeader += "# Command lines are expanded when make starts, so variables given to make ('make DEBUG=0') are included.\n"
+commandFingerprintHeader += "# Fingerprint file (*.cmd) is rewritten when command line differs from the one of the previous build.\n"
+commandFingerprintSupported = "ifeq ($(filter 3.% 4.0 4.1,$(MAKE_VERSION)),)\n"
+commandFingerprintFunction = "fingerprintChanged = $(if $(subst x$($(1)),,x$(file <$($(1)" + commandFingerprintFileSuffix + ")))"
+commandFingerprintFunction += "$(subst x$(file <$($(1)" + commandFingerprintFileSuffix + ")),,x$($(1))),"
+commandFingerprintFunction += commandFingerprintChanged + ")\n"
+commandFingerprintRecipe = "\t$(file >$@,$(***))\n"  # '***' is replaced with fingerprint variable name
+
+#########################################################################################################
+# Compiler results cache block is added after line that starts with 'compilerCacheInsertAfter' (after all tools are
+# defined). '***' is replaced with 1 or 0 ('user_compilerCache' in 'c_cpp_properties.json').
+compilerCacheInsertAfter = "BIN = "
+compilerCacheBlock = "\n"
+compilerCacheBlock += "#######################################\n"
+compilerCacheBlock += "# Compiler results cache\n"
+compilerCacheBlock += "#######################################\n"
+compilerCacheBlock += "# Generated by updateMakefile.py: if COMPILER_CACHE is 1, compile results are cached by ideScripts/compilerCache.py.\n"
+compilerCacheBlock += "# PYTHON is Python 3 executable (given by 'Build project' task).\n"
+compilerCacheBlock += "COMPILER_CACHE ?= ***\n"
+compilerCacheBlock += "PYTHON ?= python\n"
+compilerCacheBlock += "ifeq ($(COMPILER_CACHE), 1)\n"
+compilerCacheBlock += "CC := $(PYTHON) ideScripts/compilerCache.py $(CC)\n"
+compilerCacheBlock += "AS := $(PYTHON) ideScripts/compilerCache.py $(AS)\n"
+compilerCacheBlock += "endif\n"
+
+#########################################################################################################
+# Precompiled header block is added before CubeMX C object rule (after command line fingerprints). '***' is replaced
+# with header path ('user_precompiledHeader' in 'c_cpp_properties.json'), '+++' with C command line fingerprint file
+# (or 'Makefile', if there are no fingerprints).
+precompiledHeaderRule = "$(BUILD_DIR)/%.o: %.c"
+precompiledHeaderBlock = "#######################################\n"
+precompiledHeaderBlock += "# Precompiled header\n"
+precompiledHeaderBlock += "#######################################\n"
+precompiledHeaderBlock += "# Generated by updateMakefile.py: PCH_HEADER is precompiled with C flags and included in all C sources.\n"
+precompiledHeaderBlock += "# $(PCH) only includes PCH_HEADER, GCC uses '$(PCH).gch' instead while it is built with the same flags.\n"
+precompiledHeaderBlock += "PCH_HEADER = ***\n"
+precompiledHeaderBlock += "PCH = $(BUILD_DIR)/$(notdir $(PCH_HEADER))\n"
+precompiledHeaderBlock += "PCH_FLAGS = -include $(PCH)\n"
+precompiledHeaderBlock += "\n"
+precompiledHeaderBlock += "$(PCH): | $(BUILD_DIR)\n"
+precompiledHeaderBlock += "\t@echo '#include \"$(abspath $(PCH_HEADER))\"'> $@\n"
+precompiledHeaderBlock += "\n"
+precompiledHeaderBlock += "$(PCH).gch: $(PCH_HEADER) +++ | $(PCH)\n"
+precompiledHeaderBlock += "\t$(CC) -x c-header -c $(filter-out -MF%,$(CFLAGS)) -MF\"$(@:%.gch=%.d)\" $< -o $@\n"
+precompiledHeaderBlock += "\n"
+precompiledHeaderFingerprint = "C_FINGERPRINT"
+
+#########################################################################################################
+ninjaFileHeader = ('#' * 100) + "\n"
+ninjaFileHeader += "# build.ninja generated by updateNinja.py from 'buildData.json' data. Do not edit, it is regenerated\n"
+ninjaFileHeader += "# on 'Update workspace' task.\n"
+ninjaFileHeader += ('#' * 100) + "\n"
+
+# same commands as CubeMX Makefile rules. 'dep' is dependency file of each object ('$(BUILD_DIR)/file.d')
+ninjaFileRules = """rule cc
+  command = $cc -c $cflags -MMD -MF $dep $in -o $out
+  depfile = $dep
+  deps = gcc
+  description = CC $out
+
+rule as
+  command = $cc -x assembler-with-cpp -c $cflags -MMD -MF $dep $in -o $out
+  depfile = $dep
+  deps = gcc
+  description = AS $out
+
+rule link
+  command = $cc $in $ldflags -o $out
+  description = LINK $out
+
+rule hex
+  command = $objcopy -O ihex $in $out
+  description = HEX $out
+
+rule bin
+  command = $objcopy -O binary -S $in $out
+  description = BIN $out
+"""
+
 #########################################################################################################
 taskTemplate = """{
             "label": "Update workspace",
@@ -163,6 +265,8 @@ buildDataTemplate = """{
     "asmFlags" : [],
     "ldFlags" : [],
     "buildDir": "",
+    "compilerCache": false,
+    "precompiledHeader": "",
     "targetExecutablePath": "",
     "cubeMxProjectPath": "",
     "openOcdConfig": [],
@@ -186,6 +290,16 @@ toolsPathsTemplate = """{
 }
 """
 
+#########################################################################################################
+makefileDataCacheTemplate = """{
+    "ABOUT1": "This file caches data fetched from 'Makefile', so 'make' is not called if nothing changed.",
+    "ABOUT2": "Entries are keyed with a hash of 'Makefile' content, GCC path and 'make' executable.",
+    "ABOUT3": "This file is regenerated on 'Update workspace' task and can be safely deleted.",
+    "VERSION": "",
+    "entries": {}
+}
+"""
+
 #########################################################################################################
 launchFileTemplate = """{
     "version": "0.2.0",
@@ -5,10 +5,23 @@ It should be called once CubeMX project was generated/re-generated or user setti
 - add 'print-variable' capabilities to Makefile
 - update/generate 'c_cpp_properties.json'
 - update/generate 'buildData.json' and 'toolsPaths.json'
+- update/generate 'build.ninja'
+- update/generate 'compile_commands.json' (in build folder)
 - update/generate 'tasks.json'
 - update/generate 'launch.json'
+
+Each stage runs only if its inputs changed since the last run (see 'updateState.py'), unless '--force' option is given.
+Time of each stage, external processes and file bytes are printed at the end (see 'updateProfiler.py'). Use
+'--report [path]' option to also write them to JSON report (default: '.vscode/updateReport.json').
+
+With '--watch' option, script keeps running after update and updates workspace again whenever CubeMX project, Makefile,
+'c_cpp_properties.json' or 'toolsPaths.json' changes (see watch()).
+
+Update can also be called in-process for any workspace (without 'sys.argv' and global paths), see update().
 '''
+import os
 import sys
+import copy
 import time
 import traceback
 
@@ -17,8 +30,10 @@ import updateLaunchConfig as launch
 import updateTasks as tasks
 import updateBuildData as build
 import updateMakefile as mkf
+import updateNinja as ninja
 import updateWorkspaceSources as wks
-import updatePaths as pth
+import updateState as updState
+import updateProfiler as prof
 import utilities as utils
 
 __version__ = utils.__version__
@@ -26,34 +41,143 @@ __version__ = utils.__version__
 if sys.version_info[0] < 3:
     raise Exception("Python 3 or later is required")
 
-########################################################################################################################
-if __name__ == "__main__":
-    startTime = time.time()
-    print("Update started.\n")
-    status = 'OK'
-    errorMsg = ''
+# update stages names, as stored in 'updateState.json'
+stageToolsPaths = 'toolsPaths'
+stageMakefile = 'Makefile'
+stageBuildData = 'buildData.json'
+stageNinja = 'build.ninja'
+stageCompileCommands = 'compile_commands.json'
+stageTasks = 'tasks.json'
+stageLaunch = 'launch.json'
+stageWorkspaceFile = 'workspaceFile'
+
+reportOption = '--report'
+forceOption = '--force'  # run all stages (see UpdateOptions)
+watchOption = '--watch'  # update on watched files change (see watch())
+reportFileName = 'updateReport.json'
+
+watchPollInterval = 0.5  # seconds between watched files checks
+watchDebounceTime = 1.0  # seconds without any change of watched files before update starts (CubeMX writes many files)
+
+
+def getToolsPathsStageData(bData, buildData=None):
+    '''
+    Returns inputs of tools paths stage: tools and target configuration paths (and wether they exist) from
+    'toolsPaths.json' and 'buildData.json'. If 'buildData' is given, it is used instead of 'buildData.json' file.
+    '''
+    toolsPathsData = {}
     try:
-        utils.verifyFolderStructure()
+        toolsPathsData = bData.getToolsPathsData()
+    except Exception:
+        pass  # missing or invalid, handled in prepareBuildData()
+
+    if buildData is None:
+        buildData = {}
+        try:
+            buildData = bData.getBuildData()
+        except Exception:
+            pass  # missing or invalid, handled in prepareBuildData()
+
+    allPathsNames = bData.bStr.toolsPaths + bData.bStr.derivedPaths + bData.bStr.targetConfigurationPaths
+    stageData = {}
+    for pathName in allPathsNames:
+        paths = [toolsPathsData.get(pathName), buildData.get(pathName)]
+        stageData[pathName] = []
+        for path in paths:
+            if not isinstance(path, list):
+                path = [path]
+            for item in path:
+                itemExists = isinstance(item, str) and utils.pathExists(bData.workspace.resolvePath(item))
+                stageData[pathName].append([item, itemExists])
 
-        paths = pth.UpdatePaths()
-        bData = build.BuildData()
-        cP = wks.CProperties()
-        makefile = mkf.Makefile()
-        tasks = tasks.Tasks()
-        launch = launch.LaunchConfigurations()
-        wksFile = workspaceFile.UpdateWorkspaceFile()
+    return stageData
 
-        # Makefile must exist
-        makefile.checkMakefileFile()  # no point in continuing if Makefile does not exist
-        makefile.restoreOriginalMakefile()
 
-        # build data (update tools paths if neccessary)
+def getBuildDataStageData(buildData):
+    '''
+    Returns build data without fields that change on every run.
+    '''
+    stageData = copy.deepcopy(buildData)
+    stageData.pop("VERSION", None)
+    stageData.pop("LAST_RUN", None)
+
+    return stageData
+
+
+def getReportPath(arguments, workspace):
+    '''
+    Returns path to JSON profile report if 'reportOption' is given in command line 'arguments', None otherwise.
+    If option is not followed by a path, report is written to workspace '.vscode' folder.
+    '''
+    if reportOption not in arguments:
+        return None
+
+    optionIndex = arguments.index(reportOption)
+    if (optionIndex + 1 < len(arguments)) and not arguments[optionIndex + 1].startswith('-'):
+        return os.path.abspath(arguments[optionIndex + 1])
+
+    return os.path.join(workspace.vsCodeFolderPath, reportFileName)
+
+
+class UpdateOptions():
+    '''
+    Options of update():
+        forceAllStages: run all update stages, even if their inputs did not change since the last update.
+    '''
+
+    def __init__(self, forceAllStages=False):
+        self.forceAllStages = forceAllStages
+
+
+def update(workspace, options=None):
+    '''
+    Update all workspace files of 'workspace' ('utils.Workspace' object): Makefile, 'c_cpp_properties.json',
+    'buildData.json', 'tasks.json', 'launch.json' and '*.code-workspace' file.
+    Current working directory and global paths (of 'utilities.py') are not used, so this function can be called
+    in-process (and in parallel threads) for more workspaces. Unrecoverable errors raise 'SystemExit' (see
+    'utils.printAndQuit()'), other errors raise exceptions.
+    Returns build data, as stored in 'buildData.json'.
+    '''
+    if options is None:
+        options = UpdateOptions()
+
+    bData = build.BuildData(workspace)
+    cP = wks.CProperties(workspace)
+    makefile = mkf.Makefile(workspace)
+    wksFile = workspaceFile.UpdateWorkspaceFile(workspace)
+    ninjaFile = ninja.NinjaFile(workspace)
+    state = updState.UpdateState(workspace, options.forceAllStages)
+
+    # Makefile must exist
+    makefile.checkMakefileFile()  # no point in continuing if Makefile does not exist
+
+    # build data (update tools paths if neccessary)
+    prof.startStage(stageToolsPaths)
+    fingerprint = state.getStageFingerprint(getToolsPathsStageData(bData))
+    if state.isStageUpToDate(stageToolsPaths, fingerprint):
+        buildData = bData.getBuildData()
+    else:
         buildData = bData.prepareBuildData()
+        fingerprint = state.getStageFingerprint(getToolsPathsStageData(bData, buildData))
+        state.setStageFingerprint(stageToolsPaths, fingerprint)
+
+    makeExePath = buildData[bData.bStr.buildToolsPath]
+    gccExePath = buildData[bData.bStr.gccExePath]
+
+    # Makefile and 'c_cpp_properties.json'
+    prof.startStage(stageMakefile)
+    toolsPathsData = {}
+    for pathName in bData.bStr.toolsPaths + bData.bStr.derivedPaths:
+        toolsPathsData[pathName] = buildData.get(pathName)
+    makefileStageFiles = [workspace.makefilePath, workspace.makefileBackupPath, workspace.cPropertiesPath]
+    fingerprint = state.getStageFingerprint(toolsPathsData, makefileStageFiles)
+    if state.isStageUpToDate(stageMakefile, fingerprint):
+        makefileData = makefile.getMakefileData(makeExePath, gccExePath)  # data from current (new) Makefile
+    else:
+        originalMakefileLines = makefile.restoreOriginalMakefile()
 
         # data from original makefile
-        makeExePath = buildData[bData.bStr.buildToolsPath]
-        gccExePath = buildData[bData.bStr.gccExePath]
-        makefileData = makefile.getMakefileData(makeExePath, gccExePath)
+        makefileData = makefile.getMakefileData(makeExePath, gccExePath, originalMakefileLines)
 
         # create/update 'c_cpp_properties.json'
         cP.checkCPropertiesFile()
@@ -64,40 +188,185 @@ if __name__ == "__main__":
         cP.overwriteCPropertiesFile(cPropertiesData)
 
         # update Makefile
-        makefile.createNewMakefile()
+        makefile.createNewMakefile(originalMakefileLines)
         makefileData = makefile.getMakefileData(makeExePath, gccExePath)  # get data from new Makefile
 
-        # update buildData.json
-        buildData = bData.addMakefileDataToBuildDataFile(buildData, makefileData)
-        buildData = bData.addCubeMxProjectPathToBuildData(buildData)
+        fingerprint = state.getStageFingerprint(toolsPathsData, makefileStageFiles)
+        state.setStageFingerprint(stageMakefile, fingerprint)
+
+    # update buildData.json
+    prof.startStage(stageBuildData)
+    buildData = bData.addMakefileDataToBuildDataFile(buildData, makefileData)
+    buildData = bData.addCubeMxProjectPathToBuildData(buildData)
+    buildDataStageData = getBuildDataStageData(buildData)
+
+    fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.buildDataPath])
+    if not state.isStageUpToDate(stageBuildData, fingerprint):
         bData.overwriteBuildDataFile(buildData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.buildDataPath])
+        state.setStageFingerprint(stageBuildData, fingerprint)
+
+    # update build.ninja
+    prof.startStage(stageNinja)
+    fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.ninjaFilePath])
+    if not state.isStageUpToDate(stageNinja, fingerprint):
+        ninjaFile.createNinjaFile(buildData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.ninjaFilePath])
+        state.setStageFingerprint(stageNinja, fingerprint)
 
-        # create build folder
-        buildFolderName = makefileData[mkf.MakefileStrings.buildDir]
-        utils.createBuildFolder(buildFolderName)
+    # create build folder
+    buildFolderName = makefileData[mkf.MakefileStrings.buildDir]
+    utils.createBuildFolder(buildFolderName, workspace)
 
-        # update tasks
-        tasks.checkTasksFile()
-        tasksData = tasks.getTasksData()
-        tasksData = tasks.addAllTasks(tasksData)
-        tasks.overwriteTasksFile(tasksData)
+    # update compile_commands.json
+    prof.startStage(stageCompileCommands)
+    compileCommandsPath = workspace.resolvePath(cP.getCompileCommandsPath(buildFolderName))
+    fingerprint = state.getStageFingerprint(buildDataStageData, [compileCommandsPath])
+    if not state.isStageUpToDate(stageCompileCommands, fingerprint):
+        cP.createCompileCommandsFile(buildData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [compileCommandsPath])
+        state.setStageFingerprint(stageCompileCommands, fingerprint)
 
-        # update launch configurations
-        launch.checkLaunchFile()
-        launchData = launch.getLaunchData()
-        launchData = launch.addAllLaunchConfigurations(launchData)
-        launch.overwriteLaunchFile(launchData)
+    # update tasks
+    prof.startStage(stageTasks)
+    fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.tasksPath])
+    if not state.isStageUpToDate(stageTasks, fingerprint):
+        task = tasks.Tasks(buildData, workspace)
+        task.checkTasksFile()
+        tasksData = task.getTasksData()
+        tasksData = task.addAllTasks(tasksData)
+        task.overwriteTasksFile(tasksData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.tasksPath])
+        state.setStageFingerprint(stageTasks, fingerprint)
 
-        # update workspace file with "cortex-debug" specifics
+    # update launch configurations
+    prof.startStage(stageLaunch)
+    fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.launchPath])
+    if not state.isStageUpToDate(stageLaunch, fingerprint):
+        launchCfg = launch.LaunchConfigurations(buildData, workspace)
+        launchCfg.checkLaunchFile()
+        launchData = launchCfg.getLaunchData()
+        launchData = launchCfg.addAllLaunchConfigurations(launchData)
+        launchCfg.overwriteLaunchFile(launchData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.launchPath])
+        state.setStageFingerprint(stageLaunch, fingerprint)
+
+    # update workspace file with "cortex-debug" specifics
+    prof.startStage(stageWorkspaceFile)
+    fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.workspaceFilePath])
+    if not state.isStageUpToDate(stageWorkspaceFile, fingerprint):
         wksFile.checkWorkspaceFile()
         wksData = wksFile.getWorkspaceFileData()
         wksData = wksFile.addBuildDataToWorkspaceFile(wksData, buildData)
         wksFile.overwriteWorkspaceFile(wksData)
+        fingerprint = state.getStageFingerprint(buildDataStageData, [workspace.workspaceFilePath])
+        state.setStageFingerprint(stageWorkspaceFile, fingerprint)
+
+    prof.stopStage()
+    state.overwriteStateFile()
+
+    return buildData
+
+
+def getWatchedFiles(workspace):
+    '''
+    Returns paths of files that are inputs of update: CubeMX project file(s), Makefiles, 'c_cpp_properties.json' (user
+    fields) and 'toolsPaths.json'.
+    '''
+    watchedFiles = [workspace.makefilePath, workspace.makefileBackupPath]
+    watchedFiles.extend([workspace.cPropertiesPath, workspace.toolsPaths])
+    for cubeMxProjectFile in utils.getCubeMXProjectFiles(workspace.workspacePath):
+        watchedFiles.append(workspace.resolvePath(cubeMxProjectFile))
+
+    return watchedFiles
+
+
+def getWatchedFilesSnapshot(workspace):
+    '''
+    Returns {file path: [modification time, size]} of all watched files. Missing files have None value.
+    '''
+    snapshot = {}
+    for filePath in getWatchedFiles(workspace):
+        try:
+            fileStat = os.stat(filePath)
+            snapshot[filePath] = [fileStat.st_mtime_ns, fileStat.st_size]
+        except OSError:
+            snapshot[filePath] = None
+
+    return snapshot
+
+
+def watch(workspace, options=None):
+    '''
+    Poll watched files (see getWatchedFiles()) and update workspace when any of them changes. Update starts once files
+    did not change for 'watchDebounceTime', so a burst of changes (CubeMX project regeneration) triggers one update.
+    Only stages with changed inputs are executed (see 'updateState.py'). Files written by update itself are not
+    treated as changes. Update errors are printed, and watching continues. Stop with Ctrl+C.
+    '''
+    snapshot = getWatchedFilesSnapshot(workspace)
+    print("\nWatching for changes of CubeMX project, Makefile, 'c_cpp_properties.json' and 'toolsPaths.json' "
+          "(press Ctrl+C to stop).")
+    try:
+        while True:
+            time.sleep(watchPollInterval)
+            newSnapshot = getWatchedFilesSnapshot(workspace)
+            if newSnapshot == snapshot:
+                continue
+
+            # debounce: wait until files stop changing
+            lastChangeTime = time.time()
+            while (time.time() - lastChangeTime) < watchDebounceTime:
+                time.sleep(watchPollInterval)
+                latestSnapshot = getWatchedFilesSnapshot(workspace)
+                if latestSnapshot != newSnapshot:
+                    newSnapshot = latestSnapshot
+                    lastChangeTime = time.time()
+
+            changedFiles = [filePath for filePath in newSnapshot if newSnapshot[filePath] != snapshot.get(filePath)]
+            print("\nChanged: " + ", ".join(os.path.basename(filePath) for filePath in changedFiles))
+
+            startTime = time.time()
+            status = 'OK'
+            try:
+                update(workspace, options)
+            except (Exception, SystemExit):
+                status = "ERROR"
+                traceback.print_exc()
+            print(status + " (" + "%.2f" % (time.time() - startTime) + " seconds).")
+
+            snapshot = getWatchedFilesSnapshot(workspace)  # ignore files written by update
+
+    except KeyboardInterrupt:
+        print("Watching stopped.")
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    startTime = time.time()
+    prof.enable()
+    print("Update started.\n")
+    status = 'OK'
+    errorMsg = ''
+    reportPath = None
+    try:
+        utils.verifyFolderStructure()
+        reportPath = getReportPath(sys.argv[1:], utils.defaultWorkspace)
+
+        options = UpdateOptions(forceAllStages=(forceOption in sys.argv[1:]))
+        update(utils.defaultWorkspace, options)
 
     except Exception as err:
         status = "ERROR"
         errorMsg = "Unexpected error occured during 'Update' procedure. Exception:\n" + traceback.format_exc()
 
-    overallTime = int(time.time() - startTime)
-    msg = "\n" + status + " (" + str(overallTime) + " seconds).\n" + errorMsg
+    prof.disable()
+    prof.printReport()
+    if reportPath is not None:
+        prof.writeReport(reportPath, {"VERSION": __version__, "status": status, "workspacePath": utils.workspacePath})
+
+    overallTime = time.time() - startTime
+    msg = "\n" + status + " (" + "%.2f" % overallTime + " seconds).\n" + errorMsg
     print(msg)
+
+    if (watchOption in sys.argv[1:]) and (utils.defaultWorkspace is not None):
+        watch(utils.defaultWorkspace, UpdateOptions())
@@ -4,6 +4,7 @@ This file also handles 'toolsPaths.json' file.
 New Makefile is not updated by this script - it is updated with 'updateMakefile.py' or 'updateWorkspaceSources.py'
 '''
 import os
+import copy
 import json
 import datetime
 
@@ -35,6 +36,8 @@ class BuildDataStrings():
     ldFlags = 'ldFlags'
 
     buildDirPath = 'buildDir'
+    compilerCache = 'compilerCache'  # True if compiler results cache is enabled (see 'compilerCache.py')
+    precompiledHeader = 'precompiledHeader'  # header that is precompiled and included in all C sources, or ""
 
     # build/interface tools paths, configuration files
     gccInludePath = 'gccInludePath'  # GCC standard libraries root folder path
@@ -59,6 +62,10 @@ class BuildDataStrings():
         gccInludePath
     ]
 
+    # derived paths cached in 'toolsPaths.json', so tools are not probed on every update:
+    #   {derived path name: {parent tool path: {"version": tool file version, "path": derived path}}}
+    derivedPathsCache = 'derivedPathsCache'
+
     # list of target-specific configuration paths that must exist in 'buildData.json'
     targetConfigurationPaths = [
         openOcdConfig,
@@ -76,7 +83,11 @@ class BuildDataStrings():
 
 
 class BuildData():
-    def __init__(self):
+    # read-through cache of 'buildData.json' files: {path: [modification time, size, data]}, see getCachedBuildData()
+    buildDataCache = {}
+
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
         self.mkfStr = mkf.MakefileStrings()
         self.cPStr = wks.CPropertiesStrings()
         self.bStr = BuildDataStrings()
@@ -90,7 +101,7 @@ class BuildData():
         Note: tools paths listed in 'BuildDataStrings.toolsPaths' are stored in system local 'toolsPaths.json' file, and are 
         copied (overwritten) to 'buildData.json' on first 'Update' task run. This makes it possible for multiple code contributors.
         '''
-        paths = pth.UpdatePaths()
+        paths = pth.UpdatePaths(self.workspace)
 
         self.checkBuildDataFile()
         buildData = self.getBuildData()
@@ -126,10 +137,10 @@ class BuildData():
         Returns True if 'toolsPaths.json' file exists and is a valid JSON file.
         If it is not a valid JSON, delete it and return False.
         '''
-        if utils.pathExists(utils.toolsPaths):
+        if utils.pathExists(self.workspace.toolsPaths):
             # file exists, check if it loads OK
             try:
-                with open(utils.toolsPaths, 'r') as toolsFileHandler:
+                with open(self.workspace.toolsPaths, 'r') as toolsFileHandler:
                     json.load(toolsFileHandler)
                     print("Valid 'toolsPaths.json' file found.")
                 return True
@@ -139,7 +150,7 @@ class BuildData():
                 print(errorMsg)
 
                 try:
-                    os.remove(utils.toolsPaths)
+                    os.remove(self.workspace.toolsPaths)
                     msg = "\tDeleted. New 'toolsPaths.json' will be created on first workspace update."
                     print(msg)
                 except Exception as err:
@@ -157,10 +168,10 @@ class BuildData():
 
         Note: There is no backup file for buildData.json, since it is always regenerated on Update task.
         '''
-        if utils.pathExists(utils.buildDataPath):
+        if utils.pathExists(self.workspace.buildDataPath):
             # file exists, check if it loads OK
             try:
-                with open(utils.buildDataPath, 'r') as buildDataFileHandler:
+                with open(self.workspace.buildDataPath, 'r') as buildDataFileHandler:
                     json.load(buildDataFileHandler)
                     print("Valid 'buildData.json' file found.")
 
@@ -171,7 +182,7 @@ class BuildData():
                 print(errorMsg)
 
                 try:
-                    os.remove(utils.buildDataPath)
+                    os.remove(self.workspace.buildDataPath)
                     msg = "\tDeleted. New 'buildData.json' will be created on first workspace update."
                     print(msg)
                 except Exception as err:
@@ -193,10 +204,11 @@ class BuildData():
 
             for path in self.bStr.toolsPaths:
                 data[path] = toolsPaths[path]
+            if self.bStr.derivedPathsCache in toolsPaths:
+                data[self.bStr.derivedPathsCache] = toolsPaths[self.bStr.derivedPathsCache]
 
             data = json.dumps(data, indent=4, sort_keys=False)
-            with open(utils.toolsPaths, 'w+') as toolsPathsFile:
-                toolsPathsFile.write(data)
+            utils.writeFileAtomic(self.workspace.toolsPaths, data)  # shared by all workspaces (and parallel updates)
             print("'toolsPaths.json' file updated!")
 
         except Exception as err:
@@ -212,7 +224,7 @@ class BuildData():
             data = json.loads(tmpStr.buildDataTemplate)
             dataToWrite = json.dumps(data, indent=4, sort_keys=False)
 
-            with open(utils.buildDataPath, 'w+') as buildDataFile:
+            with open(self.workspace.buildDataPath, 'w+') as buildDataFile:
                 buildDataFile.truncate()
                 buildDataFile.write(dataToWrite)
 
@@ -227,7 +239,7 @@ class BuildData():
         Get data from current 'toolsPaths.json' file.
         File existance is previoulsy checked in 'checkToolsPathFile()'.
         '''
-        with open(utils.toolsPaths, 'r') as toolsPathsFile:
+        with open(self.workspace.toolsPaths, 'r') as toolsPathsFile:
             data = json.load(toolsPathsFile)
 
         return data
@@ -237,11 +249,26 @@ class BuildData():
         Get data from current 'buildData.json' file.
         File existance is previoulsy checked in 'checkBuildDataFile()'.
         '''
-        with open(utils.buildDataPath, 'r') as buildDataFile:
+        with open(self.workspace.buildDataPath, 'r') as buildDataFile:
             data = json.load(buildDataFile)
 
         return data
 
+    def getCachedBuildData(self):
+        '''
+        Get data from current 'buildData.json' file, same as 'getBuildData()', but file is read and parsed only
+        if its modification time or size changed since the last call. Meant for standalone scripts that
+        generate more items (tasks, launch configurations) from the same build data.
+        Returned data is a copy and can be modified by caller.
+        '''
+        fileStat = os.stat(self.workspace.buildDataPath)
+        cacheEntry = BuildData.buildDataCache.get(self.workspace.buildDataPath)
+        if (cacheEntry is None) or (cacheEntry[0] != fileStat.st_mtime_ns) or (cacheEntry[1] != fileStat.st_size):
+            cacheEntry = [fileStat.st_mtime_ns, fileStat.st_size, self.getBuildData()]
+            BuildData.buildDataCache[self.workspace.buildDataPath] = cacheEntry
+
+        return copy.deepcopy(cacheEntry[2])
+
     def addToolsPathsToBuildData(self, buildData, toolsPaths):
         '''
         Get tools paths from 'toolsPaths.json' and add it to buildData
@@ -269,11 +296,17 @@ class BuildData():
         buildData[self.bStr.cSources] = cSources
 
         asmSources = makefileData[self.mkfStr.asmSources]
-        buildData[self.bStr.ldSources] = asmSources
+        buildData[self.bStr.asmSources] = asmSources
 
         ldSources = makefileData[self.mkfStr.ldSources]
         buildData[self.bStr.ldSources] = ldSources
 
+        # compiler cache (not in data of older 'makefileData.json' cache entries)
+        buildData[self.bStr.compilerCache] = makefileData.get(self.mkfStr.compilerCache, False)
+
+        # precompiled header (see 'updateMakefile.addPrecompiledHeader()')
+        buildData[self.bStr.precompiledHeader] = makefileData.get(self.mkfStr.precompiledHeader, '')
+
         # includes
         cIncludes = makefileData[self.mkfStr.cIncludes]
         buildData[self.bStr.cIncludes] = cIncludes
@@ -314,20 +347,68 @@ class BuildData():
 
     def addCubeMxProjectPathToBuildData(self, buildData):
         '''
-        If utils.cubeMxProjectFilePath is not None, add/update 'cubeMxProjectPath' field to 'buildData.json'.
+        If self.workspace.cubeMxProjectFilePath is not None, add/update 'cubeMxProjectPath' field to 'buildData.json'.
         '''
-        if utils.cubeMxProjectFilePath is not None:
-            buildData[self.bStr.cubeMxProjectPath] = utils.cubeMxProjectFilePath
+        if self.workspace.cubeMxProjectFilePath is not None:
+            buildData[self.bStr.cubeMxProjectPath] = self.workspace.cubeMxProjectFilePath
         else:
             buildData.pop(self.bStr.cubeMxProjectPath)
         return buildData
 
+    def getCompileArguments(self, buildData, sourceFilePath, objectFilePath=None, precompiledHeader=False):
+        '''
+        Returns GCC command line (as list, GCC path first) that compiles 'sourceFilePath' (path relative to workspace
+        folder) with flags from 'buildData', same as CubeMX Makefile and 'build.ninja'. All sources are compiled with C
+        flags, defines and includes (CubeMX Makefile assembles with '$(AS) -c $(CFLAGS)'), assembler sources ('.s',
+        '.S') as 'assembler-with-cpp'. Object and dependency files are placed in build folder, as in CubeMX Makefile. Defines and includes that are already part of flags (CubeMX 'CFLAGS' contains
+        'C_DEFS' and 'C_INCLUDES') are not repeated.
+        If 'objectFilePath' is given, object and dependency files are placed there instead (see 'build.py').
+        If 'precompiledHeader' is True and precompiled header is enabled, C sources include it, as in Makefile (see
+        getPrecompiledHeaderPath()).
+        '''
+        if objectFilePath is None:
+            fileName = os.path.splitext(os.path.basename(sourceFilePath))[0]  # file might not exist (yet)
+            objectFilePath = buildData[self.bStr.buildDirPath] + "/" + fileName + ".o"
+        dependencyFilePath = os.path.splitext(objectFilePath)[0] + ".d"
+
+        definesAndIncludes = utils.preappendString(list(buildData[self.bStr.cDefines]), '-D')
+        definesAndIncludes += utils.preappendString(list(buildData[self.bStr.cIncludes]), '-I')
+        flags = buildData[self.bStr.cFlags]
+        if os.path.splitext(sourceFilePath)[1] in ['.s', '.S']:
+            arguments = [buildData[self.bStr.gccExePath], '-x', 'assembler-with-cpp', '-c']
+        else:
+            arguments = [buildData[self.bStr.gccExePath], '-c']
+            if precompiledHeader and self.getPrecompiledHeaderPath(buildData):
+                flags = flags + ['-include', self.getPrecompiledHeaderPath(buildData)]
+        arguments.extend([item for item in definesAndIncludes if item not in flags])
+
+        for flag in flags:
+            if flag == "-MF":
+                flag = "-MF" + dependencyFilePath
+            arguments.append(flag)
+
+        arguments.append(sourceFilePath)
+        arguments.extend(["-o", objectFilePath])
+
+        return arguments
+
+    def getPrecompiledHeaderPath(self, buildData):
+        '''
+        Returns path of header that C sources include when precompiled header is enabled ('<build folder>/<header name>',
+        which only includes precompiled header, so GCC uses '<build folder>/<header name>.gch' instead) or None.
+        '''
+        headerPath = buildData.get(self.bStr.precompiledHeader, '')
+        if not headerPath:
+            return None
+
+        return buildData[self.bStr.buildDirPath] + "/" + os.path.basename(headerPath)
+
     def overwriteBuildDataFile(self, data):
         '''
         Overwrite existing 'buildData.json' file with new data.
         '''
         try:
-            with open(utils.buildDataPath, 'r+') as buildDataFile:
+            with open(self.workspace.buildDataPath, 'r+') as buildDataFile:
                 data["VERSION"] = __version__
                 data["LAST_RUN"] = str(datetime.datetime.now())
 
@@ -0,0 +1,140 @@
+'''
+Batch update of many workspaces (for example, all board projects in one repository), in parallel processes.
+
+    python ideScripts/updateFleet.py <root folder> [-j N] [--force]
+
+Every folder under <root folder> with a '*.code-workspace' file and CubeMX 'Makefile' (or 'Makefile.backup') is
+updated with 'update.update()' of this 'ideScripts' folder (not with workspace's own 'ideScripts' copy). First workspace
+is updated alone, so tools paths and probed paths are stored in shared 'toolsPaths.json' (and OpenOCD scripts index)
+before other workspaces are updated in parallel.
+
+Update is non-interactive: if any user input is needed (missing or invalid tools/target paths), workspace update fails
+instead of waiting for input (see 'utils.getUserInput()'). Script exits with non-zero status if any update failed.
+'''
+import io
+import os
+import sys
+import time
+import contextlib
+import traceback
+import concurrent.futures
+
+import utilities as utils
+import update
+
+__version__ = utils.__version__
+
+if sys.version_info[0] < 3:
+    raise Exception("Python 3 or later is required")
+
+forceOption = update.forceOption
+
+skippedFolders = ['.git', '.vscode', 'ideScripts', 'build', 'node_modules', '__pycache__']
+logLinesOnError = 10  # number of last update output lines printed for failed workspace
+
+
+def findWorkspaces(rootPath):
+    '''
+    Returns sorted list of absolute paths to workspace folders under 'rootPath': folders with '*.code-workspace' and
+    'Makefile' or 'Makefile.backup' file.
+    '''
+    workspaces = []
+    for folderPath, folders, files in os.walk(os.path.abspath(rootPath)):
+        folders[:] = [folder for folder in folders if folder not in skippedFolders]
+
+        if not any(fileName.endswith('.code-workspace') for fileName in files):
+            continue
+        if ('Makefile' in files) or ('Makefile.backup' in files):
+            workspaces.append(utils.pathWithForwardSlashes(folderPath))
+
+    return sorted(workspaces)
+
+
+def updateWorkspace(workspacePath, forceAllStages=False):
+    '''
+    Update one workspace (in worker process). Update output is captured, not printed.
+    Returns result dictionary: workspace path, status ('OK' or 'ERROR'), time, output and error message.
+    '''
+    utils.interactive = False
+
+    startTime = time.perf_counter()
+    status = 'OK'
+    errorMsg = ''
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            workspace = utils.Workspace(workspacePath)
+            update.update(workspace, update.UpdateOptions(forceAllStages))
+        except SystemExit:  # 'utils.printAndQuit()', error is already printed to output
+            status = "ERROR"
+        except Exception:
+            status = "ERROR"
+            errorMsg = "Unexpected error occured during update:\n" + traceback.format_exc()
+
+    result = {
+        'workspacePath': workspacePath,
+        'status': status,
+        'time': time.perf_counter() - startTime,
+        'output': output.getvalue(),
+        'errorMsg': errorMsg
+    }
+    return result
+
+
+def printResult(result, rootPath):
+    workspaceName = os.path.relpath(result['workspacePath'], rootPath)
+    print(result['status'].ljust(6) + "%7.2f s  " % result['time'] + workspaceName)
+
+    if result['status'] != 'OK':
+        outputLines = result['output'].strip().splitlines()
+        for line in outputLines[-logLinesOnError:]:
+            print("\t| " + line)
+        if result['errorMsg']:
+            print("\t| " + result['errorMsg'].strip().replace("\n", "\n\t| "))
+
+
+def updateWorkspaces(rootPath, jobs=None, forceAllStages=False):
+    '''
+    Update all workspaces under 'rootPath' in 'jobs' processes (default: number of CPUs). Results are printed as they
+    finish. Returns list of results (see updateWorkspace()) in workspaces order.
+    '''
+    workspacePaths = findWorkspaces(rootPath)
+    if not workspacePaths:
+        print("No workspaces found in: " + os.path.abspath(rootPath))
+        return []
+    print(str(len(workspacePaths)) + " workspace(s) found in: " + os.path.abspath(rootPath) + "\n")
+
+    # first workspace alone: fill shared tools paths cache (probed GCC include path, OpenOCD index, ...)
+    results = {workspacePaths[0]: updateWorkspace(workspacePaths[0], forceAllStages)}
+    printResult(results[workspacePaths[0]], rootPath)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        futures = []
+        for workspacePath in workspacePaths[1:]:
+            futures.append(executor.submit(updateWorkspace, workspacePath, forceAllStages))
+
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results[result['workspacePath']] = result
+            printResult(result, rootPath)
+
+    return [results[workspacePath] for workspacePath in workspacePaths]
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    if (not arguments) or arguments[0].startswith('-'):
+        utils.printAndQuit("Root folder is missing.\nUsage: python updateFleet.py <root folder> [-j N] [--force]")
+    rootPath = arguments[0]
+
+    startTime = time.perf_counter()
+    results = updateWorkspaces(rootPath, utils.getJobs(arguments[1:]), forceOption in arguments[1:])
+
+    failed = [result for result in results if result['status'] != 'OK']
+    msg = "\n" + str(len(results) - len(failed)) + " workspace(s) updated, " + str(len(failed)) + " failed ("
+    msg += "%.2f" % (time.perf_counter() - startTime) + " seconds)."
+    print(msg)
+
+    if failed:
+        sys.exit(1)
@@ -14,7 +14,13 @@ __version__ = utils.__version__
 
 
 class LaunchConfigurations():
-    def __init__(self):
+    def __init__(self, buildData=None, workspace=None):
+        '''
+        'buildData' is optional in-memory build data (as in 'buildData.json'), shared by all generated items.
+        If not given, data is read from 'buildData.json' file (see getBuildData()).
+        '''
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.buildData = buildData
         self.bStr = build.BuildDataStrings()
 
     def checkLaunchFile(self):
@@ -22,10 +28,10 @@ class LaunchConfigurations():
         Check if 'launch.json' file exists. If it does, check if it is a valid JSON file.
         If it doesn't exist, create new according to template.
         '''
-        if utils.pathExists(utils.launchPath):
+        if utils.pathExists(self.workspace.launchPath):
             # file exists, check if it loads OK
             try:
-                with open(utils.launchPath, 'r') as launchFile:
+                with open(self.workspace.launchPath, 'r') as launchFile:
                     json.load(launchFile)
 
                     print("Existing 'launch.json' file found.")
@@ -37,7 +43,7 @@ class LaunchConfigurations():
                 errorMsg += str(err)
                 print(errorMsg)
 
-                utils.copyAndRename(utils.launchPath, utils.launchBackupPath)
+                utils.copyAndRename(self.workspace.launchPath, self.workspace.launchBackupPath)
 
                 self.createLaunchFile()
 
@@ -49,7 +55,7 @@ class LaunchConfigurations():
         Create fresh 'launch.json' file.
         '''
         try:
-            with open(utils.launchPath, 'w') as launchFile:
+            with open(self.workspace.launchPath, 'w') as launchFile:
                 data = json.loads(tmpStr.launchFileTemplate)
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
 
@@ -69,7 +75,7 @@ class LaunchConfigurations():
         Get data from current 'launch.json' file.
         File existance is previoulsy checked in 'checkLaunchFile()'.
         '''
-        with open(utils.launchPath, 'r') as launchFile:
+        with open(self.workspace.launchPath, 'r') as launchFile:
             data = json.load(launchFile)
 
             return data
@@ -79,7 +85,7 @@ class LaunchConfigurations():
         Overwrite existing 'launch.json' file with new data.
         '''
         try:
-            with open(utils.launchPath, 'r+') as launchFile:
+            with open(self.workspace.launchPath, 'r+') as launchFile:
                 launchFile.seek(0)
                 launchFile.truncate()
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
@@ -111,10 +117,21 @@ class LaunchConfigurations():
 
         return data
 
-    def addAllLaunchConfigurations(self, launchData):
+    def getBuildData(self):
+        '''
+        Return build data given to this object or (if not given) data from 'buildData.json' file. File is read only
+        once, unless it changes (see BuildData.getCachedBuildData()).
+        '''
+        if self.buildData is None:
+            return build.BuildData(self.workspace).getCachedBuildData()
+        return self.buildData
+
+    def addAllLaunchConfigurations(self, launchData, buildData=None):
         '''
         Merge and return all combined launch configuration data.
         '''
+        if buildData is not None:
+            self.buildData = buildData  # all launch configurations are generated from the same in-memory build data
         launchCfg = self.getDebugLaunchConfig()
         launchData = self.addOrReplaceLaunchConfiguration(launchData, launchCfg)
 
@@ -149,7 +166,7 @@ class LaunchConfigurations():
         """
         jsonConfigurationData = json.loads(configurationData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
 
         jsonConfigurationData["name"] = tmpStr.launchName_Debug
         jsonConfigurationData["executable"] = buildData[self.bStr.targetExecutablePath]
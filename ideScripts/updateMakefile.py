@@ -4,11 +4,18 @@ original Makefile and 'c_cpp_properties.json'.
 '''
 
 import os
+import re
+import copy
+import json
+import filecmp
+import hashlib
 import datetime
 from subprocess import Popen, PIPE
 
 import utilities as utils
+import updateProfiler as prof
 import templateStrings as tmpStr
+import makefileParser as mkfParser
 
 import updatePaths as pth
 import updateWorkspaceSources as wks
@@ -33,9 +40,22 @@ class MakefileStrings():
     asmFlags = 'ASFLAGS'
     ldFlags = 'LDFLAGS'
 
+    compilerCache = 'COMPILER_CACHE'
+    precompiledHeader = 'PCH_HEADER'
+
 
 class Makefile():
-    def __init__(self):
+    maxCachedMakefileData = 4  # original and new 'Makefile' of current and previous configuration
+
+    # in-memory copy of 'makefileData.json' entries, shared by all instances (long running processes, like
+    # 'updateServer.py', don't read cache file on every update): {cache key: Makefile data}
+    makefileDataCache = {}
+
+    # default precompiled header ('user_precompiledHeader' is "true"): the first one found in C include folders
+    defaultPrecompiledHeaders = [re.compile(r'^main\.h$'), re.compile(r'^stm32\w+_hal\.h$')]
+
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
         self.mkfStr = MakefileStrings()
         self.cPStr = wks.CPropertiesStrings()
 
@@ -43,7 +63,7 @@ class Makefile():
         '''
         Check if 'Makefile' file exists. If it doesn't, report as error.
         '''
-        if not utils.pathExists(utils.makefilePath):
+        if not utils.pathExists(self.workspace.makefilePath):
             errorMsg = "Makefile does not exist! Did CubeMX generated Makefile?\n"
             errorMsg += "File name must be 'Makefile'."
             utils.printAndQuit(errorMsg)
@@ -51,27 +71,29 @@ class Makefile():
     def restoreOriginalMakefile(self):
         '''
         Check wether current 'Makefile' has print capabilities. If it has, this means it was already altered by this script.
-        If it was, replace it with backup copy: 'Makefile.backup'.
+        If it was, original data is read from backup copy: 'Makefile.backup'.
         If it does not have print capabilities, it is assumed 'Makefile' was regenerated with CubeMX
-        tool - print function is added and backup file is overwritten with this new 'Makefile'.
+        tool - backup file is overwritten with this new 'Makefile' (only if content differs).
 
-        At the end, fresh 'Makefile' with print function should be available.
+        Returns lines of original Makefile with print function added. 'Makefile' itself is not rewritten, so its
+        modification time does not change (all objects depend on 'Makefile').
         '''
-        if utils.pathExists(utils.makefilePath):
+        originalMakefilePath = self.workspace.makefilePath
+        if utils.pathExists(self.workspace.makefilePath):
             # Makefile exists, check if it is original (no print capabilities)
-            if self.hasPrintCapabilities(utils.makefilePath):
+            if self.hasPrintCapabilities(self.workspace.makefilePath):
                 # Makefile exists, already modified
-                if utils.pathExists(utils.makefileBackupPath):
+                if utils.pathExists(self.workspace.makefileBackupPath):
                     # can original file be restored from backup file?
-                    if self.hasPrintCapabilities(utils.makefileBackupPath):
+                    if self.hasPrintCapabilities(self.workspace.makefileBackupPath):
                         errorMsg = "Both, 'Makefile' and 'Makefile.backup' exists, but they are both modified!\n"
                         errorMsg += "Did you manually delete, replace or modify any of Makefiles?\n"
                         errorMsg += "-> Delete all Makefiles and regenerate with CubeMX."
                         utils.printAndQuit(errorMsg)
                     else:
-                        # original will be restored from backup file
-                        print("Existing 'Makefile' file will be restored from 'Makefile.backup'.")
-                        utils.copyAndRename(utils.makefileBackupPath, utils.makefilePath)
+                        # original will be read from backup file
+                        print("Original 'Makefile' data is read from 'Makefile.backup'.")
+                        originalMakefilePath = self.workspace.makefileBackupPath
                 else:
                     errorMsg = "'Makefile.backup' does not exist, while 'Makefile' was already modified!\n"
                     errorMsg += "Did you manually delete, replace or modify any of Makefiles?\n"
@@ -79,10 +101,11 @@ class Makefile():
                     utils.printAndQuit(errorMsg)
             else:
                 print("Existing 'Makefile' file found (original).")
-                utils.copyAndRename(utils.makefilePath, utils.makefileBackupPath)
-        elif utils.pathExists(utils.makefileBackupPath):
+                if not self.isSameFile(self.workspace.makefilePath, self.workspace.makefileBackupPath):
+                    utils.copyAndRename(self.workspace.makefilePath, self.workspace.makefileBackupPath)
+        elif utils.pathExists(self.workspace.makefileBackupPath):
             # Makefile does not exist, but Makefile.backup does
-            if self.hasPrintCapabilities(utils.makefileBackupPath):
+            if self.hasPrintCapabilities(self.workspace.makefileBackupPath):
                 errorMsg = "'Makefile.backup' exists, but is already modified!\n"
                 errorMsg += "Did you manually delete, replace or modify any of Makefiles?\n"
                 errorMsg += "-> Delete all Makefiles and regenerate with CubeMX."
@@ -90,166 +113,300 @@ class Makefile():
             else:
                 # original will be restored from backup file
                 print("'Makefile' file will be restored from 'Makefile.backup'.")
-                utils.copyAndRename(utils.makefileBackupPath, utils.makefilePath)
+                utils.copyAndRename(self.workspace.makefileBackupPath, self.workspace.makefilePath)
         else:
             errorMsg = "No Makefiles available, unable to proceed!\n"
             errorMsg += "-> Regenerate with CubeMX."
             utils.printAndQuit(errorMsg)
 
-        self.addMakefileCustomFunctions(pathToMakefile=utils.makefilePath)
+        with open(originalMakefilePath, 'r') as makefile:
+            makefileDataLines = makefile.readlines()
+
+        return self.addMakefileCustomFunctions(makefileDataLines)
+
+    def isSameFile(self, filePath, otherFilePath):
+        '''
+        Returns True if both files exist and have the same content, False otherwise.
+        '''
+        if utils.pathExists(filePath) and utils.pathExists(otherFilePath):
+            return filecmp.cmp(filePath, otherFilePath, shallow=False)
+
+        return False
 
-    def getMakefileData(self, makeExePath, gccExePath):
+    def getMakefileData(self, makeExePath, gccExePath, makefileLines=None):
         '''
         Get Makefile data.
+        If 'makefileLines' is given (as returned by restoreOriginalMakefile()), data is fetched from this lines instead of
+        current 'Makefile' file.
+        Data is fetched from 'makefileData.json' cache if 'Makefile', GCC path and 'make' executable did not change since
+        last fetch. Otherwise, data is fetched from 'Makefile' (see fetchMakefileData()) and stored to cache.
         Returns data in dictionary.
         '''
+        if makefileLines is None:
+            with open(self.workspace.makefilePath, 'r') as makefile:
+                makefileLines = makefile.readlines()
+
+        cacheKey = self.getMakefileDataCacheKey(makeExePath, gccExePath, makefileLines)
+
+        dataDictionaryList = self.getCachedMakefileData(cacheKey)
+        if dataDictionaryList is not None:
+            print("Makefile data fetched from cache ('makefileData.json').")
+            return dataDictionaryList
+
+        dataDictionaryList = self.fetchMakefileData(makeExePath, gccExePath, makefileLines)
+        self.cacheMakefileData(cacheKey, dataDictionaryList)
+
+        return dataDictionaryList
+
+    def getMakefileDataCacheKey(self, makeExePath, gccExePath, makefileLines):
+        '''
+        Returns hash of everything that Makefile data depends on: 'Makefile' content, 'GCC_PATH', 'make' executable and
+        its version. 'make' version is identified by size and modification time of 'make' executable, so 'make' does not
+        need to be called to build a key.
+        '''
+        makefileContent = ''.join(makefileLines).encode('utf-8')
+
+        makeExeVersion = utils.getFileVersion(makeExePath)
+        if makeExeVersion is None:
+            makeExeVersion = ''  # unknown version, key is still valid for this 'make' path
+
+        hasher = hashlib.sha256(makefileContent)
+        for item in [os.path.dirname(gccExePath), makeExePath, makeExeVersion, __version__]:
+            hasher.update(b'\0' + str(item).encode('utf-8'))
+
+        return hasher.hexdigest()
+
+    def getCachedMakefileData(self, cacheKey):
+        '''
+        Returns Makefile data stored in 'makefileData.json' with 'cacheKey' or None if there is no such (valid) data.
+        '''
+        if cacheKey in Makefile.makefileDataCache:
+            return copy.deepcopy(Makefile.makefileDataCache[cacheKey])
+
+        if not utils.pathExists(self.workspace.makefileDataCachePath):
+            return None
+
+        try:
+            with open(self.workspace.makefileDataCachePath, 'r') as cacheFile:
+                cacheData = json.load(cacheFile)
+
+            if cacheData['VERSION'] != __version__:
+                return None
+
+            makefileData = cacheData['entries'].get(cacheKey)
+            if makefileData is not None:
+                Makefile.makefileDataCache[cacheKey] = copy.deepcopy(makefileData)
+
+            return makefileData
+
+        except Exception as err:
+            print("Invalid 'makefileData.json' file, cache is ignored. Error:\n" + str(err))
+            return None
+
+    def cacheMakefileData(self, cacheKey, makefileData):
+        '''
+        Store Makefile data to 'makefileData.json' with 'cacheKey'. Only last 'maxCachedMakefileData' entries are kept.
+        Since this is cache only, errors are reported but not fatal.
+        '''
+        cacheData = json.loads(tmpStr.makefileDataCacheTemplate)
+        try:
+            with open(self.workspace.makefileDataCachePath, 'r') as cacheFile:
+                currentCacheData = json.load(cacheFile)
+            if currentCacheData['VERSION'] == __version__:
+                cacheData['entries'] = currentCacheData['entries']
+        except Exception:
+            pass  # no or invalid cache file, create new one
+
+        Makefile.makefileDataCache[cacheKey] = copy.deepcopy(makefileData)
+        for oldCacheKey in list(Makefile.makefileDataCache.keys())[:-self.maxCachedMakefileData]:
+            del Makefile.makefileDataCache[oldCacheKey]
+
+        entries = cacheData['entries']
+        entries.pop(cacheKey, None)  # re-insert as newest entry
+        entries[cacheKey] = makefileData
+        for oldCacheKey in list(entries.keys())[:-self.maxCachedMakefileData]:
+            del entries[oldCacheKey]
+        cacheData['VERSION'] = __version__
+
+        try:
+            with open(self.workspace.makefileDataCachePath, 'w') as cacheFile:
+                json.dump(cacheData, cacheFile, indent=4, sort_keys=False)
+
+        except Exception as err:
+            print("Exception error writing 'makefileData.json' file (cache is not updated):\n" + str(err))
+
+    def fetchMakefileData(self, makeExePath, gccExePath, makefileLines):
+        '''
+        Fetch Makefile data from 'makefileLines'.
+        All variables are fetched at once (see getMakefileVariables()).
+        Returns data in dictionary.
+        '''
+        variableNames = [
+            self.mkfStr.projectName,
+            self.mkfStr.buildDir,
+            self.mkfStr.cSources,
+            self.mkfStr.asmSources,
+            self.mkfStr.ldSources,
+            self.mkfStr.asmDefines,
+            self.mkfStr.cDefines,
+            self.mkfStr.asmIncludes,
+            self.mkfStr.cIncludes,
+            self.mkfStr.ldIncludes,
+            self.mkfStr.cFlags,
+            self.mkfStr.asmFlags,
+            self.mkfStr.ldFlags,
+            self.mkfStr.compilerCache,
+            self.mkfStr.precompiledHeader
+        ]
+        variables = self.getMakefileVariables(makeExePath, gccExePath, variableNames, makefileLines)
+
         dataDictionaryList = {}
 
         # project name
-        projectName = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.projectName)[0]
+        projectName = variables[self.mkfStr.projectName][0]
         dataDictionaryList[self.mkfStr.projectName] = projectName
 
         # dir name
-        buildDirName = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.buildDir)[0]
+        buildDirName = variables[self.mkfStr.buildDir][0]
         dataDictionaryList[self.mkfStr.buildDir] = buildDirName
 
         # source files
-        cSourcesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.cSources)
+        cSourcesList = variables[self.mkfStr.cSources]
         dataDictionaryList[self.mkfStr.cSources] = cSourcesList
 
-        asmSourcesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.asmSources)
+        asmSourcesList = variables[self.mkfStr.asmSources]
         dataDictionaryList[self.mkfStr.asmSources] = asmSourcesList
 
-        ldSourcesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.ldSources)
+        ldSourcesList = variables[self.mkfStr.ldSources]
         # ldSourcesList = utils.stripStartOfString(ldSourcesList, '-l') # more readable without stripping
         dataDictionaryList[self.mkfStr.ldSources] = ldSourcesList
 
         # defines
-        asmDefinesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.asmDefines)
+        asmDefinesList = variables[self.mkfStr.asmDefines]
         asmDefinesList = utils.stripStartOfString(asmDefinesList, '-D')
         dataDictionaryList[self.mkfStr.asmDefines] = asmDefinesList
 
-        cDefinesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.cDefines)
+        cDefinesList = variables[self.mkfStr.cDefines]
         cDefinesList = utils.stripStartOfString(cDefinesList, '-D')
         dataDictionaryList[self.mkfStr.cDefines] = cDefinesList
 
         # source & include directories
-        asmIncludesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.asmIncludes)
+        asmIncludesList = variables[self.mkfStr.asmIncludes]
         asmIncludesList = utils.stripStartOfString(asmIncludesList, '-I')
         dataDictionaryList[self.mkfStr.asmIncludes] = asmIncludesList
 
-        cIncludesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.cIncludes)
+        cIncludesList = variables[self.mkfStr.cIncludes]
         cIncludesList = utils.stripStartOfString(cIncludesList, '-I')
         dataDictionaryList[self.mkfStr.cIncludes] = cIncludesList
 
-        ldIncludesList = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.ldIncludes)
+        ldIncludesList = variables[self.mkfStr.ldIncludes]
         ldIncludesList = utils.stripStartOfString(ldIncludesList, '-L')
         dataDictionaryList[self.mkfStr.ldIncludes] = ldIncludesList
 
         # flags
-        cFlags = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.cFlags)
+        cFlags = variables[self.mkfStr.cFlags]
         dataDictionaryList[self.mkfStr.cFlags] = cFlags
 
-        asmFlags = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.asmFlags)
+        asmFlags = variables[self.mkfStr.asmFlags]
         dataDictionaryList[self.mkfStr.asmFlags] = asmFlags
 
-        ldFlags = self.getMakefileVariable(makeExePath, gccExePath, self.mkfStr.ldFlags)
+        ldFlags = variables[self.mkfStr.ldFlags]
         dataDictionaryList[self.mkfStr.ldFlags] = ldFlags
 
+        # compiler cache (not defined in original CubeMX Makefile)
+        compilerCache = variables[self.mkfStr.compilerCache]
+        dataDictionaryList[self.mkfStr.compilerCache] = (compilerCache == ['1'])
+
+        # precompiled header (not defined in original CubeMX Makefile)
+        precompiledHeader = variables[self.mkfStr.precompiledHeader]
+        dataDictionaryList[self.mkfStr.precompiledHeader] = ' '.join(precompiledHeader)
+
         return dataDictionaryList
 
     def parseMakefileData(self, data, startString):
         '''
-        Fetch and unparse data from existing Makefile (generated by CubeMX) starting with 'startString'.
+        Fetch and unparse data from existing Makefile (generated by CubeMX) variable 'startString'.
+        See 'makefileParser.MakefileDocument.getVariableItems()'.
         '''
-        endOfLineChars = "\\"
-        startString = startString + ' = '
-        NOT_FOUND = -1
+        document = mkfParser.MakefileDocument(data)
+        if not document.hasVariable(startString):
+            errorMsg = "String item '" + str(startString) + " = ' not found!\n"
+            errorMsg += "Invalid/changed Makefile or this script is outdated (change in CubeMX Makefile syntax?)."
+            utils.printAndQuit(errorMsg)
 
-        items = []
-        # find start and end of defines and
-        for lineIndex, line in enumerate(data):
-            line = line.rstrip('\n')  # strip string of '\n'
-
-            startCharacter = line.find(startString)
-            if startCharacter != NOT_FOUND:  # search for start string
-
-                # check if one-liner
-                if line.find(endOfLineChars) == NOT_FOUND:
-                    line = line[len(startString):]
-                    if len(line) != 0:  # check for 'SOMETHING = ' (empty line after '=')
-                        # not an empty line after '='
-                        items.append(line)  # strip string of start and and characters
-                    return items
-
-                else:  # multiline item in Makefile
-                    for line2 in data[lineIndex+1:]:
-                        line2 = line2.rstrip('\n')
-                        if line2.find(endOfLineChars) != NOT_FOUND:
-                            line2 = line2.rstrip('\\')  # strip of '\'
-                            line2 = line2.rstrip(' ')   # strip of ' '
-                            items.append(line2)
-                        else:
-                            line2 = line2.rstrip('\\')  # strip of '\'
-                            line2 = line2.rstrip(' ')   # strip of ' '
-                            items.append(line2)
-                            return items
-
-        errorMsg = "String item '" + str(startString) + "' not found!\n"
-        errorMsg += "Invalid/changed Makefile or this script is outdated (change in CubeMX Makefile syntax?)."
-        utils.printAndQuit(errorMsg)
-
-    def createNewMakefile(self):
+        return document.getVariableItems(startString)
+
+    def createNewMakefile(self, makefileLines=None):
         '''
         Merge existing Makefile data and user fields from existing 'c_cpp_properties.json.'
+        If 'makefileLines' is given (as returned by restoreOriginalMakefile()), this lines are used as existing Makefile
+        data instead of current 'Makefile' file.
+        New Makefile is written only if its content (without 'Last run' timestamp) differs from current 'Makefile'.
         '''
-        cP = wks.CProperties()
+        cP = wks.CProperties(self.workspace)
         cPropertiesData = cP.getCPropertiesData()
 
-        with open(utils.makefilePath, 'r') as makefile:
-            data = makefile.readlines()
+        if makefileLines is None:
+            with open(self.workspace.makefilePath, 'r') as makefile:
+                makefileLines = makefile.readlines()
+        document = mkfParser.MakefileDocument(makefileLines)
 
         # sources
         cSources = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_cSources)
-        data = self.searchAndAppend(data, self.mkfStr.cSources, cSources)
+        self.appendToVariable(document, self.mkfStr.cSources, cSources)
 
         asmSources = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_asmSources)
-        data = self.searchAndAppend(data, self.mkfStr.asmSources, asmSources)
+        self.appendToVariable(document, self.mkfStr.asmSources, asmSources)
 
         ldSources = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_ldSources)
-        data = self.searchAndAppend(data, self.mkfStr.ldSources, ldSources, preappend='-l:')
+        self.appendToVariable(document, self.mkfStr.ldSources, ldSources, preappend='-l:')
 
         # includes
         cIncludes = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_cIncludes)
-        data = self.searchAndAppend(data, self.mkfStr.cIncludes, cIncludes, preappend='-I')
+        self.appendToVariable(document, self.mkfStr.cIncludes, cIncludes, preappend='-I')
 
         asmIncludes = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_asmIncludes)
-        data = self.searchAndAppend(data, self.mkfStr.asmIncludes, asmIncludes, preappend='-I')
+        self.appendToVariable(document, self.mkfStr.asmIncludes, asmIncludes, preappend='-I')
 
         ldIncludes = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_ldIncludes)
-        data = self.searchAndAppend(data, self.mkfStr.ldIncludes, ldIncludes, preappend='-L')
+        self.appendToVariable(document, self.mkfStr.ldIncludes, ldIncludes, preappend='-L')
 
         # defines
         cDefines = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_cDefines)
-        data = self.searchAndAppend(data, self.mkfStr.cDefines, cDefines, preappend='-D')
+        self.appendToVariable(document, self.mkfStr.cDefines, cDefines, preappend='-D')
 
         asmDefines = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_asmDefines)
-        data = self.searchAndAppend(data, self.mkfStr.asmDefines, asmDefines, preappend='-D')
+        self.appendToVariable(document, self.mkfStr.asmDefines, asmDefines, preappend='-D')
 
         # compiler flags
         cFlags = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_cFlags)
-        data = self.searchAndAppend(data, self.mkfStr.cFlags, cFlags)
+        self.appendToVariable(document, self.mkfStr.cFlags, cFlags)
 
         asmFlags = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_asmFlags)
-        data = self.searchAndAppend(data, self.mkfStr.asmFlags, asmFlags)
+        self.appendToVariable(document, self.mkfStr.asmFlags, asmFlags)
 
         ldFlags = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_ldFlags)
-        data = self.searchAndAppend(data, self.mkfStr.ldFlags, ldFlags)
+        self.appendToVariable(document, self.mkfStr.ldFlags, ldFlags)
+
+        self.replaceDocumentHeader(document)
+
+        compilerCache = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_compilerCache)
+        data = self.addCompilerCache(document.getLines(), str(compilerCache).strip().lower() in ['true', '1'])
+
+        data = self.addCommandLineFingerprints(data)
 
-        data = self.replaceMakefileHeader(data)
+        precompiledHeader = cP.getCPropertiesKeyData(cPropertiesData, self.cPStr.user_precompiledHeader)
+        cIncludes = utils.stripStartOfString(document.getVariableItems(self.mkfStr.cIncludes), '-I')
+        precompiledHeaderPath = self.getPrecompiledHeaderPath(precompiledHeader, cIncludes)
+        if precompiledHeaderPath is not None:
+            data = self.addPrecompiledHeader(data, precompiledHeaderPath)
+
+        if not self.isMakefileChanged(data):
+            print("Makefile data did not change, existing Makefile is kept.")
+            return
 
         try:
-            with open(utils.makefilePath, 'w') as makefile:
+            with open(self.workspace.makefilePath, 'w') as makefile:
                 for line in data:
                     makefile.write(line)
             print("New Makefile data succesfully written.")
@@ -259,105 +416,269 @@ class Makefile():
             errorMsg += str(err)
             utils.printAndQuit(errorMsg)
 
+    def addCompilerCache(self, data, enabled):
+        '''
+        Add compiler results cache block (see 'templateStrings.compilerCacheBlock'): if 'COMPILER_CACHE' is 1, 'CC' and
+        'AS' compile through 'compilerCache.py'. Default value of 'COMPILER_CACHE' is set according to 'enabled', but it
+        can also be overridden on 'make' command line.
+        '''
+        data = ''.join(data).splitlines(True)
+
+        for lineIndex, line in enumerate(data):
+            if line.startswith(tmpStr.compilerCacheInsertAfter):
+                if enabled:
+                    block = tmpStr.compilerCacheBlock.replace('***', '1')
+                else:
+                    block = tmpStr.compilerCacheBlock.replace('***', '0')
+                data[lineIndex + 1:lineIndex + 1] = block.splitlines(True)
+                return data
+
+        print("Compiler cache not added, '" + tmpStr.compilerCacheInsertAfter + "' line not found in Makefile.")
+        return data
+
+    def addCommandLineFingerprints(self, data):
+        '''
+        Replace 'Makefile' prerequisite of CubeMX object and target rules with command line fingerprint files. This way
+        objects are not rebuilt on any Makefile change, but only when their own command line changes.
+        Fingerprint variable (ex.: 'C_FINGERPRINT') is rule recipe, expanded by make itself when it starts, so hand
+        edited Makefile variables and variables given to make ('make DEBUG=0', 'make OPT=-O2') are included. Fingerprint
+        file ('$(BUILD_DIR)/c.cmd') holds command line of the previous build: if it differs, fingerprint file is
+        rewritten before objects are built and all objects that are older than this file are rebuilt.
+
+        GNU make older than 4.2 can't read files, 'Makefile' prerequisite is used instead (see
+        'templateStrings.commandFingerprintRules'). If rule is not found, 'Makefile' prerequisite is left as it is.
+        '''
+        data = ''.join(data).splitlines(True)
+
+        fingerprintLines = []
+        fingerprintRuleLines = []
+        fallbackLines = []
+        firstRuleLineIndex = None
+        for fingerprintName, fingerprintRule in tmpStr.commandFingerprintRules.items():
+            ruleStart, fingerprintFile = fingerprintRule
+
+            ruleLineIndex = self.getRuleLineIndex(data, ruleStart)
+            if ruleLineIndex is None:
+                continue
+
+            # recipe: all following lines that start with a tab
+            recipe = []
+            for line in data[ruleLineIndex + 1:]:
+                if not line.startswith('\t'):
+                    break
+                recipe.append(line.strip())
+            commandLine = ' '.join(recipe)
+            if '#' in commandLine:
+                continue  # would be a comment in variable assignment
+
+            fingerprintFileName = fingerprintName + tmpStr.commandFingerprintFileSuffix
+            line = data[ruleLineIndex]
+            prerequisitesEnd = line.find('|')
+            if prerequisitesEnd == -1:
+                prerequisitesEnd = len(line.rstrip())
+            prerequisites = line[:prerequisitesEnd]
+            prerequisites = re.sub(r'(?<=\s)Makefile(?=\s|$)', "$(" + fingerprintFileName + ")", prerequisites, count=1)
+            data[ruleLineIndex] = prerequisites + line[prerequisitesEnd:]
+
+            fingerprintLines.append(fingerprintName + " := " + commandLine + "\n")
+            fingerprintRuleLines.append(fingerprintFileName + " = " + fingerprintFile + "\n")
+            fallbackLines.append(fingerprintFileName + " = Makefile\n")
+
+            fingerprintRuleLines.append("$(" + fingerprintFileName + "): ")
+            fingerprintRuleLines.append("$(call fingerprintChanged," + fingerprintName + ") | $(BUILD_DIR)\n")
+            fingerprintRuleLines.append(tmpStr.commandFingerprintRecipe.replace('***', fingerprintName))
+            fingerprintRuleLines.append("\n")
+
+            if (firstRuleLineIndex is None) or (ruleLineIndex < firstRuleLineIndex):
+                firstRuleLineIndex = ruleLineIndex
+
+        if firstRuleLineIndex is None:
+            print("Command line fingerprints not added, no CubeMX object rules found in Makefile.")
+            return data
+
+        fingerprintLines.append("\n")
+        fingerprintLines.append(tmpStr.commandFingerprintSupported)
+        fingerprintLines.append(tmpStr.commandFingerprintFunction)
+        fingerprintLines.append("\n")
+        fingerprintLines.extend(''.join(fingerprintRuleLines).splitlines(True))
+        fingerprintLines.append(tmpStr.commandFingerprintChanged + ":\n")
+        fingerprintLines.append("else\n")
+        fingerprintLines.extend(fallbackLines)
+        fingerprintLines.append("endif\n")
+        fingerprintLines.append("\n")
+
+        # fingerprint rules are added after 'all' (default target) and before first fingerprinted rule: variables used
+        # in recipes are already defined
+        data[firstRuleLineIndex:firstRuleLineIndex] = tmpStr.commandFingerprintHeader.splitlines(True) + fingerprintLines
+
+        return data
+
+    def getPrecompiledHeaderPath(self, precompiledHeader, cIncludes):
+        '''
+        Returns path (relative to workspace folder, if possible) of header that is precompiled or None if precompiled
+        header is not enabled or not found. 'precompiledHeader' is 'user_precompiledHeader' value:
+            - "false": precompiled header is not used
+            - "true": the first of 'defaultPrecompiledHeaders' ('main.h', 'stm32xxxx_hal.h') found in 'cIncludes' folders
+            - any other value: header path or file name (searched in 'cIncludes' folders)
+        '''
+        if not isinstance(precompiledHeader, str):
+            return None
+        precompiledHeader = precompiledHeader.strip()
+        if precompiledHeader.lower() in ['', 'false', '0']:
+            return None
+
+        includeFolderPaths = [self.workspace.resolvePath(include) for include in cIncludes]
+        includeFolderPaths = [folderPath for folderPath in includeFolderPaths if os.path.isdir(folderPath)]
+
+        headerPath = None
+        if precompiledHeader.lower() in ['true', '1']:
+            for headerRegex in self.defaultPrecompiledHeaders:
+                headerPaths = [os.path.join(folderPath, fileName) for folderPath in includeFolderPaths
+                               for fileName in sorted(os.listdir(folderPath)) if headerRegex.match(fileName)]
+                if headerPaths:
+                    headerPath = headerPaths[0]
+                    break
+        elif os.path.isfile(self.workspace.resolvePath(precompiledHeader)):
+            headerPath = self.workspace.resolvePath(precompiledHeader)
+        else:
+            for folderPath in includeFolderPaths:
+                if os.path.isfile(os.path.join(folderPath, precompiledHeader)):
+                    headerPath = os.path.join(folderPath, precompiledHeader)
+                    break
+
+        if headerPath is None:
+            print("WARNING: precompiled header '" + precompiledHeader + "' not found, precompiled header is not used.")
+            return None
+
+        relativePath = os.path.relpath(headerPath, self.workspace.workspacePath)
+        if not relativePath.startswith('..'):
+            headerPath = relativePath
+
+        return utils.pathWithForwardSlashes(headerPath)
+
+    def addPrecompiledHeader(self, data, headerPath):
+        '''
+        Add precompiled header block (see 'templateStrings.precompiledHeaderBlock') before CubeMX C object rule: header
+        is compiled to '$(BUILD_DIR)/<header name>.gch' with the same C flags, and C objects depend on it and are
+        compiled with '-include $(BUILD_DIR)/<header name>'. Header is rebuilt if C command line fingerprint (see
+        addCommandLineFingerprints()) or any of its own dependencies (dependency file) changes.
+        '''
+        data = ''.join(data).splitlines(True)
+
+        ruleLineIndex = None
+        for lineIndex, line in enumerate(data):
+            if line.startswith(tmpStr.precompiledHeaderRule):
+                ruleLineIndex = lineIndex
+                break
+        if ruleLineIndex is None:
+            print("Precompiled header not added, '" + tmpStr.precompiledHeaderRule + "' rule not found in Makefile.")
+            return data
+
+        # C objects depend on precompiled header and are compiled with it
+        line = data[ruleLineIndex]
+        prerequisitesEnd = line.find('|')
+        if prerequisitesEnd == -1:
+            prerequisitesEnd = len(line.rstrip())
+        data[ruleLineIndex] = line[:prerequisitesEnd].rstrip() + " $(PCH).gch " + line[prerequisitesEnd:].lstrip(' ')
+        for lineIndex in range(ruleLineIndex + 1, len(data)):
+            if not data[lineIndex].startswith('\t'):
+                break
+            data[lineIndex] = data[lineIndex].replace('$(CFLAGS)', '$(CFLAGS) $(PCH_FLAGS)', 1)
+
+        block = tmpStr.precompiledHeaderBlock.replace('***', headerPath)
+        if any(line.startswith(tmpStr.precompiledHeaderFingerprint + " := ") for line in data):
+            fingerprintFileName = tmpStr.precompiledHeaderFingerprint + tmpStr.commandFingerprintFileSuffix
+            block = block.replace('+++', "$(" + fingerprintFileName + ")")
+        else:
+            block = block.replace('+++', 'Makefile')
+        data[ruleLineIndex:ruleLineIndex] = block.splitlines(True)
+
+        return data
+
+    def getRuleLineIndex(self, data, ruleStart):
+        '''
+        Returns index of rule line that starts with 'ruleStart' and depends on 'Makefile' or None if not found.
+        '''
+        for lineIndex, line in enumerate(data):
+            if line.startswith(ruleStart):
+                prerequisites = line[len(ruleStart):].split('|')[0].split()
+                if 'Makefile' in prerequisites:
+                    return lineIndex
+
+        return None
+
+    def isMakefileChanged(self, data):
+        '''
+        Returns True if 'data' lines differ from current 'Makefile' content, False otherwise.
+        Header 'Last run' timestamp line is ignored, since it is different on every run.
+        '''
+        if not utils.pathExists(self.workspace.makefilePath):
+            return True
+
+        with open(self.workspace.makefilePath, 'r') as makefile:
+            currentData = makefile.readlines()
+
+        # compare joined content, since 'data' items are not necessarily single lines
+        lastRunLine = "# " + tmpStr.lastRunString.replace('***', '')
+        currentData = [line for line in currentData if not line.startswith(lastRunLine)]
+        newData = [line for line in ''.join(data).splitlines(True) if not line.startswith(lastRunLine)]
+
+        return ''.join(currentData) != ''.join(newData)
+
     def searchAndAppend(self, data, searchString, appendData, preappend=None):
         '''
-        Search for string in 'data' list and append 'appendData' according to Makefile syntax.
+        Search for variable 'searchString' in 'data' list and append 'appendData' according to Makefile syntax.
         if 'preappend' is defined, each item of 'appendData' is preappended with this string.
+        'data' list is modified in place and returned. For multiple changes, use appendToVariable() on the same
+        'makefileParser.MakefileDocument'.
         '''
-        NOT_FOUND = -1
+        document = mkfParser.MakefileDocument(data)
+        self.appendToVariable(document, searchString, appendData, preappend)
+
+        data[:] = document.getLines()
+        return data
+
+    def searchAndCleanData(self, data, searchString):
+        '''
+        Search for variable 'searchString' in 'data' list and clear all belonging data according to Makefile syntax.
+        'data' list is modified in place and returned. For multiple changes, use cleanVariable() on the same
+        'makefileParser.MakefileDocument'.
+        '''
+        document = mkfParser.MakefileDocument(data)
+        self.cleanVariable(document, searchString)
+
+        data[:] = document.getLines()
+        return data
+
+    def appendToVariable(self, document, variableName, appendData, preappend=None):
+        '''
+        Append 'appendData' (list of items or string) to 'variableName' block of 'makefileParser.MakefileDocument'.
+        if 'preappend' is defined, each item of 'appendData' is preappended with this string.
+        '''
+        if not document.hasVariable(variableName):
+            errorMsg = "String item " + str(variableName) + " not found!"
+            utils.printAndQuit(errorMsg)
 
         if preappend is not None:
             appendData = utils.preappendString(appendData, preappend)
 
-        for lineIndex, line in enumerate(data):
-            line = line.rstrip('\n')  # strip string of '\n'
-
-            if line.find(searchString) != NOT_FOUND:  # search for start string
-                if line[0] == '#':  # this is a comment
-                    continue
-
-                if line.find("\\") == NOT_FOUND:
-                    # one-liner, no '\' sign at the end of the line
-                    if isinstance(appendData, list):  # if this is list
-                        if appendData:  # and it is not empty
-                            if len(appendData) == 1:  # this list has only one item, add it without '\'
-                                if line[-1] != ' ':  # avoid double spaces
-                                    line += " "
-                                data[lineIndex] = line + appendData[0] + "\n"
-
-                            else:
-                                # this is list with multiple items, '\' will be needed
-                                line += " \\\n"
-                                data[lineIndex] = line
-
-                                for itemIndex, item in enumerate(appendData):
-                                    stringToInsert = item
-                                    if item != appendData[-1]:  # for last item do not append "\"
-                                        stringToInsert += "\\"
-                                    stringToInsert += "\n"  # new line must always be added
-                                    data.insert(lineIndex + itemIndex + 1, stringToInsert)
-
-                            return data
-
-                    else:  # appendData is string (not list)
-                        if appendData != '':
-                            if data[lineIndex][-1] != ' ':  # avoid double spaces
-                                data[lineIndex] += " "
-                            data[lineIndex] += appendData + "\n"
-
-                    return data
-                else:  # already a multi-liner, append at the beginning, but in new line
-                    if isinstance(appendData, list):
-                        for itemIndex, item in enumerate(appendData):
-                            stringToInsert = item + " \\\n"
-                            data.insert(lineIndex + itemIndex + 1, stringToInsert)
-                    else:  # appendData is string (not list)
-                        data[lineIndex] += item + " \\\n"
-
-                    return data
-
-        errorMsg = "String item " + str(searchString) + " not found!"
-        utils.printAndQuit(errorMsg)
+        if not isinstance(appendData, list):  # appendData is string (not list)
+            if appendData != '':
+                appendData = [appendData]
+            else:
+                appendData = []
 
-    def searchAndCleanData(self, data, searchString):
+        document.appendToVariable(variableName, appendData)
+
+    def cleanVariable(self, document, variableName):
         '''
-        Search for string in 'data' list and clear all belonging data according to Makefile syntax.
+        Clear all items of 'variableName' block of 'makefileParser.MakefileDocument'.
         '''
-        NOT_FOUND = -1
+        if not document.hasVariable(variableName):
+            errorMsg = "String item " + str(variableName) + " not found!"
+            utils.printAndQuit(errorMsg)
 
-        for lineIndex, line in enumerate(data):
-            line = line.rstrip('\n')  # strip string of '\n'
-
-            if line.find(searchString) != NOT_FOUND:  # search for start string
-                if line[0] == '#':  # this is a comment
-                    continue
-                if line.find("\\") == NOT_FOUND:
-                    # keep searchString and equaliy sign, append '\n'
-                    equalitySignCharIndex = line.find('=')
-                    data[lineIndex] = data[lineIndex][: equalitySignCharIndex+1] + ' \n'
-                    return data
-
-                else:  # multi-liner, get last line index and delete this lines
-                    lastLineIndex = lineIndex + 1
-                    while data[lastLineIndex].rstrip('\n') != '':
-                        lastLineIndex = lastLineIndex + 1
-                        if lastLineIndex >= len(data):
-                            errorMsg = "Unable to find end of multi-line Makefile item (" + searchString + "). "
-                            errorMsg += "Was Makefile manually modified?"
-                            utils.printAndQuit(errorMsg)
-                    # delete this lines
-                    delLineIndex = lineIndex + 1
-                    constLineIndex = lineIndex + 1  # this line will be deleted until an empty line is present
-                    while delLineIndex != lastLineIndex:
-                        del data[constLineIndex]
-                        delLineIndex = delLineIndex + 1
-                    # keep searchString and equaliy sign, append '\n'
-                    equalitySignCharIndex = line.find('=')
-                    data[lineIndex] = line[: equalitySignCharIndex+1] + ' \n'
-                    return data
-
-        errorMsg = "String item " + str(searchString) + " not found!"
-        utils.printAndQuit(errorMsg)
+        document.clearVariable(variableName)
 
     ########################################################################################################################
 
@@ -369,27 +690,106 @@ class Makefile():
 
         With
         '''
-        # change directory to the same folder as Makefile
-        cwd = os.getcwd()
-        os.chdir(utils.workspacePath)
-
         printStatement = "print-" + str(variableName)
         gccExeFolderPath = os.path.dirname(gccExePath)
         # gccPath = "\"\"GCC_PATH=" + gccExeFolderPath
         gccPath = "GCC_PATH=\"" + gccExeFolderPath + "\""
         arguments = [makeExePath, gccPath, printStatement]
 
-        proc = Popen(arguments, stdout=PIPE)
-        returnString = str((proc.communicate()[0]).decode('UTF-8'))
+        with prof.measure(prof.eventProcess, "make " + printStatement):
+            proc = Popen(arguments, stdout=PIPE, cwd=self.workspace.workspacePath)  # run in the same folder as Makefile
+            returnString = str((proc.communicate()[0]).decode('UTF-8'))
         returnString = returnString.rstrip('\n')
         returnString = returnString.rstrip('\r')
 
-        os.chdir(cwd)  # change directory back to where it was
-
         if returnString.find("make: *** No rule to make target") != -1:
             errorMsg = "Can't retrieve " + variableName + " value from makefile."
             utils.printAndQuit(errorMsg)
 
+        return self.parseMakefileVariableString(returnString, variableName)
+
+    def getMakefileVariables(self, makeExePath, gccExePath, variableNames, makefileLines):
+        '''
+        Get values of all 'variableNames' from Makefile 'makefileLines'.
+        Makefile is evaluated with python (see evaluateMakefileVariables()), without calling 'make'. If Makefile contains
+        constructs that can't be evaluated with python, 'make' is called (see printMakefileVariables()).
+        Returns dictionary of variable names and their values (list of items, as returned by getMakefileVariable()).
+        '''
+        try:
+            return self.evaluateMakefileVariables(gccExePath, variableNames, makefileLines)
+        except mkfParser.MakefileEvaluatorError as err:
+            msg = "Makefile can't be evaluated without 'make' (" + str(err) + "). Calling 'make' instead."
+            print(msg)
+
+        return self.printMakefileVariables(makeExePath, gccExePath, variableNames, makefileLines)
+
+    def evaluateMakefileVariables(self, gccExePath, variableNames, makefileLines):
+        '''
+        Get values of all 'variableNames' by evaluating Makefile with 'makefileParser.MakefileEvaluator'.
+        Variables are evaluated as they would be by 'print-VARIABLE' Makefile function (the same 'GCC_PATH' command line
+        variable and automatic variables) and printed by shell 'echo' (quotes and backslash escapes removed, see
+        'makefileParser.getShellEchoOutput()'), so returned values are the same as from printMakefileVariables().
+        Raises 'makefileParser.MakefileEvaluatorError' if Makefile (or any variable value) can't be evaluated.
+        '''
+        gccExeFolderPath = os.path.dirname(gccExePath)
+        commandLineVariables = {'GCC_PATH': "\"" + gccExeFolderPath + "\""}
+        evaluator = mkfParser.MakefileEvaluator(makefileLines, commandLineVariables, self.workspace.workspacePath)
+
+        variables = {}
+        for variableName in variableNames:
+            printStatement = "print-" + str(variableName)
+            automaticVariables = {'@': printStatement, '*': variableName}
+            value = mkfParser.getShellEchoOutput(evaluator.getVariable(variableName, automaticVariables))
+            returnString = tmpStr.printMakefileDefaultString + value
+            variables[variableName] = self.parseMakefileVariableString(returnString, variableName)
+
+        return variables
+
+    def printMakefileVariables(self, makeExePath, gccExePath, variableNames, makefileLines):
+        '''
+        Get values of all 'variableNames' with a single make call, instead of calling getMakefileVariable() for each
+        variable. Each variable is passed as a separate 'print-VARIABLE' goal, while 'makefileLines' are passed to make
+        via stdin (so they don't need to be written to 'Makefile' first):
+            "path to make.exe" -f - GCC_PATH="path to gcc folder" -j1 print-VARIABLE1 print-VARIABLE2 ...
+
+        Goals are executed in the given order ('-j1' forces serial execution even if MAKEFLAGS specify parallel jobs),
+        so each output line belongs to the variable with the same index.
+        Returns dictionary of variable names and their values (list of items, as returned by getMakefileVariable()).
+        '''
+        gccExeFolderPath = os.path.dirname(gccExePath)
+        gccPath = "GCC_PATH=\"" + gccExeFolderPath + "\""
+        arguments = [makeExePath, "-f", "-", gccPath, "-j1"]
+        for variableName in variableNames:
+            arguments.append("print-" + str(variableName))
+
+        makefileContent = ''.join(makefileLines).encode('UTF-8')
+        with prof.measure(prof.eventProcess, "make -f - " + " ".join(arguments[5:])):
+            proc = Popen(arguments, stdin=PIPE, stdout=PIPE, cwd=self.workspace.workspacePath)  # Makefile folder
+            returnString = str((proc.communicate(makefileContent)[0]).decode('UTF-8'))
+
+        # each print statement output starts with "VARIABLE=". Ignore any other lines (like 'make: Entering directory')
+        returnLines = []
+        for line in returnString.splitlines():
+            line = line.rstrip('\r')
+            if line.startswith(tmpStr.printMakefileDefaultString):
+                returnLines.append(line)
+
+        if (proc.returncode != 0) or (len(returnLines) != len(variableNames)):
+            errorMsg = "Can't retrieve " + str(variableNames) + " values from makefile."
+            utils.printAndQuit(errorMsg)
+
+        variables = {}
+        for variableName, line in zip(variableNames, returnLines):
+            variables[variableName] = self.parseMakefileVariableString(line, variableName)
+
+        return variables
+
+    def parseMakefileVariableString(self, returnString, variableName):
+        '''
+        Parse output of 'print-variableName' Makefile function to list of items.
+        '''
+        printStatement = "print-" + str(variableName)
+
         # remove "VARIABLE=" string start. This string must be present, or 'Echo is off.' is displayed for empy variables.
         if returnString.find(tmpStr.printMakefileDefaultString) != -1:
             returnString = returnString.replace(tmpStr.printMakefileDefaultString, '')
@@ -413,40 +813,33 @@ class Makefile():
     def replaceMakefileHeader(self, data):
         '''
         Change header, to distinguish between original and new Makefile.
+        'data' list is modified in place and returned.
         '''
-        # first find last line before '# target', that must not be changed
-        lastLine = None
-        for lineIndex, line in enumerate(data):
-            twoLinesAhead = data[lineIndex + 2]  # first line is ######... and second should be '# target'
-            twoLinesAhead = twoLinesAhead.rstrip('\n')  # strip string of '\n'
-            if twoLinesAhead.find("# target") != -1:  # search for start string
-                lastLine = lineIndex
-                break
-        if lastLine is None:
-            print('')  # previously there was no new line
-            errorMsg = "Makefile '# target' string missing.\n"
-            errorMsg += "Invalid/changed Makefile or this script is outdated (change in CubeMX Makefile syntax?)."
-            utils.printAndQuit(errorMsg)
+        document = mkfParser.MakefileDocument(data)
+        self.replaceDocumentHeader(document)
 
-        else:  # '# target' line found
-            # delete current header
-            lineIndex = 0
-            while lineIndex != lastLine:
-                lineIndex = lineIndex + 1
-                del data[0]
+        data[:] = document.getLines()
+        return data
 
-            # add new header
-            for line in reversed(tmpStr.makefileHeader.splitlines()):
-                if line.find(tmpStr.versionString) != -1:
-                    line = line.replace('***', __version__)
-                if line.find(tmpStr.lastRunString) != -1:
-                    timestamp = datetime.datetime.now()
-                    line = line.replace('***', str(timestamp))
+    def replaceDocumentHeader(self, document):
+        '''
+        Change header of 'makefileParser.MakefileDocument' (all lines before '# target' section).
+        '''
+        headerLines = []
+        for line in tmpStr.makefileHeader.splitlines():
+            if line.find(tmpStr.versionString) != -1:
+                line = line.replace('***', __version__)
+            if line.find(tmpStr.lastRunString) != -1:
+                timestamp = datetime.datetime.now()
+                line = line.replace('***', str(timestamp))
 
-                line = line + "\n"
-                data.insert(0, line)
+            headerLines.append(line + "\n")
 
-        return data
+        if not document.replaceHeader(headerLines):
+            print('')  # previously there was no new line
+            errorMsg = "Makefile '# target' string missing.\n"
+            errorMsg += "Invalid/changed Makefile or this script is outdated (change in CubeMX Makefile syntax?)."
+            utils.printAndQuit(errorMsg)
 
     def hasPrintCapabilities(self, pathToMakefile):
         '''
@@ -465,23 +858,18 @@ class Makefile():
 
         return False
 
-    def addMakefileCustomFunctions(self, pathToMakefile):
+    def addMakefileCustomFunctions(self, makefileDataLines):
         '''
-        Add all functions to makefile:
+        Add all functions to makefile data lines:
             - print-variable
             - clean-build-dir
 
-        This function is called only if current Makefile does not have 'print-variable' capabilities.
+        This function is called only with original Makefile data (without 'print-variable' capabilities).
+        Returns modified makefile data lines.
         '''
-        with open(pathToMakefile, 'r+') as makefile:
-            makefileDataLines = makefile.readlines()
+        makefileDataLines = self.addPrintVariableFunction(makefileDataLines)
 
-            makefileDataLines = self.addPrintVariableFunction(makefileDataLines)
-
-            makefile.seek(0)
-            makefile.truncate()
-            for line in makefileDataLines:
-                makefile.write(line)
+        return makefileDataLines
 
     def addPrintVariableFunction(self, makefileDataLines):
         '''
@@ -510,13 +898,13 @@ if __name__ == "__main__":
 
     buildData = bData.prepareBuildData()
 
-    makefile.restoreOriginalMakefile()
+    originalMakefileLines = makefile.restoreOriginalMakefile()
     makeExePath = buildData[bData.bStr.buildToolsPath]
     gccExePath = buildData[bData.bStr.gccExePath]
-    makefileData = makefile.getMakefileData(makeExePath, gccExePath)
+    makefileData = makefile.getMakefileData(makeExePath, gccExePath, originalMakefileLines)
 
     buildData = bData.addMakefileDataToBuildDataFile(buildData, makefileData)
 
     # get data from 'c_cpp_properties.json' and create new Makefile
     cP.checkCPropertiesFile()
-    makefile.createNewMakefile()  # reads 'c_cpp_properties.json' internally
+    makefile.createNewMakefile(originalMakefileLines)  # reads 'c_cpp_properties.json' internally
@@ -0,0 +1,180 @@
+'''
+Generate (replace existing) 'build.ninja' file in workspace folder, next to 'Makefile'.
+
+Ninja build file is generated from the same data as 'buildData.json' (sources, flags, linker script, libraries) and
+builds the same '.elf', '.hex' and '.bin' files as CubeMX Makefile:
+    - explicit build statement for each object file (no 'vpath' search)
+    - header dependencies from GCC '-MMD' output ('deps = gcc')
+    - command line changes are tracked by ninja itself, so no fingerprint files are needed
+
+Build with 'Build project (Ninja)' task or 'ninja' command in workspace folder. 'ninja' must be in system PATH.
+'''
+import os
+
+import utilities as utils
+import templateStrings as tmpStr
+
+import updatePaths as pth
+import updateBuildData as build
+
+__version__ = utils.__version__
+
+
+class NinjaFile():
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.bStr = build.BuildDataStrings()
+
+    def getToolPath(self, gccExePath, toolName):
+        '''
+        Returns path of other GCC toolchain executable ('objcopy', 'size', ...), placed next to 'gccExePath'.
+            'C:/gcc/bin/arm-none-eabi-gcc.exe' -> 'C:/gcc/bin/arm-none-eabi-objcopy.exe'
+        '''
+        gccExeFolder, gccExeName = os.path.split(gccExePath)
+        gccName, extension = os.path.splitext(gccExeName)
+        if gccName.endswith('gcc'):
+            gccName = gccName[:-len('gcc')]
+        else:
+            gccName = ''  # unknown naming, tool is expected to be in the same folder
+
+        toolPath = os.path.join(gccExeFolder, gccName + toolName + extension)
+        return utils.pathWithForwardSlashes(toolPath)
+
+    def getObjectFiles(self, sources, buildDir):
+        '''
+        Returns list of object file paths for 'sources', placed in 'buildDir' (as in CubeMX Makefile).
+        If more sources have the same file name, their objects keep source folders structure inside 'buildDir'.
+        '''
+        objectNames = [os.path.splitext(os.path.basename(source))[0] for source in sources]
+
+        objectFiles = []
+        for source, objectName in zip(sources, objectNames):
+            if objectNames.count(objectName) > 1:
+                objectName = os.path.splitext(source)[0]
+            objectFiles.append(buildDir + "/" + objectName + ".o")
+
+        return objectFiles
+
+    def getLinkerScripts(self, ldFlags):
+        '''
+        Returns list of linker scripts, given with '-T' option in 'ldFlags'.
+        '''
+        linkerScripts = []
+        for flagIndex, flag in enumerate(ldFlags):
+            if flag == '-T':
+                if flagIndex + 1 < len(ldFlags):
+                    linkerScripts.append(ldFlags[flagIndex + 1])
+            elif flag.startswith('-T'):
+                linkerScripts.append(flag[len('-T'):])
+
+        return linkerScripts
+
+    def getFlags(self, flags):
+        '''
+        Returns flags as ninja variable value. '-MF' (without argument, since Makefile fetches it as empty
+        '$(@:%.o=%.d)') is removed, dependency file is given by rule.
+        '''
+        flags = [flag for flag in flags if flag != '-MF']
+        return ' '.join(quoteArgument(flag) for flag in flags)
+
+    def getNinjaFileData(self, buildData):
+        '''
+        Returns content of 'build.ninja' file, generated from 'buildData'.
+        '''
+        gccExePath = buildData[self.bStr.gccExePath]
+        buildDir = buildData[self.bStr.buildDirPath]
+        targetExecutablePath = buildData[self.bStr.targetExecutablePath]
+        targetBasePath = os.path.splitext(targetExecutablePath)[0]
+
+        cSources = buildData[self.bStr.cSources]
+        asmSources = buildData[self.bStr.asmSources]
+        objectFiles = self.getObjectFiles(cSources + asmSources, buildDir)
+
+        data = tmpStr.ninjaFileHeader
+        data += "ninja_required_version = 1.3\n"
+        data += "builddir = " + escapePath(buildDir) + "\n\n"
+
+        data += "cc = " + quoteArgument(gccExePath) + "\n"
+        data += "objcopy = " + quoteArgument(self.getToolPath(gccExePath, 'objcopy')) + "\n"
+        data += "cflags = " + self.getFlags(buildData[self.bStr.cFlags]) + "\n"
+        data += "ldflags = " + self.getFlags(buildData[self.bStr.ldFlags]) + "\n\n"
+
+        data += tmpStr.ninjaFileRules + "\n"
+
+        for source, objectFile in zip(cSources + asmSources, objectFiles):
+            if source in cSources:
+                rule = 'cc'
+            else:
+                rule = 'as'
+            data += "build " + escapePath(objectFile) + ": " + rule + " " + escapePath(source) + "\n"
+            data += "  dep = " + quoteArgument(os.path.splitext(objectFile)[0] + ".d") + "\n"
+
+        # linker scripts are implicit dependencies, they are given in 'ldflags'
+        linkerScripts = self.getLinkerScripts(buildData[self.bStr.ldFlags])
+        data += "\nbuild " + escapePath(targetExecutablePath) + ": link"
+        data += "".join(" " + escapePath(objectFile) for objectFile in objectFiles)
+        if linkerScripts:
+            data += " |" + "".join(" " + escapePath(linkerScript) for linkerScript in linkerScripts)
+        data += "\n"
+        data += "build " + escapePath(targetBasePath + ".hex") + ": hex " + escapePath(targetExecutablePath) + "\n"
+        data += "build " + escapePath(targetBasePath + ".bin") + ": bin " + escapePath(targetExecutablePath) + "\n\n"
+
+        allTargets = [targetExecutablePath, targetBasePath + ".hex", targetBasePath + ".bin"]
+        data += "build all: phony " + " ".join(escapePath(target) for target in allTargets) + "\n"
+        data += "default all\n"
+
+        return data
+
+    def createNinjaFile(self, buildData):
+        '''
+        Create or overwrite 'build.ninja' file. File is written only if its content changed.
+        '''
+        data = self.getNinjaFileData(buildData)
+
+        if utils.pathExists(self.workspace.ninjaFilePath):
+            with open(self.workspace.ninjaFilePath, 'r') as ninjaFile:
+                if ninjaFile.read() == data:
+                    print("'build.ninja' file is up to date.")
+                    return
+
+        try:
+            with open(self.workspace.ninjaFilePath, 'w') as ninjaFile:
+                ninjaFile.write(data)
+
+            print("'build.ninja' file updated!")
+
+        except Exception as err:
+            errorMsg = "Exception error creating 'build.ninja' file:\n"
+            errorMsg += str(err)
+            utils.printAndQuit(errorMsg)
+
+
+def escapePath(path):
+    '''
+    Returns path escaped for ninja build statements: '$', ' ' and ':' are prefixed with '$'.
+    '''
+    return path.replace('$', '$$').replace(' ', '$ ').replace(':', '$:')
+
+
+def quoteArgument(argument):
+    '''
+    Returns command line argument for ninja command: '$' is escaped and argument with spaces is double quoted.
+    '''
+    argument = argument.replace('$', '$$')
+    if ' ' in argument:
+        argument = '"' + argument.replace('"', '\\"') + '"'
+    return argument
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    paths = pth.UpdatePaths()
+    bData = build.BuildData()
+    ninja = NinjaFile()
+
+    # build data (update tools paths if neccessary)
+    buildData = bData.prepareBuildData()
+
+    ninja.createNinjaFile(buildData)
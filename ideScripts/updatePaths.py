@@ -6,6 +6,8 @@ import os
 import shutil
 
 import utilities as utils
+import updateProfiler as prof
+import openOcdScripts as ocd
 import updateBuildData as build
 import updateTasks as tasks
 import updateLaunchConfig as launch
@@ -15,7 +17,8 @@ __version__ = utils.__version__
 
 
 class UpdatePaths():
-    def __init__(self):
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
         self.bStr = build.BuildDataStrings()
 
         # list of paths with explanatory names and (optionally) default path
@@ -78,11 +81,16 @@ class UpdatePaths():
 
                     elif pathName == self.bStr.openOcdConfig:
                         # get openOcdConfig - special handler
-                        toolsPaths[pathName] = utils.getOpenOcdConfig(toolsPaths[self.bStr.openOcdPath])
+                        toolsPaths[pathName] = ocd.getOpenOcdConfig(toolsPaths[self.bStr.openOcdPath], self.workspace)
 
                     elif pathName in self.pathsDescriptionsData:
                         name = self.pathsDescriptionsData[pathName]['name']
                         defaultPath = self.pathsDescriptionsData[pathName]['defaultPath']
+                        if pathName == self.bStr.openOcdInterfacePath:
+                            # default interface file from OpenOCD scripts index, if OpenOCD path is already known
+                            interfacePath = ocd.OpenOcdScripts(toolsPaths[self.bStr.openOcdPath], self.workspace).getInterfaceConfig()
+                            if interfacePath is not None:
+                                defaultPath = interfacePath
                         toolsPaths[pathName] = self.updatePath(name, defaultPath)
 
                     else:
@@ -96,7 +104,9 @@ class UpdatePaths():
                 toolsPaths[self.bStr.pythonExec] = utils.getPython3Executable()
 
             elif pathName == self.bStr.gccInludePath:
-                toolsPaths[self.bStr.gccInludePath] = utils.getGccIncludePath(toolsPaths[self.bStr.gccExePath])
+                gccExePath = toolsPaths[self.bStr.gccExePath]
+                toolsPaths[self.bStr.gccInludePath] = self.getCachedDerivedPath(toolsPaths, pathName, gccExePath,
+                                                                                utils.getGccIncludePath)
 
             else:
                 errorMsg = "ideScripts design error: pathName '" + pathName + "' is in 'self.bStr.derivedPaths' list, "
@@ -105,6 +115,27 @@ class UpdatePaths():
 
         return toolsPaths
 
+    def getCachedDerivedPath(self, toolsPaths, pathName, toolPath, getPathFunction):
+        '''
+        Returns derived path 'pathName' of a tool at 'toolPath' (for example, GCC include folder of 'gcc.exe').
+        Derived path is cached in 'toolsPaths' (stored in 'toolsPaths.json') per tool path and its version (size and
+        modification time), so 'getPathFunction(toolPath)' is called only if tool changed or cached path does not exist.
+        '''
+        toolVersion = utils.getFileVersion(toolPath)
+
+        cache = toolsPaths.setdefault(self.bStr.derivedPathsCache, {})
+        pathCache = cache.setdefault(pathName, {})
+        if toolPath in pathCache:
+            cacheEntry = pathCache[toolPath]
+            if (toolVersion is not None) and (cacheEntry["version"] == toolVersion):
+                if utils.pathExists(cacheEntry["path"]):
+                    return cacheEntry["path"]
+
+        path = getPathFunction(toolPath)
+        pathCache[toolPath] = {"version": toolVersion, "path": path}
+
+        return path
+
     def verifyTargetConfigurationPaths(self, buildData, request=False):
         '''
         This function checks if 'buildData.json' contains targetConfiguration paths.
@@ -129,12 +160,12 @@ class UpdatePaths():
                         mustBeUpdated = True
                     else:
                         for path in buildData[pathName]:
-                            if not utils.pathExists(path):
+                            if not utils.pathExists(self.workspace.resolvePath(path)):
                                 mustBeUpdated = True
                                 break
 
                 else:  # not a list, a single path expected
-                    if not utils.pathExists(buildData[pathName]):
+                    if not utils.pathExists(self.workspace.resolvePath(buildData[pathName])):
                         mustBeUpdated = True
                         # path not valid, check if command
                         if utils.commandExists(buildData[pathName]):
@@ -163,7 +194,7 @@ class UpdatePaths():
             if mustBeUpdated:
                 if pathName == self.bStr.openOcdConfig:
                     # get openOcdConfig - special handler
-                    buildData[pathName] = utils.getOpenOcdConfig(buildData[self.bStr.openOcdPath])
+                    buildData[pathName] = ocd.getOpenOcdConfig(buildData[self.bStr.openOcdPath], self.workspace)
 
                 elif pathName in self.bStr.derivedPaths:
                     name = self.bStr.derivedPaths[pathName]['name']
@@ -194,18 +225,18 @@ class UpdatePaths():
 
             newPaths = []
             for currentPath in currentPaths:
-                fileName = utils.getFileName(currentPath, withExtension=True)
-                fileInVsCodeFolder = os.path.join(utils.vsCodeFolderPath, fileName)
+                fileName = utils.getFileName(self.workspace.resolvePath(currentPath), withExtension=True)
+                fileInVsCodeFolder = os.path.join(self.workspace.vsCodeFolderPath, fileName)
 
                 if not utils.pathExists(fileInVsCodeFolder):
                     # file does not exist in '.vscode' folder
                     try:
-                        newPath = shutil.copy(currentPath, utils.vsCodeFolderPath)
+                        newPath = shutil.copy(self.workspace.resolvePath(currentPath), self.workspace.vsCodeFolderPath)
                     except Exception as err:
                         errorMsg = "Unable to copy file '" + fileName + "' to '.vscode' folder. Exception:\n" + str(err)
                         utils.printAndQuit(errorMsg)
 
-                newPath = os.path.relpath(fileInVsCodeFolder)
+                newPath = os.path.relpath(fileInVsCodeFolder, self.workspace.workspacePath)
                 newPath = utils.pathWithForwardSlashes(newPath)
                 newPaths.append(newPath)
 
@@ -228,7 +259,8 @@ class UpdatePaths():
 
         # not a path command, check if it's a command
         elif utils.commandExists(default):
-            pathDefault = shutil.which(default)
+            with prof.measure(prof.eventCommandLookup, default):
+                pathDefault = shutil.which(default)
 
         if pathDefault is not None:
             msg = "\n\tDefault path to '" + pathName + "' detected at '" + pathDefault + "'\n\tUse this path? [y/n]: "
@@ -257,13 +289,13 @@ if __name__ == "__main__":
     # update tasks
     tasks.checkTasksFile()
     tasksData = tasks.getTasksData()
-    tasksData = tasks.addAllTasks(tasksData)
+    tasksData = tasks.addAllTasks(tasksData, buildData)
     tasks.overwriteTasksFile(tasksData)
 
     # update launch configurations
     launch.checkLaunchFile()
     launchData = launch.getLaunchData()
-    launchData = launch.addAllLaunchConfigurations(launchData)
+    launchData = launch.addAllLaunchConfigurations(launchData, buildData)
     launch.overwriteLaunchFile(launchData)
 
     # update workspace file with "cortex-debug" specifics
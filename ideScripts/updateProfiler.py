@@ -0,0 +1,302 @@
+'''
+Instrumentation of 'update.py': wall time of each update stage and of each external operation ('make' calls,
+executable lookups and folder tree walks), and number of bytes read from and written to files.
+
+Profiling is disabled until enable() is called, so other scripts that use measured utilities are not affected.
+Results are printed as a breakdown table (printReport()) and can be written to a JSON report (writeReport()).
+'''
+import os
+import json
+import time
+import builtins
+import platform
+import datetime
+import contextlib
+
+# measured operations categories
+eventProcess = 'process'  # external process, like 'make'
+eventCommandLookup = 'commandLookup'  # executable lookup in PATH ('shutil.which()')
+eventFolderWalk = 'folderWalk'  # folder tree walk ('os.walk()')
+eventCategories = [eventProcess, eventCommandLookup, eventFolderWalk]
+
+noStageName = '(other)'  # time, operations and files outside of any stage
+
+enabled = False
+startTime = None
+stopTime = None
+currentStage = None  # currently running stage, see startStage()
+stages = []  # all stages, in order of execution: {name, time, bytesRead, bytesWritten}
+events = []  # all measured operations: {category, description, stage, time}
+files = {}  # file path: [bytes read, bytes written]
+
+builtinOpen = builtins.open
+
+
+def enable():
+    '''
+    Start profiling: measure time and count bytes of all files opened with 'open()' from now on.
+    '''
+    global enabled, startTime
+    enabled = True
+    startTime = time.perf_counter()
+    builtins.open = countingOpen
+
+
+def disable():
+    '''
+    Stop profiling (stop current stage, if any). Collected data is kept for reports.
+    '''
+    global enabled, stopTime
+    if enabled:
+        stopStage()
+        builtins.open = builtinOpen
+        stopTime = time.perf_counter()
+        enabled = False
+
+
+def startStage(name):
+    '''
+    Start measuring stage with this 'name'. Currently running stage (if any) is stopped.
+    '''
+    global currentStage
+    if not enabled:
+        return
+
+    stopStage()
+    currentStage = {'name': name, 'time': 0.0, 'bytesRead': 0, 'bytesWritten': 0}
+    currentStage['startTime'] = time.perf_counter()
+    stages.append(currentStage)
+
+
+def stopStage():
+    '''
+    Stop measuring currently running stage.
+    '''
+    global currentStage
+    if currentStage is not None:
+        currentStage['time'] = time.perf_counter() - currentStage.pop('startTime')
+        currentStage = None
+
+
+@contextlib.contextmanager
+def measure(category, description):
+    '''
+    Context manager that measures wall time of an operation (external process, command lookup, ...).
+        with prof.measure(prof.eventProcess, "make print-VARIABLE"):
+            ...
+    '''
+    if not enabled:
+        yield
+        return
+
+    operationStartTime = time.perf_counter()
+    try:
+        yield
+    finally:
+        event = {
+            'category': category,
+            'description': description,
+            'stage': getCurrentStageName(),
+            'time': time.perf_counter() - operationStartTime
+        }
+        events.append(event)
+
+
+def getCurrentStageName():
+    if currentStage is None:
+        return noStageName
+    return currentStage['name']
+
+
+def addFileBytes(filePath, bytesRead, bytesWritten):
+    '''
+    Add number of bytes read from/written to file to its totals and to the currently running stage.
+    '''
+    fileBytes = files.setdefault(os.path.abspath(filePath), [0, 0])
+    fileBytes[0] += bytesRead
+    fileBytes[1] += bytesWritten
+
+    if currentStage is not None:
+        currentStage['bytesRead'] += bytesRead
+        currentStage['bytesWritten'] += bytesWritten
+
+
+def countingOpen(file, mode='r', *args, **kwargs):
+    '''
+    'open()' replacement (while profiling is enabled) that counts bytes read from and written to opened file.
+    '''
+    fileHandler = builtinOpen(file, mode, *args, **kwargs)
+    if isinstance(file, int):  # file descriptor, no path
+        return fileHandler
+    return CountingFile(fileHandler, file)
+
+
+class CountingFile():
+    '''
+    File object wrapper that counts bytes of data passed through read and write methods. Text is counted as encoded
+    with the file encoding. Other attributes are passed to the wrapped file object.
+    '''
+
+    def __init__(self, fileHandler, filePath):
+        self.fileHandler = fileHandler
+        self.filePath = filePath
+
+    def getSize(self, data):
+        if isinstance(data, str):
+            return len(data.encode(self.fileHandler.encoding, errors='replace'))
+        return len(data)
+
+    def read(self, *args):
+        data = self.fileHandler.read(*args)
+        addFileBytes(self.filePath, self.getSize(data), 0)
+        return data
+
+    def readline(self, *args):
+        data = self.fileHandler.readline(*args)
+        addFileBytes(self.filePath, self.getSize(data), 0)
+        return data
+
+    def readlines(self, *args):
+        data = self.fileHandler.readlines(*args)
+        addFileBytes(self.filePath, sum(self.getSize(line) for line in data), 0)
+        return data
+
+    def write(self, data):
+        addFileBytes(self.filePath, 0, self.getSize(data))
+        return self.fileHandler.write(data)
+
+    def writelines(self, lines):
+        lines = list(lines)
+        addFileBytes(self.filePath, 0, sum(self.getSize(line) for line in lines))
+        return self.fileHandler.writelines(lines)
+
+    def __iter__(self):
+        for line in self.fileHandler:
+            addFileBytes(self.filePath, self.getSize(line), 0)
+            yield line
+
+    def __enter__(self):
+        self.fileHandler.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self.fileHandler.__exit__(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.fileHandler, name)
+
+
+def getStagesSummary():
+    '''
+    Returns list of stages with number and time of measured operations (per category) and file bytes. Time, operations
+    and file bytes outside of stages are summed in 'noStageName' stage.
+    '''
+    if stopTime is None:
+        overallTime = time.perf_counter() - startTime
+    else:
+        overallTime = stopTime - startTime
+
+    summary = []
+    for stage in stages:
+        summary.append(dict(stage))
+
+    stagesTime = sum(stage['time'] for stage in summary)
+    stagesBytesRead = sum(stage['bytesRead'] for stage in summary)
+    stagesBytesWritten = sum(stage['bytesWritten'] for stage in summary)
+    noStage = {
+        'name': noStageName,
+        'time': max(overallTime - stagesTime, 0.0),
+        'bytesRead': sum(fileBytes[0] for fileBytes in files.values()) - stagesBytesRead,
+        'bytesWritten': sum(fileBytes[1] for fileBytes in files.values()) - stagesBytesWritten
+    }
+    summary.append(noStage)
+
+    for stage in summary:
+        for category in eventCategories:
+            stage[category] = {'count': 0, 'time': 0.0}
+    for event in events:
+        for stage in summary:
+            if stage['name'] == event['stage']:
+                stage[event['category']]['count'] += 1
+                stage[event['category']]['time'] += event['time']
+                break
+
+    return summary
+
+
+def printReport():
+    '''
+    Print breakdown table: time, measured operations ('count/time' in milliseconds) and file bytes of each stage.
+    '''
+    summary = getStagesSummary()
+    header = ['Stage', 'Time [ms]'] + [category + ' [n/ms]' for category in eventCategories]
+    header += ['Read [B]', 'Written [B]']
+
+    rows = []
+    totals = [0.0] + [[0, 0.0] for category in eventCategories] + [0, 0]
+    for stage in summary:
+        row = [stage['name'], "%.1f" % (stage['time'] * 1000)]
+        totals[0] += stage['time']
+        for categoryIndex, category in enumerate(eventCategories):
+            operations = stage[category]
+            row.append(str(operations['count']) + "/" + "%.1f" % (operations['time'] * 1000))
+            totals[categoryIndex + 1][0] += operations['count']
+            totals[categoryIndex + 1][1] += operations['time']
+        row.extend([str(stage['bytesRead']), str(stage['bytesWritten'])])
+        totals[-2] += stage['bytesRead']
+        totals[-1] += stage['bytesWritten']
+        rows.append(row)
+
+    totalRow = ['Total', "%.1f" % (totals[0] * 1000)]
+    for count, operationsTime in totals[1:-2]:
+        totalRow.append(str(count) + "/" + "%.1f" % (operationsTime * 1000))
+    totalRow.extend([str(totals[-2]), str(totals[-1])])
+
+    columnWidths = []
+    for columnIndex, title in enumerate(header):
+        width = max(len(row[columnIndex]) for row in rows + [header, totalRow])
+        columnWidths.append(width)
+
+    def formatRow(row):
+        cells = [row[0].ljust(columnWidths[0])]
+        for columnIndex, cell in enumerate(row[1:], start=1):
+            cells.append(cell.rjust(columnWidths[columnIndex]))
+        return "  ".join(cells)
+
+    separator = '-' * len(formatRow(header))
+    msg = "\nUpdate profile:\n" + formatRow(header) + "\n" + separator + "\n"
+    for row in rows:
+        msg += formatRow(row) + "\n"
+    msg += separator + "\n" + formatRow(totalRow)
+    print(msg)
+
+
+def writeReport(reportPath, info=None):
+    '''
+    Write JSON report with stages summary, all measured operations and file bytes to 'reportPath'.
+    'info' is an optional dictionary of additional data (status, version, ...) stored in the report.
+    '''
+    report = {
+        "DATE": str(datetime.datetime.now()),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpuCount": os.cpu_count()
+    }
+    if info is not None:
+        report.update(info)
+
+    report["stages"] = getStagesSummary()
+    report["operations"] = events
+    report["files"] = {}
+    for filePath, fileBytes in files.items():
+        report["files"][filePath] = {'bytesRead': fileBytes[0], 'bytesWritten': fileBytes[1]}
+
+    try:
+        with builtinOpen(reportPath, 'w') as reportFile:
+            json.dump(report, reportFile, indent=4, sort_keys=False)
+
+        print("Update profile report written to '" + reportPath + "'.")
+
+    except Exception as err:
+        print("Warning: unable to write update profile report '" + reportPath + "':\n" + str(err))
@@ -0,0 +1,237 @@
+'''
+Long-lived 'update.py' server with JSON-RPC 2.0 protocol over standard input/output.
+
+Modules, Makefile data, build data and tools paths stay loaded in memory between requests, so repeated requests
+(like compile flags of currently opened file) are answered without starting a new Python process and without
+calling 'make'. Start server from workspace folder (as other 'update*.py' scripts):
+    python ideScripts/updateServer.py
+
+Each request and response is one JSON object on a single line:
+    --> {"jsonrpc": "2.0", "id": 1, "method": "getCompileFlags", "params": {"file": "Core/Src/main.c"}}
+    <-- {"jsonrpc": "2.0", "id": 1, "result": {"file": "Core/Src/main.c", "arguments": [...], ...}}
+
+Methods (all params are optional, except 'file'):
+    - update {"force": false}: update workspace (see 'update.update()'), returns build data.
+    - getBuildData {}: returns current build data, as in 'buildData.json'.
+    - getCompileFlags {"file": path}: returns GCC command line of a file (absolute or relative to workspace folder).
+    - shutdown {}: stop server (also stopped when standard input is closed).
+Optional "workspace" parameter (absolute path to workspace folder) selects other workspace than default.
+
+Messages printed by update scripts are redirected to standard error. Interactive input is not available: if update
+needs user input (missing tools paths, ...), request fails and 'update.py' must be run in terminal once.
+'''
+import io
+import os
+import sys
+import json
+import time
+import contextlib
+import traceback
+
+import utilities as utils
+import updateBuildData as build
+import update
+
+__version__ = utils.__version__
+
+if sys.version_info[0] < 3:
+    raise Exception("Python 3 or later is required")
+
+# JSON-RPC 2.0 error codes
+errorParse = -32700
+errorInvalidRequest = -32600
+errorMethodNotFound = -32601
+errorInvalidParams = -32602
+errorUpdate = -32000  # update or build data request failed (see error message and 'data' with details)
+
+
+class RequestError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class WorkspaceState():
+    '''
+    Data of one workspace that is kept in memory between requests: workspace paths and last build data (valid until
+    'buildData.json' file changes).
+    '''
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.bData = build.BuildData(workspace)
+        self.buildData = None
+        self.buildDataVersion = None  # 'buildData.json' version (see utils.getFileVersion()) of 'buildData'
+
+    def setBuildData(self, buildData):
+        self.buildData = buildData
+        self.buildDataVersion = utils.getFileVersion(self.workspace.buildDataPath)
+
+    def getBuildData(self):
+        '''
+        Returns build data from memory, or from 'buildData.json' if file was changed since the last request.
+        '''
+        buildDataVersion = utils.getFileVersion(self.workspace.buildDataPath)
+        if buildDataVersion is None:
+            raise RequestError(errorUpdate, "'buildData.json' does not exist, 'update' request is required.")
+
+        if (self.buildData is None) or (buildDataVersion != self.buildDataVersion):
+            self.buildData = self.bData.getCachedBuildData()
+            self.buildDataVersion = buildDataVersion
+
+        return self.buildData
+
+
+class UpdateServer():
+    def __init__(self, defaultWorkspace, outputFile):
+        self.defaultWorkspace = defaultWorkspace
+        self.outputFile = outputFile  # protocol output, all other messages are printed to 'sys.stderr'
+        self.workspaces = {defaultWorkspace.workspacePath: WorkspaceState(defaultWorkspace)}
+        self.running = True
+
+        self.methods = {
+            'update': self.update,
+            'getBuildData': self.getBuildData,
+            'getCompileFlags': self.getCompileFlags,
+            'shutdown': self.shutdown
+        }
+
+    def run(self, inputFile):
+        '''
+        Handle requests (one per line) from 'inputFile' until 'shutdown' request or end of input.
+        '''
+        for line in inputFile:
+            if line.strip():
+                response = self.handleMessage(line)
+                if response is not None:
+                    self.outputFile.write(json.dumps(response) + "\n")
+                    self.outputFile.flush()
+
+            if not self.running:
+                break
+
+    def handleMessage(self, message):
+        '''
+        Handle one JSON-RPC request. Returns response (dictionary) or None if request is a notification (no 'id').
+        '''
+        requestId = None
+        try:
+            try:
+                request = json.loads(message)
+            except ValueError as err:
+                raise RequestError(errorParse, "Parse error: " + str(err))
+
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RequestError(errorInvalidRequest, "Invalid request: 'method' is missing.")
+            requestId = request.get('id')
+
+            if request['method'] not in self.methods:
+                raise RequestError(errorMethodNotFound, "Method not found: " + request['method'])
+
+            params = request.get('params', {})
+            if not isinstance(params, dict):
+                raise RequestError(errorInvalidParams, "Invalid params: named parameters (object) expected.")
+
+            startTime = time.perf_counter()
+            result = self.callMethod(self.methods[request['method']], params)
+            msg = "Request '" + request['method'] + "' done (" + "%.1f" % ((time.perf_counter() - startTime) * 1000)
+            print(msg + " ms).", file=sys.stderr)
+
+            if 'id' not in request:
+                return None
+            return {"jsonrpc": "2.0", "id": requestId, "result": result}
+
+        except RequestError as err:
+            error = {"code": err.code, "message": err.message}
+            if err.data is not None:
+                error["data"] = err.data
+            return {"jsonrpc": "2.0", "id": requestId, "error": error}
+
+    def callMethod(self, method, params):
+        '''
+        Call request method with standard output redirected to standard error and without standard input (protocol
+        streams). Update errors (including 'utils.printAndQuit()' and interactive input requests) are returned as
+        'errorUpdate' errors.
+        '''
+        stdin = sys.stdin
+        sys.stdin = io.StringIO()  # 'input()' raises EOFError
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                return method(params)
+
+        except RequestError:
+            raise
+        except EOFError:
+            errorMsg = "User input is required, run 'update.py' in terminal to update tools/target paths."
+            raise RequestError(errorUpdate, errorMsg)
+        except (Exception, SystemExit) as err:
+            raise RequestError(errorUpdate, "Request failed: " + str(err), traceback.format_exc())
+        finally:
+            sys.stdin = stdin
+
+    def getWorkspaceState(self, params):
+        '''
+        Returns 'WorkspaceState' of "workspace" request parameter (default workspace if not given).
+        '''
+        workspacePath = params.get('workspace')
+        if workspacePath is None:
+            return self.workspaces[self.defaultWorkspace.workspacePath]
+
+        workspacePath = utils.pathWithForwardSlashes(os.path.abspath(workspacePath))
+        if workspacePath not in self.workspaces:
+            self.workspaces[workspacePath] = WorkspaceState(utils.Workspace(workspacePath))
+
+        return self.workspaces[workspacePath]
+
+    def update(self, params):
+        state = self.getWorkspaceState(params)
+        options = update.UpdateOptions(forceAllStages=bool(params.get('force', False)))
+        buildData = update.update(state.workspace, options)
+        state.setBuildData(buildData)
+
+        return buildData
+
+    def getBuildData(self, params):
+        state = self.getWorkspaceState(params)
+
+        return state.getBuildData()
+
+    def getCompileFlags(self, params):
+        state = self.getWorkspaceState(params)
+
+        filePath = params.get('file')
+        if not isinstance(filePath, str):
+            raise RequestError(errorInvalidParams, "Invalid params: 'file' path is missing.")
+        filePath = os.path.relpath(state.workspace.resolvePath(filePath), state.workspace.workspacePath)
+        filePath = utils.pathWithForwardSlashes(filePath)
+
+        buildData = state.getBuildData()
+        arguments = state.bData.getCompileArguments(buildData, filePath)
+        result = {
+            "file": filePath,
+            "directory": state.workspace.workspacePath,
+            "compiler": arguments[0],
+            "arguments": arguments
+        }
+        return result
+
+    def shutdown(self, params):
+        self.running = False
+
+        return None
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    protocolOutput = sys.stdout
+    utils.interactive = False  # standard input is used for requests
+    with contextlib.redirect_stdout(sys.stderr):
+        # absolute paths, since workspace folder is also returned to clients (see getCompileFlags())
+        workspacePath = os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0])))
+        utils.setDefaultWorkspace(utils.Workspace(workspacePath))
+
+    server = UpdateServer(utils.defaultWorkspace, protocolOutput)
+    print("Update server started (version " + __version__ + "): " + utils.workspacePath, file=sys.stderr)
+    server.run(sys.stdin)
@@ -0,0 +1,137 @@
+'''
+Fingerprints of 'update.py' stages inputs, stored in '.vscode/updateState.json'.
+
+Each 'update.py' stage (Makefile, 'c_cpp_properties.json', 'buildData.json', 'tasks.json', ...) declares its inputs:
+data (tools paths, build data, ...) and files (Makefile, 'c_cpp_properties.json', ...). Files that stage writes are also
+listed as inputs, so stage runs again if user modifies or deletes any of its files.
+Stage is skipped if fingerprint of its inputs is the same as after the last successful run.
+
+This script can be called standalone to print current stages fingerprints.
+'''
+import os
+import json
+import hashlib
+
+import utilities as utils
+
+__version__ = utils.__version__
+
+
+class UpdateState():
+    def __init__(self, workspace=None, forceAllStages=False):
+        '''
+        If 'forceAllStages' is True, stored fingerprints are ignored and all stages run.
+        '''
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.stages = {}  # stage name: fingerprint
+        if not forceAllStages:
+            self.stages = self.getStateData()
+        self.environmentFingerprint = self.getEnvironmentFingerprint()
+
+    def getStateData(self):
+        '''
+        Get stages fingerprints from 'updateState.json'. Missing or invalid file means that all stages must run.
+        '''
+        if not utils.pathExists(self.workspace.updateStatePath):
+            return {}
+
+        try:
+            with open(self.workspace.updateStatePath, 'r') as stateFile:
+                data = json.load(stateFile)
+
+            if data["VERSION"] == __version__:
+                return data["stages"]
+
+        except Exception as err:
+            print("Invalid 'updateState.json' file, all update stages will run. Error:\n" + str(err))
+
+        return {}
+
+    def getEnvironmentFingerprint(self):
+        '''
+        Returns fingerprint of data that all stages depend on: workspace paths, OS, number of CPU cores and 'ideScripts'
+        python files (name, size and modification time), so all stages run again if user modifies any of 'update*.py'
+        scripts (for example, to add custom tasks).
+        '''
+        environment = [
+            self.workspace.workspacePath,
+            self.workspace.workspaceFilePath,
+            self.workspace.cubeMxProjectFilePath,
+            utils.detectOs(),
+            os.cpu_count()
+        ]
+
+        scripts = []
+        for fileName in sorted(os.listdir(self.workspace.ideScriptsPath)):
+            if fileName.endswith('.py'):
+                fileStat = os.stat(os.path.join(self.workspace.ideScriptsPath, fileName))
+                scripts.append([fileName, fileStat.st_size, fileStat.st_mtime_ns])
+
+        return self.getFingerprint([environment, scripts])
+
+    def getFingerprint(self, data, filePaths=None):
+        '''
+        Returns hash of JSON serializable 'data' and content of files in 'filePaths' list (missing files are allowed).
+        '''
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(data, sort_keys=True).encode('utf-8'))
+
+        if filePaths is not None:
+            for filePath in filePaths:
+                hasher.update(b'\0' + str(filePath).encode('utf-8') + b'\0')
+                if utils.pathExists(filePath):
+                    with open(filePath, 'rb') as inputFile:
+                        hasher.update(hashlib.sha256(inputFile.read()).digest())
+                else:
+                    hasher.update(b'missing')
+
+        return hasher.hexdigest()
+
+    def getStageFingerprint(self, data, filePaths=None):
+        '''
+        Returns fingerprint of stage inputs: 'data', files in 'filePaths' and environment (see getEnvironmentFingerprint()).
+        '''
+        return self.getFingerprint([self.environmentFingerprint, data], filePaths)
+
+    def isStageUpToDate(self, stageName, fingerprint):
+        '''
+        Returns True if stage 'stageName' inputs did not change since the last successful run.
+        '''
+        if self.stages.get(stageName) == fingerprint:
+            print("Update stage '" + stageName + "' is up to date, skipped.")
+            return True
+
+        return False
+
+    def setStageFingerprint(self, stageName, fingerprint):
+        '''
+        Store fingerprint of stage 'stageName' inputs after successful stage run. State file is written with
+        overwriteStateFile().
+        '''
+        self.stages[stageName] = fingerprint
+
+    def overwriteStateFile(self):
+        '''
+        Write all stages fingerprints to 'updateState.json'. Since this is cache only, errors are reported but not fatal.
+        '''
+        data = {
+            "ABOUT1": "This file holds fingerprints of 'update.py' stages inputs. Stages with unchanged inputs are skipped.",
+            "ABOUT2": "Delete this file to force all stages to run on next 'Update workspace' task.",
+            "VERSION": __version__,
+            "stages": self.stages
+        }
+        try:
+            with open(self.workspace.updateStatePath, 'w') as stateFile:
+                json.dump(data, stateFile, indent=4, sort_keys=False)
+
+        except Exception as err:
+            print("Exception error writing 'updateState.json' file (all stages will run next time):\n" + str(err))
+
+
+########################################################################################################################
+if __name__ == "__main__":
+    utils.verifyFolderStructure()
+
+    state = UpdateState()
+    for stageName, fingerprint in state.stages.items():
+        print(stageName + ": " + fingerprint)
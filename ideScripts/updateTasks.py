@@ -19,7 +19,13 @@ __version__ = utils.__version__
 
 
 class Tasks():
-    def __init__(self):
+    def __init__(self, buildData=None, workspace=None):
+        '''
+        'buildData' is optional in-memory build data (as in 'buildData.json'), shared by all generated items.
+        If not given, data is read from 'buildData.json' file (see getBuildData()).
+        '''
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
+        self.buildData = buildData
         self.cPStr = wks.CPropertiesStrings()
         self.mkfStr = mkf.MakefileStrings()
         self.bStr = build.BuildDataStrings()
@@ -29,10 +35,10 @@ class Tasks():
         Check if 'tasks.json' file exists. If it does, check if it is a valid JSON file.
         If it doesn't exist, create new according to template.
         '''
-        if utils.pathExists(utils.tasksPath):
+        if utils.pathExists(self.workspace.tasksPath):
             # file exists, check if it loads OK
             try:
-                with open(utils.tasksPath, 'r') as tasksFile:
+                with open(self.workspace.tasksPath, 'r') as tasksFile:
                     json.load(tasksFile)
 
                     print("Existing 'tasks.json' file found.")
@@ -44,7 +50,7 @@ class Tasks():
                 errorMsg += str(err)
                 print(errorMsg)
 
-                utils.copyAndRename(utils.tasksPath, utils.tasksBackupPath)
+                utils.copyAndRename(self.workspace.tasksPath, self.workspace.tasksBackupPath)
 
                 self.createTasksFile()
 
@@ -56,7 +62,7 @@ class Tasks():
         Create fresh 'tasks.json' file.
         '''
         try:
-            with open(utils.tasksPath, 'w') as tasksFile:
+            with open(self.workspace.tasksPath, 'w') as tasksFile:
                 data = json.loads(tmpStr.tasksFileTemplate)
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
 
@@ -76,7 +82,7 @@ class Tasks():
         Get data from current 'tasks.json' file.
         File existance is previoulsy checked in 'checkTasksFile()'.
         '''
-        with open(utils.tasksPath, 'r') as tasksFile:
+        with open(self.workspace.tasksPath, 'r') as tasksFile:
             data = json.load(tasksFile)
 
             return data
@@ -86,7 +92,7 @@ class Tasks():
         Overwrite existing 'tasks.json' file with new data.
         '''
         try:
-            with open(utils.tasksPath, 'r+') as tasksFile:
+            with open(self.workspace.tasksPath, 'r+') as tasksFile:
                 tasksFile.seek(0)
                 tasksFile.truncate()
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
@@ -118,15 +124,35 @@ class Tasks():
 
         return data
 
-    def addAllTasks(self, tasksData):
+    def getBuildData(self):
+        '''
+        Return build data given to this object or (if not given) data from 'buildData.json' file. File is read only
+        once, unless it changes (see BuildData.getCachedBuildData()).
+        '''
+        if self.buildData is None:
+            return build.BuildData(self.workspace).getCachedBuildData()
+        return self.buildData
+
+    def addAllTasks(self, tasksData, buildData=None):
         '''
         Merge and return all combined tasks data.
         '''
+        if buildData is not None:
+            self.buildData = buildData  # all tasks are generated from the same in-memory build data
 
         # building and compiling project tasks
         task = self.getBuildTask()
         tasksData = self.addOrReplaceTask(tasksData, task)
 
+        task = self.getBuildTask(buildTool='ninja')
+        tasksData = self.addOrReplaceTask(tasksData, task)
+
+        task = self.getBuildTask(buildTool='python')
+        tasksData = self.addOrReplaceTask(tasksData, task)
+
+        task = self.getProfileBuildTask()
+        tasksData = self.addOrReplaceTask(tasksData, task)
+
         task = self.getCompileTask()
         tasksData = self.addOrReplaceTask(tasksData, task)
 
@@ -153,7 +179,7 @@ class Tasks():
         task = self.getRunCurrentPythonFileTask()  # common "run python file" task
         tasksData = self.addOrReplaceTask(tasksData, task)
 
-        if utils.cubeMxProjectFilePath is not None:
+        if self.workspace.cubeMxProjectFilePath is not None:
             task = self.getOpenCubeMXTask()   # open CubeMX project
             tasksData = self.addOrReplaceTask(tasksData, task)
 
@@ -170,9 +196,14 @@ class Tasks():
     # Build, compile and clean tasks
     ########################################################################################################################
 
-    def getBuildTask(self):
+    def getBuildTask(self, buildTool='make'):
         '''
         Add build task (execute 'make' command). Also the VS Code default 'build' task.
+        Other 'buildTool' options build the same targets, but are not the default build task:
+            - 'ninja': 'ninja' command and 'build.ninja' file (see 'updateNinja.py')
+            - 'python': 'build.py' build engine, directly from 'buildData.json'
+        All build commands are executed with 'buildLauncher.py', which selects number of parallel jobs when build
+        starts (from CPU cores, system load and available memory).
         '''
         taskData = """
         {
@@ -201,31 +232,61 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
+        jsonTaskData["command"] = buildData[self.bStr.pythonExec]
+        jsonTaskData["args"] = ["${workspaceFolder}/ideScripts/buildLauncher.py"]  # adds '-j<jobs>' to build command
+
+        if buildTool == 'ninja':
+            jsonTaskData["label"] = tmpStr.taskName_buildNinja
+            jsonTaskData["group"] = "build"
+            jsonTaskData["args"].extend(["ninja", "-f", "build.ninja"])  # 'ninja' executable must be in system PATH
+            return jsonTaskData
+
+        if buildTool == 'python':
+            jsonTaskData["label"] = tmpStr.taskName_buildPython
+            jsonTaskData["group"] = "build"
+            jsonTaskData["args"].extend([buildData[self.bStr.pythonExec], "${workspaceFolder}/ideScripts/build.py"])
+            return jsonTaskData
+
         jsonTaskData["label"] = tmpStr.taskName_build
-        jsonTaskData["command"] = buildData[self.bStr.buildToolsPath]
+        jsonTaskData["args"].append(buildData[self.bStr.buildToolsPath])
 
         gccFolderPath = os.path.dirname(buildData[self.bStr.gccExePath])
         gccFolderPath = utils.pathWithForwardSlashes(gccFolderPath)
-        jsonTaskData["args"] = ["GCC_PATH=" + gccFolderPath]   # specify compiler path to make command
+        jsonTaskData["args"].append("GCC_PATH=" + gccFolderPath)   # specify compiler path to make command
+
+        if buildData.get(self.bStr.compilerCache, False):
+            jsonTaskData["args"].append("PYTHON=" + buildData[self.bStr.pythonExec])  # see 'compilerCache.py'
+
+        return jsonTaskData
 
-        numOfCores = os.cpu_count()
-        parallelJobsNumber = int(numOfCores * 1.5)  # https://stackoverflow.com/questions/15289250/make-j4-or-j8/15295032
-        parallelJobsStr = "-j" + str(parallelJobsNumber)
-        jsonTaskData["args"].append(parallelJobsStr)  # set 'make' parallel job execution
+    def getProfileBuildTask(self):
+        '''
+        Create build profiling task: all objects are compiled with 'make' and compile time, CPU time, peak memory and
+        number of headers of each object are stored to reports in build folder (see 'compileProfiler.py').
+        '''
+        jsonTaskData = self.getBuildTask()
+        jsonTaskData["label"] = tmpStr.taskName_profileBuild
+        jsonTaskData["group"] = "build"
+        jsonTaskData["args"] = ["${workspaceFolder}/ideScripts/compileProfiler.py", "--build"]
 
         return jsonTaskData
 
     def getCompileTask(self):
         '''
-        Create compile current file task (execute gcc compile command).
+        Create compile current file task (execute 'compileFile.py' script with current file). Source file is compiled
+        with flags from 'buildData.json', header file is checked by compiling all source files that include it.
+        If precompiled header is enabled, C sources include it and its '.gch' file is rebuilt first, if outdated.
         '''
         taskData = """
         {
             "label": "will be replaced with templateStrings string",
             "type": "shell",
-            "command": "will be replaced with GCC path below",
-            "args": ["will be replaced with path from buildData.json"],
+            "command": "will be replaced with python path below",
+            "args": [
+                "${workspaceFolder}/ideScripts/compileFile.py",
+                "'${relativeFile}'"
+            ],
             "problemMatcher": {
                 "pattern": {
                     "regexp": "^(.*):(\\\\d+):(\\\\d+):\\\\s+(warning|error):\\\\s+(.*)$",
@@ -243,45 +304,9 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        # get compiler C flags, defines, includes, ... from 'buildData.json'
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_compile
-
-        # defines
-        cDefines = buildData[self.bStr.cDefines]
-        cDefines = utils.preappendString(cDefines, '-D')
-
-        # includes
-        cIncludes = buildData[self.bStr.cIncludes]
-        cIncludes = utils.preappendString(cIncludes, '-I')
-
-        # build directory
-        buildDir = buildData[self.bStr.buildDirPath]
-
-        # c flags
-        cFlags = buildData[self.bStr.cFlags]
-        for flagIndex, flag in enumerate(cFlags):
-            if flag == "-MF":
-                newFlagString = "-MF'" + buildDir + "/${fileBasenameNoExtension}.d'"
-                cFlags[flagIndex] = newFlagString
-                continue
-
-        # output file
-        outputFilePath = "'" + buildDir + "/${fileBasenameNoExtension}.o'"
-        outputFile = ["-o"]
-        outputFile.append(outputFilePath)
-
-        # compile file string
-        fileString = "'${relativeFile}'"
-        fileString = [fileString]
-
-        jsonTaskData["command"] = buildData[self.bStr.gccExePath]
-        jsonTaskData["args"] = ["-c"]   # only compile switch
-        jsonTaskData["args"].extend(cDefines)
-        jsonTaskData["args"].extend(cIncludes)
-        jsonTaskData["args"].extend(cFlags)
-        jsonTaskData["args"].extend(fileString)
-        jsonTaskData["args"].extend(outputFile)
+        jsonTaskData["command"] = buildData[self.bStr.pythonExec]
 
         return jsonTaskData
 
@@ -303,7 +328,7 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_clean
         jsonTaskData["command"] = buildData[self.bStr.buildToolsPath]
 
@@ -340,7 +365,7 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_CPU_downloadRun
         jsonTaskData["command"] = buildData[self.bStr.openOcdPath]
         jsonTaskData["args"] = []
@@ -353,7 +378,7 @@ class Tasks():
         # -c program filename [verify] [reset] [exit] [offset] ([] are optional arguments)
         # Note: due problems with VS Code OpenOCD Tasks in case of workspace path containing spaces, target executable is passed
         # as relative path.
-        workspacePath = utils.workspacePath
+        workspacePath = self.workspace.workspacePath
         jsonTaskData["args"].append("-c")
         programString = "program " + buildData[self.bStr.targetExecutablePath] + " verify reset exit"
         jsonTaskData["args"].append(programString)
@@ -375,7 +400,7 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_CPU_resetRun
         jsonTaskData["command"] = buildData[self.bStr.openOcdPath]
         jsonTaskData["args"] = []
@@ -405,7 +430,7 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_CPU_halt
         jsonTaskData["command"] = buildData[self.bStr.openOcdPath]
         jsonTaskData["args"] = []
@@ -436,7 +461,7 @@ class Tasks():
         """
         jsonTaskData = json.loads(taskData)
 
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData["label"] = tmpStr.taskName_CPU_run
         jsonTaskData["command"] = buildData[self.bStr.openOcdPath]
         jsonTaskData["args"] = []
@@ -473,7 +498,7 @@ class Tasks():
             "problemMatcher": []
         }
         """
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData = json.loads(taskData)
         jsonTaskData["label"] = tmpStr.taskName_Python
         jsonTaskData["command"] = buildData[self.bStr.pythonExec]
@@ -513,7 +538,7 @@ class Tasks():
         jsonTaskData = json.loads(taskData)
         jsonTaskData["label"] = tmpStr.taskName_OpenCubeMX
         jsonTaskData["command"] = openCubeCommand
-        jsonTaskData["args"] = [utils.cubeMxProjectFilePath]  # opens with default program
+        jsonTaskData["args"] = [self.workspace.cubeMxProjectFilePath]  # opens with default program
 
         return jsonTaskData
 
@@ -535,7 +560,7 @@ class Tasks():
             "problemMatcher": []
         }
         """
-        buildData = build.BuildData().getBuildData()
+        buildData = self.getBuildData()
         jsonTaskData = json.loads(taskData)
         jsonTaskData["label"] = tmpStr.taskName_updateWorkspace
         jsonTaskData["command"] = buildData[self.bStr.pythonExec]
@@ -14,7 +14,8 @@ __version__ = utils.__version__
 
 
 class UpdateWorkspaceFile():
-    def __init__(self):
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
         self.bStr = build.BuildDataStrings()
 
     def checkWorkspaceFile(self):
@@ -22,14 +23,14 @@ class UpdateWorkspaceFile():
         Check if workspace '*.code-workspace' file exists. If it does, check if it is a valid JSON file.
         If it doesn't exist report error and quit.
         '''
-        workspaceFiles = utils.getCodeWorkspaces()
+        workspaceFiles = utils.getCodeWorkspaces(self.workspace.workspacePath)
         if len(workspaceFiles) == 1:
             _, fileName = os.path.split(workspaceFiles[0])
             workspaceFileName, _ = os.path.splitext(fileName)
-            if utils.pathExists(utils.workspaceFilePath):
+            if utils.pathExists(self.workspace.workspaceFilePath):
                 # file exists, check if it loads OK
                 try:
-                    with open(utils.workspaceFilePath, 'r') as workspaceFile:
+                    with open(self.workspace.workspaceFilePath, 'r') as workspaceFile:
                         workspaceFileData = json.load(workspaceFile)
 
                         print("Existing " + fileName + " file found.")
@@ -47,7 +48,7 @@ class UpdateWorkspaceFile():
         Get data from current '*.code-workspace' file.
         File existance is previoulsy checked in 'checkWorkspaceFile()'.
         '''
-        with open(utils.workspaceFilePath, 'r') as workspaceFile:
+        with open(self.workspace.workspaceFilePath, 'r') as workspaceFile:
             data = json.load(workspaceFile)
 
         return data
@@ -73,7 +74,7 @@ class UpdateWorkspaceFile():
         Overwrite existing '*.code-workspace' file with new data.
         '''
         try:
-            with open(utils.workspaceFilePath, 'r+') as workspaceFile:
+            with open(self.workspace.workspaceFilePath, 'r+') as workspaceFile:
                 workspaceFile.seek(0)
                 workspaceFile.truncate()
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
@@ -5,7 +5,11 @@ See details in "README_DETAILS.md'.
 
 'c_cpp_properties.json' fields description:
 https://github.com/Microsoft/vscode-cpptools/blob/master/Documentation/LanguageServer/c_cpp_properties.json.md
+
+This script also generates 'compile_commands.json' compilation database (in build folder) with exact GCC command line
+of each source file, which is used by IntelliSense instead of global includes/defines (see 'compileCommands').
 '''
+import os
 import json
 
 import utilities as utils
@@ -34,15 +38,22 @@ class CPropertiesStrings():
     user_asmFlags = 'user_asmFlags'
     user_ldFlags = 'user_ldFlags'
 
+    user_compilerCache = 'user_compilerCache'  # "true" to compile through 'compilerCache.py'
+    user_precompiledHeader = 'user_precompiledHeader'  # "true" (default header) or header to precompile
+
     cubemx_sourceFiles = 'cubemx_sourceFiles'
     cubemx_includes = 'cubemx_includes'
     cubemx_defines = 'cubemx_defines'
     gccExePath = 'gccExePath'
     gccIncludePath = 'gccIncludePath'
 
+    compileCommands = 'compileCommands'  # configuration field with path to 'compile_commands.json'
+    compileCommandsFileName = 'compile_commands.json'
+
 
 class CProperties():
-    def __init__(self):
+    def __init__(self, workspace=None):
+        self.workspace = utils.getWorkspace(workspace)  # see utils.Workspace, default if None
         self.cPStr = CPropertiesStrings()
         self.mkfStr = mkf.MakefileStrings()
         self.bStr = build.BuildDataStrings()
@@ -52,10 +63,10 @@ class CProperties():
         Check if 'c_cpp_properties.json' file exists. If it does, check if it is a valid JSON file.
         If it doesn't exist, create new according to template.
         '''
-        if utils.pathExists(utils.cPropertiesPath):
+        if utils.pathExists(self.workspace.cPropertiesPath):
             # file exists, check if it loads OK
             try:
-                with open(utils.cPropertiesPath, 'r') as cPropertiesFile:
+                with open(self.workspace.cPropertiesPath, 'r') as cPropertiesFile:
                     currentData = json.load(cPropertiesFile)
                     # this is a valid json file
                     print("Existing 'c_cpp_properties.json' file found.")
@@ -64,7 +75,7 @@ class CProperties():
                 templateData = json.loads(tmpStr.c_cpp_template)
                 dataToWrite = utils.mergeCurrentDataWithTemplate(currentData, templateData)
                 dataToWrite = json.dumps(dataToWrite, indent=4, sort_keys=False)
-                with open(utils.cPropertiesPath, 'w') as cPropertiesFile:
+                with open(self.workspace.cPropertiesPath, 'w') as cPropertiesFile:
                     cPropertiesFile.write(dataToWrite)
                     print("\tKeys updated according to the template.")
                 return
@@ -75,7 +86,7 @@ class CProperties():
                 errorMsg += str(err)
                 print(errorMsg)
 
-                utils.copyAndRename(utils.cPropertiesPath, utils.cPropertiesBackupPath)
+                utils.copyAndRename(self.workspace.cPropertiesPath, self.workspace.cPropertiesBackupPath)
 
                 self.createCPropertiesFile()
 
@@ -87,7 +98,7 @@ class CProperties():
         Create fresh 'c_cpp_properties.json' file.
         '''
         try:
-            with open(utils.cPropertiesPath, 'w') as cPropertiesFile:
+            with open(self.workspace.cPropertiesPath, 'w') as cPropertiesFile:
                 data = json.loads(tmpStr.c_cpp_template)
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
 
@@ -107,7 +118,7 @@ class CProperties():
         Get data from current 'c_cpp_properties.json' file.
         File existance is previoulsy checked in 'checkCPropertiesFile()'.
         '''
-        with open(utils.cPropertiesPath, 'r') as cPropertiesFile:
+        with open(self.workspace.cPropertiesPath, 'r') as cPropertiesFile:
             data = json.load(cPropertiesFile)
 
             return data
@@ -145,6 +156,10 @@ class CProperties():
         # defines += makefileData[self.mkfStr.asmDefines]  # TODO Should assembler defines be included here?
         cPropertiesData["env"][self.cPStr.cubemx_defines] = defines
 
+        # compilation database (see createCompileCommandsFile())
+        compileCommandsPath = "${workspaceFolder}/" + self.getCompileCommandsPath(makefileData[self.mkfStr.buildDir])
+        cPropertiesData["configurations"][0][self.cPStr.compileCommands] = compileCommandsPath
+
         return cPropertiesData
 
     def addBuildDataToCPropertiesFile(self, cPropertiesData, buildData):
@@ -163,7 +178,7 @@ class CProperties():
         Overwrite existing 'c_cpp_properties.json' file with new data.
         '''
         try:
-            with open(utils.cPropertiesPath, 'r+') as cPropertiesFile:
+            with open(self.workspace.cPropertiesPath, 'r+') as cPropertiesFile:
                 cPropertiesFile.seek(0)
                 cPropertiesFile.truncate()
                 dataToWrite = json.dumps(data, indent=4, sort_keys=False)
@@ -176,11 +191,70 @@ class CProperties():
             errorMsg += str(err)
             utils.printAndQuit(errorMsg)
 
+    def getCompileCommandsPath(self, buildDir):
+        '''
+        Returns path of 'compile_commands.json' file (relative to workspace folder) in 'buildDir'.
+        Build folder must be known (data from 'Makefile'), otherwise file would be created in file system root.
+        '''
+        if buildDir.strip() == '':
+            errorMsg = "Unable to get 'compile_commands.json' path, build folder is not known (missing 'Makefile' data)."
+            utils.printAndQuit(errorMsg)
+
+        return buildDir + "/" + self.cPStr.compileCommandsFileName
+
+    def getCompileCommandsData(self, buildData):
+        '''
+        Returns compilation database: one entry for each C and assembler source file with the same GCC command line as
+        'Compile current file' task (see 'BuildData.getCompileArguments()').
+        '''
+        bData = build.BuildData(self.workspace)
+
+        compileCommands = []
+        for sourceFile in buildData[self.bStr.cSources] + buildData[self.bStr.asmSources]:
+            arguments = bData.getCompileArguments(buildData, sourceFile)
+            entry = {
+                "directory": utils.pathWithForwardSlashes(os.path.abspath(self.workspace.workspacePath)),
+                "file": sourceFile,
+                "arguments": arguments,
+                "output": arguments[-1]
+            }
+            compileCommands.append(entry)
+
+        return compileCommands
+
+    def createCompileCommandsFile(self, buildData):
+        '''
+        Create or overwrite 'compile_commands.json' file in build folder. File is written only if its content changed,
+        so IntelliSense does not re-parse all files on every update.
+        '''
+        compileCommandsPath = self.getCompileCommandsPath(buildData[self.bStr.buildDirPath])
+        compileCommandsPath = self.workspace.resolvePath(compileCommandsPath)
+        dataToWrite = json.dumps(self.getCompileCommandsData(buildData), indent=4, sort_keys=False)
+
+        if utils.pathExists(compileCommandsPath):
+            with open(compileCommandsPath, 'r') as compileCommandsFile:
+                if compileCommandsFile.read() == dataToWrite:
+                    print("'compile_commands.json' file is up to date.")
+                    return
+
+        try:
+            if not utils.pathExists(os.path.dirname(compileCommandsPath)):
+                os.makedirs(os.path.dirname(compileCommandsPath))
+            with open(compileCommandsPath, 'w') as compileCommandsFile:
+                compileCommandsFile.write(dataToWrite)
+
+            print("'compile_commands.json' file updated!")
+
+        except Exception as err:
+            errorMsg = "Exception error creating 'compile_commands.json' file:\n"
+            errorMsg += str(err)
+            utils.printAndQuit(errorMsg)
+
     def addCustomDataToCPropertiesFile(self, cProperties, makefileData, buildData):
         '''
         TODO USER Add custom data to 'c_cpp_properties.json' file.
         '''
-        cProperties["configurations"][0]["name"] = utils.getWorkspaceName()
+        cProperties["configurations"][0]["name"] = self.workspace.getWorkspaceName()
 
         # TODO USER can add other specific here
         # Note: be careful not to override other parameters that are added from 'Makefile' and 'buildData.json'
@@ -199,7 +273,7 @@ if __name__ == "__main__":
 
     # Makefile must exist
     makefile.checkMakefileFile()  # no point in continuing if Makefile does not exist
-    makefile.restoreOriginalMakefile()
+    originalMakefileLines = makefile.restoreOriginalMakefile()
 
     # build data (update tools paths if neccessary)
     buildData = bData.prepareBuildData()
@@ -207,7 +281,7 @@ if __name__ == "__main__":
     # data from original makefile
     makeExePath = buildData[bData.bStr.buildToolsPath]
     gccExePath = buildData[bData.bStr.gccExePath]
-    makefileData = makefile.getMakefileData(makeExePath, gccExePath)
+    makefileData = makefile.getMakefileData(makeExePath, gccExePath, originalMakefileLines)
 
     # create 'c_cpp_properties.json' file
     cP.checkCPropertiesFile()
@@ -217,6 +291,10 @@ if __name__ == "__main__":
     cPropertiesData = cP.addCustomDataToCPropertiesFile(cPropertiesData, makefileData, buildData)
     cP.overwriteCPropertiesFile(cPropertiesData)
 
+    # create 'compile_commands.json' file (sources, flags and build folder from original 'Makefile')
+    buildData = bData.addMakefileDataToBuildDataFile(buildData, makefileData)
+    cP.createCompileCommandsFile(buildData)
+
     # create build folder if it does not exist jet
     buildFolderName = makefileData[mkf.MakefileStrings.buildDir]
     utils.createBuildFolder(buildFolderName)
@@ -13,6 +13,7 @@ import traceback
 import platform
 
 import templateStrings as tmpStr
+import updateProfiler as prof
 
 __version__ = '1.7'  # this is inherited by all 'update*.py' scripts
 
@@ -20,6 +21,11 @@ __version__ = '1.7'  # this is inherited by all 'update*.py' scripts
 # Global utilities and paths
 ########################################################################################################################
 
+defaultWorkspace = None  # 'Workspace' of standalone scripts, set by verifyFolderStructure()
+interactive = True  # if False, user input is not available (batch updates, CI) - see getUserInput()
+unlimitedJobs = 0  # '-j' option without number of jobs, see getJobs()
+
+# default workspace paths (see 'Workspace' class), kept as global variables for standalone scripts
 workspacePath = None  # absolute path to workspace folder
 workspaceFilePath = None  # absolute file path to '*.code-workspace' file
 cubeMxProjectFilePath = None  # absolute path to *.ioc STM32CubeMX workspace file
@@ -28,10 +34,15 @@ vsCodeFolderPath = None  # absolute path to workspace '.vscode' folder
 
 makefilePath = None
 makefileBackupPath = None
+ninjaFilePath = None  # absolute path to 'build.ninja', generated next to 'Makefile'
 cPropertiesPath = None
 cPropertiesBackupPath = None
 buildDataPath = None
+makefileDataCachePath = None  # absolute path to '.vscode/makefileData.json' cache of Makefile variables
+updateStatePath = None  # absolute path to '.vscode/updateState.json' with 'update.py' stages fingerprints
+dependencyDatabasePath = None  # absolute path to '.vscode/dependencies.json' index of '.d' files (header dependencies)
 toolsPaths = None  # absolute path to toolsPaths.json with common user settings
+openOcdScriptsIndexPath = None  # absolute path to 'openOcdScripts.json' index, next to 'toolsPaths.json'
 tasksPath = None
 tasksBackupPath = None
 launchPath = None
@@ -66,12 +77,36 @@ def commandExists(command):
     Checks if a command exists.
     '''
     if command is not None:
-        if shutil.which(command):
+        with prof.measure(prof.eventCommandLookup, command):
+            commandPath = shutil.which(command)
+        if commandPath:
             return True
 
     return False
 
 
+def getFileVersion(path):
+    '''
+    Returns version of a file or command (executable found in PATH) as a string of its size and modification time, so
+    tool version can be identified without calling it. Returns None if file does not exist.
+    '''
+    if path is None:
+        return None
+
+    filePath = path
+    if not os.path.isfile(filePath):
+        with prof.measure(prof.eventCommandLookup, path):
+            filePath = shutil.which(path)
+        if filePath is None:
+            return None
+
+    try:
+        fileStat = os.stat(filePath)
+        return str(fileStat.st_size) + ':' + str(fileStat.st_mtime_ns)
+    except OSError:
+        return None
+
+
 def getFileName(path, withExtension=False, exception=True):
     '''
     Returns file name of a given 'path', with or without extension.
@@ -126,10 +161,13 @@ def copyAndRename(filePath, newPath):
     print(msg)
 
 
-def verifyFolderStructure():
+class Workspace():
     '''
-    Verify if folder structure is correct.
-    'ideScript' folder must be placed in the root of the project, where:
+    All paths of one workspace: folder with exactly one '*.code-workspace' file, 'ideScripts' folder and CubeMX
+    'Makefile'. Workspace object is passed to all 'update*.py' classes, so more workspaces can be updated in the same
+    (long-lived) process, without changing current working directory or global state.
+
+    Folder structure is verified when object is created:
         - exactly one '*.code-workspace' file must exist (this is also Workspace name)
         - '.vscode' folder is present (it is created if it doesn't exist jet)
 
@@ -139,6 +177,136 @@ def verifyFolderStructure():
         - STM32CubeMX '.ioc'
         - backup file paths
     '''
+
+    def __init__(self, workspacePath, ideScriptsPath=None):
+        self.workspacePath = pathWithForwardSlashes(workspacePath)  # absolute path to workspace folder
+        if ideScriptsPath is None:
+            ideScriptsPath = os.path.join(self.workspacePath, 'ideScripts')
+        self.ideScriptsPath = pathWithForwardSlashes(ideScriptsPath)  # absolute path to 'ideScripts' folder
+
+        codeWorkspaces = getCodeWorkspaces(self.workspacePath)
+        if len(codeWorkspaces) == 1:
+            # '*.code-workspace' file found
+            self.workspaceFilePath = codeWorkspaces[0]  # file existance is previously checked in getCodeWorkspaces()
+        else:
+            errorMsg = "Invalid folder/file structure:\n"
+            errorMsg += "Exactly one VS Code workspace ('*.code-workspace') file must exist "
+            errorMsg += "in the root folder where 'ideScripts' folder is placed.\n"
+            errorMsg += "Expecting one '*.code-workspace' file in: " + self.workspacePath
+            printAndQuit(errorMsg)
+
+        vscodeFolder = pathWithForwardSlashes(os.path.join(self.workspacePath, ".vscode"))
+        if not pathExists(vscodeFolder):
+            try:
+                os.mkdir(vscodeFolder)
+                print("'.vscode' folder created.")
+            except Exception as err:
+                errorMsg = "Exception error creating '.vscode' subfolder:\n" + str(err)
+                printAndQuit(errorMsg)
+        else:
+            print("Existing '.vscode' folder used.")
+        self.vsCodeFolderPath = vscodeFolder  # absolute path to workspace '.vscode' folder
+
+        # 'ideScripts' folder found in the same folder as '*.code-workspace' file. Structure seems OK.
+        self.cPropertiesPath = os.path.join(self.workspacePath, '.vscode', 'c_cpp_properties.json')
+        self.cPropertiesPath = pathWithForwardSlashes(self.cPropertiesPath)
+        self.cPropertiesBackupPath = self.cPropertiesPath + ".backup"
+
+        self.makefilePath = os.path.join(self.workspacePath, 'Makefile')
+        self.makefilePath = pathWithForwardSlashes(self.makefilePath)
+        self.makefileBackupPath = self.makefilePath + ".backup"
+
+        # 'build.ninja' is generated from the same data as 'buildData.json' (see 'updateNinja.py')
+        self.ninjaFilePath = os.path.join(self.workspacePath, 'build.ninja')
+        self.ninjaFilePath = pathWithForwardSlashes(self.ninjaFilePath)
+
+        self.buildDataPath = os.path.join(self.workspacePath, '.vscode', 'buildData.json')
+        self.buildDataPath = pathWithForwardSlashes(self.buildDataPath)
+        # does not have backup file, always regenerated
+
+        # '.vscode/makefileData.json' cache of Makefile variables, can be deleted at any time
+        self.makefileDataCachePath = os.path.join(self.workspacePath, '.vscode', 'makefileData.json')
+        self.makefileDataCachePath = pathWithForwardSlashes(self.makefileDataCachePath)
+
+        # '.vscode/updateState.json' with 'update.py' stages fingerprints. Deleting it forces all stages to run
+        self.updateStatePath = os.path.join(self.workspacePath, '.vscode', 'updateState.json')
+        self.updateStatePath = pathWithForwardSlashes(self.updateStatePath)
+
+        # '.vscode/dependencies.json' index of GCC '.d' files (see 'dependencyDatabase.py'), can be deleted at any time
+        self.dependencyDatabasePath = os.path.join(self.workspacePath, '.vscode', 'dependencies.json')
+        self.dependencyDatabasePath = pathWithForwardSlashes(self.dependencyDatabasePath)
+
+        vsCodeSettingsFolderPath = getVsCodeSettingsFolderPath()
+        # 'toolsPaths.json' with common user settings and 'openOcdScripts.json' index, shared by all workspaces
+        self.toolsPaths = os.path.join(vsCodeSettingsFolderPath, 'toolsPaths.json')
+        self.toolsPaths = pathWithForwardSlashes(self.toolsPaths)
+        self.openOcdScriptsIndexPath = os.path.join(vsCodeSettingsFolderPath, 'openOcdScripts.json')
+        self.openOcdScriptsIndexPath = pathWithForwardSlashes(self.openOcdScriptsIndexPath)
+
+        self.tasksPath = os.path.join(self.workspacePath, '.vscode', 'tasks.json')
+        self.tasksPath = pathWithForwardSlashes(self.tasksPath)
+        self.tasksBackupPath = self.tasksPath + ".backup"
+
+        self.launchPath = os.path.join(self.workspacePath, '.vscode', 'launch.json')
+        self.launchPath = pathWithForwardSlashes(self.launchPath)
+        self.launchBackupPath = self.launchPath + ".backup"
+
+        # *.ioc STM32CubeMX workspace file (relative to workspace folder)
+        cubeMxFiles = getCubeMXProjectFiles(self.workspacePath)
+        if len(cubeMxFiles) == 1:
+            self.cubeMxProjectFilePath = cubeMxFiles[0]
+            print("One STM32CubeMX file found: " + self.cubeMxProjectFilePath)
+        else:  # more iocFiles:
+            self.cubeMxProjectFilePath = None
+            print("WARNING: None or more than one STM32CubeMX files found. None or one expected.")
+
+    def getWorkspaceName(self):
+        '''
+        Return name (without extension) for this project '.code-workspace' file.
+        '''
+        return getFileName(self.workspaceFilePath)
+
+    def resolvePath(self, path):
+        '''
+        Returns 'path' relative to workspace folder (like '.vscode/stm32f0x.cfg' in 'buildData.json'), so it can be
+        checked/opened regardless of current working directory. Absolute and empty paths are returned unchanged.
+        '''
+        if not path:
+            return path
+        return os.path.join(self.workspacePath, path)
+
+    def normalizePath(self, path):
+        '''
+        Returns normalized 'path' with forward slashes: relative to workspace folder if file is inside it, absolute
+        otherwise (toolchain headers, ...). Used to compare paths from compiler output (dependency files, ...).
+        '''
+        path = os.path.normpath(self.resolvePath(path))
+        relativePath = os.path.relpath(path, self.workspacePath)
+        if not relativePath.startswith('..'):
+            path = relativePath
+
+        return pathWithForwardSlashes(path)
+
+
+def verifyFolderStructure():
+    '''
+    Verify if folder structure is correct and build default workspace paths (see 'Workspace' class). 'ideScript'
+    folder of the running script must be placed in the root of the project.
+
+    Default workspace is used by all 'update*.py' classes that are not given a workspace object. Its paths are also
+    available as global variables of this module (for standalone scripts and user customizations).
+    '''
+    thisFolderPath = os.path.dirname(sys.argv[0])
+    workspace = Workspace(os.path.dirname(thisFolderPath))
+    setDefaultWorkspace(workspace)
+
+
+def setDefaultWorkspace(workspace):
+    '''
+    Set default workspace and global paths variables of this module.
+    '''
+    global defaultWorkspace
+
     global workspacePath
     global workspaceFilePath
     global cubeMxProjectFilePath
@@ -147,106 +315,98 @@ def verifyFolderStructure():
 
     global makefilePath
     global makefileBackupPath
+    global ninjaFilePath
     global cPropertiesPath
     global cPropertiesBackupPath
     global buildDataPath
+    global makefileDataCachePath
+    global updateStatePath
+    global dependencyDatabasePath
     global toolsPaths
+    global openOcdScriptsIndexPath
     global tasksPath
     global tasksBackupPath
     global launchPath
     global launchBackupPath
 
-    thisFolderPath = os.path.dirname(sys.argv[0])
-    workspacePath = pathWithForwardSlashes(os.path.dirname(thisFolderPath))
-    ideScriptsPath = pathWithForwardSlashes(os.path.join(workspacePath, 'ideScripts'))
+    defaultWorkspace = workspace
 
-    codeWorkspaces = getCodeWorkspaces()
-    if len(codeWorkspaces) == 1:
-        # '*.code-workspace' file found
-        workspaceFilePath = codeWorkspaces[0]  # file existance is previously checked in getCodeWorkspaces()
-    else:
-        errorMsg = "Invalid folder/file structure:\n"
-        errorMsg += "Exactly one VS Code workspace ('*.code-workspace') file must exist "
-        errorMsg += "in the root folder where 'ideScripts' folder is placed.\n"
-        errorMsg += "Expecting one '*.code-workspace' file in: " + workspacePath
-        printAndQuit(errorMsg)
+    workspacePath = workspace.workspacePath
+    workspaceFilePath = workspace.workspaceFilePath
+    cubeMxProjectFilePath = workspace.cubeMxProjectFilePath
+    ideScriptsPath = workspace.ideScriptsPath
+    vsCodeFolderPath = workspace.vsCodeFolderPath
 
-    vscodeFolder = pathWithForwardSlashes(os.path.join(workspacePath, ".vscode"))
-    if not pathExists(vscodeFolder):
-        try:
-            os.mkdir(vscodeFolder)
-            print("'.vscode' folder created.")
-        except Exception as err:
-            errorMsg = "Exception error creating '.vscode' subfolder:\n" + str(err)
-            printAndQuit(errorMsg)
-    else:
-        print("Existing '.vscode' folder used.")
-    vsCodeFolderPath = vscodeFolder
+    makefilePath = workspace.makefilePath
+    makefileBackupPath = workspace.makefileBackupPath
+    ninjaFilePath = workspace.ninjaFilePath
+    cPropertiesPath = workspace.cPropertiesPath
+    cPropertiesBackupPath = workspace.cPropertiesBackupPath
+    buildDataPath = workspace.buildDataPath
+    makefileDataCachePath = workspace.makefileDataCachePath
+    updateStatePath = workspace.updateStatePath
+    dependencyDatabasePath = workspace.dependencyDatabasePath
+    toolsPaths = workspace.toolsPaths
+    openOcdScriptsIndexPath = workspace.openOcdScriptsIndexPath
+    tasksPath = workspace.tasksPath
+    tasksBackupPath = workspace.tasksBackupPath
+    launchPath = workspace.launchPath
+    launchBackupPath = workspace.launchBackupPath
 
-    # 'ideScripts' folder found in the same folder as '*.code-workspace' file. Structure seems OK.
-    cPropertiesPath = os.path.join(workspacePath, '.vscode', 'c_cpp_properties.json')
-    cPropertiesPath = pathWithForwardSlashes(cPropertiesPath)
-    cPropertiesBackupPath = cPropertiesPath + ".backup"
-
-    makefilePath = os.path.join(workspacePath, 'Makefile')
-    makefilePath = pathWithForwardSlashes(makefilePath)
-    makefileBackupPath = makefilePath + ".backup"
-
-    buildDataPath = os.path.join(workspacePath, '.vscode', 'buildData.json')
-    buildDataPath = pathWithForwardSlashes(buildDataPath)
-    # does not have backup file, always regenerated
 
+def getVsCodeSettingsFolderPath():
+    '''
+    Returns path to VS Code user settings folder, where data shared by all workspaces is stored.
+    '''
     osIs = detectOs()
     if osIs == "windows":
-        vsCodeSettingsFolderPath = tmpStr.defaultVsCodeSettingsFolder_WIN
+        return tmpStr.defaultVsCodeSettingsFolder_WIN
     elif osIs == "unix":
-        vsCodeSettingsFolderPath = tmpStr.defaultVsCodeSettingsFolder_UNIX
+        return tmpStr.defaultVsCodeSettingsFolder_UNIX
     elif osIs == "osx":
-        vsCodeSettingsFolderPath = tmpStr.defaultVsCodeSettingsFolder_OSX
-    toolsPaths = os.path.join(vsCodeSettingsFolderPath, 'toolsPaths.json')
-    toolsPaths = pathWithForwardSlashes(toolsPaths)
-
-    tasksPath = os.path.join(workspacePath, '.vscode', 'tasks.json')
-    tasksPath = pathWithForwardSlashes(tasksPath)
-    tasksBackupPath = tasksPath + ".backup"
-
-    launchPath = os.path.join(workspacePath, '.vscode', 'launch.json')
-    launchPath = pathWithForwardSlashes(launchPath)
-    launchBackupPath = launchPath + ".backup"
-
-    cubeMxFiles = getCubeMXProjectFiles()
-    if len(cubeMxFiles) == 1:
-        cubeMxProjectFilePath = cubeMxFiles[0]
-        print("One STM32CubeMX file found: " + cubeMxProjectFilePath)
-    else:  # more iocFiles:
-        cubeMxProjectFilePath = None
-        print("WARNING: None or more than one STM32CubeMX files found. None or one expected.")
-
-
-def printWorkspacePaths():
-    print("\nWorkspace root folder:", workspacePath)
-    print("VS Code workspace file:", workspaceFilePath)
-    print("CubeMX project file:", cubeMxProjectFilePath)
-    print("'ideScripts' folder:", ideScriptsPath)
-
-    print("\n'Makefile':", makefilePath)
-    print("'Makefile.backup':", makefileBackupPath)
-
-    print("\n'c_cpp_properties.json':", cPropertiesPath)
-    print("'c_cpp_properties.json.backup':", cPropertiesBackupPath)
-    print("\n'tasks.json':", tasksPath)
-    print("'tasks.json.backup':", tasksBackupPath)
-    print("\n'launch.json':", launchPath)
-    print("'launch.json.backup':", launchBackupPath)
-
-    print("\n'buildData.json':", buildDataPath)
-    print("'toolsPaths.json':", toolsPaths)
+        return tmpStr.defaultVsCodeSettingsFolder_OSX
+
+
+def getWorkspace(workspace=None):
+    '''
+    Returns given 'workspace' or (if None) default workspace, set by verifyFolderStructure().
+    '''
+    if workspace is None:
+        return defaultWorkspace
+    return workspace
+
+
+def printWorkspacePaths(workspace=None):
+    workspace = getWorkspace(workspace)
+
+    print("\nWorkspace root folder:", workspace.workspacePath)
+    print("VS Code workspace file:", workspace.workspaceFilePath)
+    print("CubeMX project file:", workspace.cubeMxProjectFilePath)
+    print("'ideScripts' folder:", workspace.ideScriptsPath)
+
+    print("\n'Makefile':", workspace.makefilePath)
+    print("'Makefile.backup':", workspace.makefileBackupPath)
+    print("'build.ninja':", workspace.ninjaFilePath)
+
+    print("\n'c_cpp_properties.json':", workspace.cPropertiesPath)
+    print("'c_cpp_properties.json.backup':", workspace.cPropertiesBackupPath)
+    print("\n'tasks.json':", workspace.tasksPath)
+    print("'tasks.json.backup':", workspace.tasksBackupPath)
+    print("\n'launch.json':", workspace.launchPath)
+    print("'launch.json.backup':", workspace.launchBackupPath)
+
+    print("\n'buildData.json':", workspace.buildDataPath)
+    print("'makefileData.json':", workspace.makefileDataCachePath)
+    print("'updateState.json':", workspace.updateStatePath)
+    print("'dependencies.json':", workspace.dependencyDatabasePath)
+    print("'toolsPaths.json':", workspace.toolsPaths)
+    print("'openOcdScripts.json':", workspace.openOcdScriptsIndexPath)
     print()
 
 
-def getCubeMXProjectFiles():
+def getCubeMXProjectFiles(workspacePath):
     '''
-    Returns list of all STM32CubeMX '.ioc' files in root directory.
+    Returns list of all STM32CubeMX '.ioc' files in 'workspacePath' root directory.
     Since only root directory is searched, all files (paths) are relative to root dir.
     '''
     iocFiles = []
@@ -257,11 +417,11 @@ def getCubeMXProjectFiles():
     return iocFiles
 
 
-def createBuildFolder(folderName='build'):
+def createBuildFolder(folderName='build', workspace=None):
     '''
     Create (if not already created) build folder with specified name where objects are stored when 'make' is executed.
     '''
-    buildFolderPath = os.path.join(workspacePath, folderName)
+    buildFolderPath = os.path.join(getWorkspace(workspace).workspacePath, folderName)
     buildFolderPath = pathWithForwardSlashes(buildFolderPath)
     if not pathExists(buildFolderPath):
         os.mkdir(buildFolderPath)
@@ -270,9 +430,9 @@ def createBuildFolder(folderName='build'):
         print("Build folder already exist: '" + buildFolderPath + "'")
 
 
-def getCodeWorkspaces():
+def getCodeWorkspaces(workspacePath):
     '''
-    Search workspacePath for files that ends with '.code-workspace' (VS Code workspaces).
+    Search 'workspacePath' for files that ends with '.code-workspace' (VS Code workspaces).
     Returns list of all available VS Code workspace paths.
 
     Only root directory is searched.
@@ -287,13 +447,13 @@ def getCodeWorkspaces():
     return codeFiles
 
 
-def getWorkspaceName():
+def getWorkspaceName(workspace=None):
     '''
     Return name (without extension) for this project '.code-workspace' file.
 
     Return first available file name without extension.
     '''
-    return getFileName(workspaceFilePath)
+    return getWorkspace(workspace).getWorkspaceName()
 
 
 def stripStartOfString(dataList, stringToStrip):
@@ -353,13 +513,63 @@ def mergeCurrentDataWithTemplate(currentData, templateData):
     return mergedData
 
 
+def getUserInput(msg):
+    '''
+    Returns line entered by the user, same as 'input()'. If scripts are not 'interactive', this is an unrecoverable
+    error (instead of waiting for input that never comes).
+    '''
+    if not interactive:
+        errorMsg = "User input is required, but scripts run in non-interactive mode. Request:\n\t" + msg.strip()
+        errorMsg += "\n-> Run 'update.py' of this workspace in terminal or fix 'toolsPaths.json'/'buildData.json'."
+        printAndQuit(errorMsg)
+
+    return input(msg)
+
+
+def writeFileAtomic(filePath, data):
+    '''
+    Write 'data' (string) to 'filePath' via temporary file, so other processes (parallel updates of more workspaces that
+    share 'toolsPaths.json') never read partially written file.
+    '''
+    tmpFilePath = filePath + "." + str(os.getpid()) + ".tmp"
+    try:
+        with open(tmpFilePath, 'w') as tmpFile:
+            tmpFile.write(data)
+        os.replace(tmpFilePath, filePath)
+    finally:
+        if os.path.exists(tmpFilePath):
+            os.remove(tmpFilePath)
+
+
+def getJobs(arguments):
+    '''
+    Returns number of parallel jobs given with '-j' ('-j 4' or '-j4'), None if not given.
+    '-j' without number (make: no limit) returns 'unlimitedJobs' (0), scripts then use their default number of jobs.
+    '''
+    for argIndex, argument in enumerate(arguments):
+        if argument.startswith('-j'):
+            jobs = argument[len('-j'):]
+            if not jobs:
+                # '-j' argument is optional: '-j 4', '-j' (no limit) or '-j all' (no limit, 'all' is make goal)
+                if (argIndex + 1 < len(arguments)) and arguments[argIndex + 1].isdigit():
+                    jobs = arguments[argIndex + 1]
+                else:
+                    return unlimitedJobs
+            try:
+                return max(int(jobs), 1)
+            except ValueError:
+                printAndQuit("Invalid number of jobs: '" + jobs + "'")
+
+    return None
+
+
 def getYesNoAnswer(msg):
     '''
     Asks the user a generic yes/no question.
     Returns True for yes, False for no
     '''
     while(True):
-        resp = input(msg).lower()
+        resp = getUserInput(msg).lower()
         if resp == 'y':
             return True
         elif resp == 'n':
@@ -375,7 +585,7 @@ def getUserPath(pathName):
     '''
     while True:
         msg = "\n\tEnter path or command for '" + pathName + "':\n\tPaste here and press Enter: "
-        path = input(msg)
+        path = getUserInput(msg)
         path = pathWithoutQuotes(path)
         path = pathWithForwardSlashes(path)
 
@@ -407,15 +617,19 @@ def getGccIncludePath(gccExePath):
     '''
     Get path to '...\include' folder from 'gccExePath', where standard libs and headers. Needed for VS Code Intellisense.
 
-    If ARM GCC folder structure remains the same as official, the executable is located in \bin folder.
-    Other headers can be found in '\lib\gcc\arm-none-eabi\***\include' folder, which is found by searching for
-    <stdint.h>.
+    Compiler is asked for this folder first (see probeGccIncludePath()). If that fails and ARM GCC folder structure
+    remains the same as official, the executable is located in \bin folder. Other headers can be found in
+    '\lib\gcc\arm-none-eabi\***\include' folder, which is found by searching for <stdint.h>.
     '''
+    fileName = "stdint.h"
+    folderPath = probeGccIncludePath(gccExePath, fileName)
+    if folderPath is not None:
+        return folderPath
+
     gccExeFolderPath = os.path.dirname(gccExePath)
     gccFolderPath = os.path.dirname(gccExeFolderPath)
     searchPath = os.path.join(gccFolderPath, "lib", "gcc", "arm-none-eabi")
 
-    fileName = "stdint.h"
     filePath = findFileInFolderTree(searchPath, fileName)
     if filePath is None:
         errorMsg = "Unable to find " + fileName + " file on path: " + searchPath
@@ -426,6 +640,29 @@ def getGccIncludePath(gccExePath):
     return folderPath
 
 
+def probeGccIncludePath(gccExePath, fileName):
+    '''
+    Ask compiler for its '...\include' folder ('gcc -print-file-name=include').
+    Returns None if compiler can't be called or returned folder does not contain 'fileName'.
+    '''
+    arguments = [gccExePath, "-print-file-name=include"]
+    try:
+        with prof.measure(prof.eventProcess, "gcc -print-file-name=include"):
+            proc = subprocess.run(arguments, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    except Exception:
+        return None  # compiler can't be called
+
+    if proc.returncode != 0:
+        return None
+
+    folderPath = proc.stdout.decode('utf-8', errors='replace').strip()
+    folderPath = os.path.normpath(folderPath)  # GCC on Windows returns '...\bin/../lib/...'
+    if not os.path.isfile(os.path.join(folderPath, fileName)):
+        return None  # unknown include folder (gcc returns only 'include' if it can't find it)
+
+    return pathWithForwardSlashes(folderPath)
+
+
 def getPython3Executable():
     '''
     Uses detectOs() to determine the correct python command to use for python related tasks
@@ -445,70 +682,6 @@ def getPython3Executable():
     return pythonExec
 
 
-def getOpenOcdInterface(openOcdPath):
-    '''
-    Try to get OpenOCD interface file (TODO: currently hard-coded 'stlink.cfg') from 'openocd.exe' (openOcdPath) path.
-    If such path can't be found ask user for update.
-    Returns absolute path to 'stlink.cfg' file.
-    '''
-    openOcdExeFolderPath = os.path.dirname(openOcdPath)  # ../bin
-    openOcdRootPath = os.path.dirname(openOcdExeFolderPath)  # ../
-    # interfaceFolderPath = os.path.join(openOcdRootPath, 'scripts', 'interface') # only on windwos, linux has different structure
-
-    # get openOcdInterfacePath from
-    # TODO here of once anything other than stlink will be supported
-    fileName = "stlink.cfg"
-    openOcdInterfacePath = findFileInFolderTree(openOcdRootPath, fileName)
-    if openOcdInterfacePath is None:
-        openOcdInterfacePath = getUserPath("stlink.cfg interface")
-
-    return openOcdInterfacePath
-
-
-def getOpenOcdConfig(openOcdInterfacePath):
-    '''
-    Get openOCD configuration files from user, eg. 'interface/stlink.cfg, target/stm32f0x.cfg'
-    Paths can be passed in absolute or relative form, separated by comma. Optionally enclosed in " or '.
-    Returns the list of absolute paths to these config files.
-    '''
-    openOcdScriptsPath = os.path.dirname(os.path.dirname(openOcdInterfacePath))
-
-    while(True):
-        msg = "\n\tEnter path(s) to OpenOCD configuration file(s):\n\t\t"
-        msg += "Example: 'target/stm32f0x.cfg'. Absolute or relative to OpenOCD /scripts/ folder.\n\t\t"
-        msg += "If more than one file is needed, separate with comma.\n\t\t"
-        msg += "Paste here and press Enter: "
-        configFilesStr = input(msg)
-
-        allConfigFiles = []
-        configFiles = configFilesStr.split(',')
-        for theFile in configFiles:
-            # ex.: " C:/asd/foo bar/fail.cfg " , ' C:/asd/bar foo/fail.cfg' ,
-            theFile = theFile.strip()
-            theFile = theFile.strip('\'')
-            theFile = theFile.strip('\"')
-            theFile = theFile.strip()
-            theFile = pathWithForwardSlashes(theFile)
-
-            if pathExists(theFile):  # file is an absolute path
-                allConfigFiles.append(theFile)
-            else:
-                # arg is a relative path. Must be relative to OpenOCD 'scripts' folder
-                theFileAbs = os.path.join(openOcdScriptsPath, theFile)
-                theFileAbs = pathWithForwardSlashes(theFileAbs)
-                if pathExists(theFileAbs):
-                    allConfigFiles.append(theFileAbs)
-                else:
-                    msg = "\tConfiguration invalid (file not found): \'" + theFileAbs + "\'"
-                    print(msg)
-                    break
-        else:
-            break  # break loop if config detected successfully
-        continue  # continue if unsuccessful
-
-    return allConfigFiles
-
-
 def getStm32SvdFile(stm32SvdPath):
     ''' # TODO HERE - deprecated? no use cases?
     Get stm32SvdFile from user, eg. 'STM32F042x.svd'
@@ -516,7 +689,7 @@ def getStm32SvdFile(stm32SvdPath):
     '''
     while True:
         msg = "\n\tEnter SVD File name (eg: 'STM32F042x.svd'), or 'ls' to list available SVD files.\n\tSVD file name: "
-        fileName = input(msg)
+        fileName = getUserInput(msg)
 
         if fileName == "ls":
             print(os.listdir(stm32SvdPath))
@@ -551,11 +724,12 @@ def getAllFilesInFolderTree(pathToFolder):
     '''
     allFiles = []
     if os.path.exists(pathToFolder):
-        for (dirPath, dirNames, fileNames) in os.walk(pathToFolder):
-            for theFile in fileNames:
-                filePath = os.path.join(dirPath, theFile)
-                filePath = pathWithForwardSlashes(filePath)
-                allFiles.append(filePath)
+        with prof.measure(prof.eventFolderWalk, pathToFolder):
+            for (dirPath, dirNames, fileNames) in os.walk(pathToFolder):
+                for theFile in fileNames:
+                    filePath = os.path.join(dirPath, theFile)
+                    filePath = pathWithForwardSlashes(filePath)
+                    allFiles.append(filePath)
 
     return allFiles
 
@@ -563,14 +737,27 @@ def getAllFilesInFolderTree(pathToFolder):
 def findFileInFolderTree(searchPath, fileName):
     '''
     Find a file in a folder or subfolders, and return absolute path to the file.
+    Folders are searched level by level (the least nested file is found) and search stops at the first match.
     Returns None if unsuccessful.
     '''
-
-    for root, dirs, files in os.walk(searchPath, topdown=False):
-        if fileName in files:
-            filePath = os.path.join(root, fileName)
-            filePath = pathWithForwardSlashes(filePath)
-            return filePath
+    with prof.measure(prof.eventFolderWalk, searchPath + " (" + fileName + ")"):
+        foldersToSearch = [searchPath]
+        while foldersToSearch:
+            subfolders = []
+            for folderPath in foldersToSearch:
+                try:
+                    with os.scandir(folderPath) as entries:
+                        folderEntries = sorted(entries, key=lambda entry: entry.name)
+                except OSError:
+                    continue  # not a folder or no permission, same as os.walk()
+
+                for entry in folderEntries:
+                    if entry.name == fileName and entry.is_file():
+                        return pathWithForwardSlashes(entry.path)
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+
+            foldersToSearch = subfolders
 
     return None
 
@@ -585,7 +772,8 @@ def findExecutablePath(extension, raiseException=False):
 
     errorMsg = "Unable to get associated program for ." + extension + "."
     try:
-        proc = subprocess.run(arguments, shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+        with prof.measure(prof.eventProcess, "assoc ." + extension):
+            proc = subprocess.run(arguments, shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
         if proc.returncode == 0:
             returnString = str(proc.stdout)
             path = returnString.split('=')[1]
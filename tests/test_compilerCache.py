@@ -0,0 +1,77 @@
+'''
+Tests of 'ideScripts/compilerCache.py' (GCC command line parsing).
+    python -m pytest tests
+    python -m unittest discover tests
+'''
+import os
+import sys
+import unittest
+
+repositoryPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repositoryPath, 'ideScripts'))
+
+import compilerCache as cache  # noqa: E402
+
+compilerPath = 'arm-none-eabi-gcc'
+
+
+def parse(commandLine):
+    return cache.CompileCommand(compilerPath, commandLine.split())
+
+
+class TestCompileCommand(unittest.TestCase):
+    def test_object_and_dependency_file(self):
+        for commandLine in ["-c -mthumb -MMD -MP -MFbuild/main.d Core/Src/main.c -o build/main.o",
+                            "-c -mthumb -MMD -MP -MF build/main.d Core/Src/main.c -o build/main.o"]:
+            command = parse(commandLine)
+            self.assertTrue(command.isCacheable, msg=commandLine)
+            self.assertEqual(command.sourceFile, "Core/Src/main.c")
+            self.assertEqual(command.outputFiles, {cache.outputObject: "build/main.o",
+                                                   cache.outputDependency: "build/main.d"})
+
+    def test_default_dependency_file(self):
+        command = parse("-c -MMD Core/Src/main.c -o build/main.o")
+        self.assertEqual(command.outputFiles[cache.outputDependency], "build/main.d")
+
+        command = parse("-c -MFbuild/main.d Core/Src/main.c -o build/main.o")  # no '-MMD': no dependency file
+        self.assertNotIn(cache.outputDependency, command.outputFiles)
+
+    def test_listing_file(self):
+        command = parse("-c -Wa,-a,-ad,-alms=build/main.lst Core/Src/main.c -o build/main.o")
+        self.assertTrue(command.isCacheable)
+        self.assertEqual(command.outputFiles[cache.outputListing], "build/main.lst")
+
+    def test_options_with_separate_argument(self):
+        command = parse("-x assembler-with-cpp -c -D USE_HAL_DRIVER -I Core/Inc startup.s -o build/startup.o")
+        self.assertTrue(command.isCacheable)
+        self.assertEqual(command.sourceFile, "startup.s")
+
+    def test_not_cacheable(self):
+        for commandLine in ["-E Core/Src/main.c",
+                            "-c -E Core/Src/main.c -o build/main.o",
+                            "-c -S Core/Src/main.c -o build/main.s",
+                            "-c -M Core/Src/main.c -o build/main.o",
+                            "build/main.o build/gpio.o -TSTM32F051K4Tx_FLASH.ld -o build/test.elf",  # link
+                            "-c Core/Src/main.c Core/Src/gpio.c -o build/main.o",  # more sources
+                            "-c Core/Src/main.c",  # no object file
+                            "-c Core/Src/main.c -o"]:  # missing argument
+            self.assertFalse(parse(commandLine).isCacheable, msg=commandLine)
+
+    def test_preprocessor_arguments(self):
+        command = parse("-c -mthumb -DUSE_HAL_DRIVER -ICore/Inc -MMD -MP -MF build/main.d -MT build/main.o "
+                        "-Wa,-a,-ad,-alms=build/main.lst Core/Src/main.c -o build/main.o")
+        self.assertEqual(command.getPreprocessorArguments(),
+                         [compilerPath, '-E', '-mthumb', '-DUSE_HAL_DRIVER', '-ICore/Inc', 'Core/Src/main.c'])
+
+        command = parse("-c -MMD -MFbuild/main.d -include build/main.h Core/Src/main.c -o build/main.o")
+        self.assertEqual(command.getPreprocessorArguments(),
+                         [compilerPath, '-E', '-include', 'build/main.h', 'Core/Src/main.c'])
+
+    def test_preprocessed_sources(self):
+        self.assertTrue(parse("-c Core/Src/main.c -o build/main.o").isPreprocessed())
+        self.assertTrue(parse("-x assembler-with-cpp -c startup.s -o build/startup.o").isPreprocessed())
+        self.assertFalse(parse("-c startup.s -o build/startup.o").isPreprocessed())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+'''
+Tests of 'ideScripts/dependencyDatabase.py' (GCC dependency file parsing).
+    python -m pytest tests
+    python -m unittest discover tests
+'''
+import os
+import sys
+import unittest
+
+repositoryPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repositoryPath, 'ideScripts'))
+
+import dependencyDatabase as deps  # noqa: E402
+
+
+class TestParseDependencyData(unittest.TestCase):
+    def test_continuation_lines(self):
+        for newLine in ["\n", "\r\n"]:
+            data = ("build/main.o: Core/Src/main.c Core/Inc/main.h \\" + newLine +
+                    " Drivers/CMSIS/Include/core_cm0.h" + newLine)
+            prerequisites = ["Core/Src/main.c", "Core/Inc/main.h", "Drivers/CMSIS/Include/core_cm0.h"]
+            self.assertEqual(deps.parseDependencyData(data), [["build/main.o"], prerequisites])
+
+    def test_phony_targets_are_ignored(self):
+        data = ("build/main.o: Core/Src/main.c Core/Inc/main.h \\\n"
+                " Core/Inc/gpio.h\n"
+                "\n"
+                "Core/Inc/main.h:\n"
+                "\n"
+                "Core/Inc/gpio.h:\n")
+        self.assertEqual(deps.parseDependencyData(data),
+                         [["build/main.o"], ["Core/Src/main.c", "Core/Inc/main.h", "Core/Inc/gpio.h"]])
+
+    def test_escaped_spaces(self):
+        data = "build/main.o: My\\ Project/Src/main.c My\\ Project/Inc/main.h\n"
+        self.assertEqual(deps.parseDependencyData(data),
+                         [["build/main.o"], ["My Project/Src/main.c", "My Project/Inc/main.h"]])
+
+    def test_windows_paths(self):
+        data = ("build/main.o: C:/Project/Src/main.c \\\r\n"
+                " C:/gcc/arm-none-eabi/include/stdint.h\r\n"
+                "\r\n"
+                "C:/gcc/arm-none-eabi/include/stdint.h:\r\n")
+        self.assertEqual(deps.parseDependencyData(data),
+                         [["build/main.o"], ["C:/Project/Src/main.c", "C:/gcc/arm-none-eabi/include/stdint.h"]])
+
+        self.assertEqual(deps.parseDependencyData("C:/Project/build/main.o: C:/Project/Src/main.c\n"),
+                         [["C:/Project/build/main.o"], ["C:/Project/Src/main.c"]])
+
+    def test_more_targets(self):
+        self.assertEqual(deps.parseDependencyData("build/main.o build/main.d: Core/Src/main.c\n"),
+                         [["build/main.o", "build/main.d"], ["Core/Src/main.c"]])
+
+    def test_invalid_data(self):
+        for data in ["", "\n", "build/main.o Core/Src/main.c\n", ": Core/Src/main.c\n"]:
+            self.assertEqual(deps.parseDependencyData(data), [[], []], msg=repr(data))
+
+
+class TestUnescapePath(unittest.TestCase):
+    def test_make_escapes(self):
+        self.assertEqual(deps.unescapePath("My\\ Project/main.c"), "My Project/main.c")
+        self.assertEqual(deps.unescapePath("Src\\#1/main.c"), "Src#1/main.c")
+        self.assertEqual(deps.unescapePath("Src$$/main.c"), "Src$/main.c")
+        self.assertEqual(deps.unescapePath("C:/Project/main.c"), "C:/Project/main.c")
+
+
+if __name__ == '__main__':
+    unittest.main()
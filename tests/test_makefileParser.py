@@ -0,0 +1,178 @@
+'''
+Tests of 'ideScripts/makefileParser.py' (Makefile evaluator, shell echo output and Makefile document).
+    python -m pytest tests
+    python -m unittest discover tests
+'''
+import os
+import sys
+import shutil
+import subprocess
+import unittest
+
+repositoryPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repositoryPath, 'ideScripts'))
+
+import makefileParser as mkfParser  # noqa: E402
+
+exampleMakefilePath = os.path.join(repositoryPath, 'example', 'STM32F051K4', 'Makefile')
+
+
+def evaluate(makefileText, commandLineVariables=None):
+    return mkfParser.MakefileEvaluator(makefileText.splitlines(True), commandLineVariables, environment={})
+
+
+class TestMakefileEvaluator(unittest.TestCase):
+    def test_assignments(self):
+        evaluator = evaluate("A = a\n"
+                             "B := $(A) b\n"
+                             "A += c\n"
+                             "C ?= first\n"
+                             "C ?= second\n"
+                             "D = $(A)\n")
+        self.assertEqual(evaluator.getVariable('B'), "a b")
+        self.assertEqual(evaluator.getVariable('D'), "a c")
+        self.assertEqual(evaluator.getVariable('C'), "first")
+        self.assertEqual(evaluator.getVariable('UNDEFINED'), "")
+
+    def test_command_line_variable_overrides_file(self):
+        evaluator = evaluate("GCC_PATH = /usr/bin\nCC = $(GCC_PATH)/gcc\n", {'GCC_PATH': '"/opt/gcc"'})
+        self.assertEqual(evaluator.getVariable('CC'), '"/opt/gcc"/gcc')
+
+    def test_continuation_lines_and_comments(self):
+        evaluator = evaluate("SOURCES = \\\n"
+                             "a.c \\\n"
+                             "b.c # comment\n"
+                             "HASH = x\\#y\n")
+        self.assertEqual(evaluator.getVariable('SOURCES').split(), ["a.c", "b.c"])
+        self.assertEqual(evaluator.getVariable('HASH'), "x#y")  # escaped '#' is not a comment
+
+    def test_conditionals(self):
+        evaluator = evaluate("DEBUG = 1\n"
+                             "ifeq ($(DEBUG), 1)\n"
+                             "CFLAGS = -g\n"
+                             "else\n"
+                             "CFLAGS = -O2\n"
+                             "endif\n"
+                             "ifdef UNDEFINED\n"
+                             "X = 1\n"
+                             "else ifndef DEBUG\n"
+                             "X = 2\n"
+                             "else\n"
+                             "X = 3\n"
+                             "endif\n")
+        self.assertEqual(evaluator.getVariable('CFLAGS'), "-g")
+        self.assertEqual(evaluator.getVariable('X'), "3")
+
+    def test_functions_and_substitution_references(self):
+        evaluator = evaluate("BUILD_DIR = build\n"
+                             "C_SOURCES = Core/Src/main.c Core/Src/gpio.c\n"
+                             "OBJECTS = $(addprefix $(BUILD_DIR)/,$(notdir $(C_SOURCES:.c=.o)))\n"
+                             "DIRS = $(sort $(dir $(C_SOURCES)))\n"
+                             "MAIN = $(filter %main.c,$(C_SOURCES))\n")
+        self.assertEqual(evaluator.getVariable('OBJECTS'), "build/main.o build/gpio.o")
+        self.assertEqual(evaluator.getVariable('DIRS'), "Core/Src/")
+        self.assertEqual(evaluator.getVariable('MAIN'), "Core/Src/main.c")
+
+    def test_automatic_variables(self):
+        evaluator = evaluate('CFLAGS = -MMD -MF"$(@:%.o=%.d)"\n')
+        self.assertEqual(evaluator.getVariable('CFLAGS', {'@': 'build/main.o'}), '-MMD -MF"build/main.d"')
+
+    def test_rules_and_recipes_are_skipped(self):
+        evaluator = evaluate("A = 1\n"
+                             "all: build/a.o\n"
+                             "\tA = 2\n"
+                             "B = $(A)\n")
+        self.assertEqual(evaluator.getVariable('B'), "1")
+
+    def test_unsupported_constructs(self):
+        for makefileText in ["include other.mk\n",
+                             "A = $(shell echo a)\n",
+                             "build/a.o: CFLAGS += -O2\n",
+                             "ifeq (a, a)\nA = 1\n"]:
+            with self.assertRaises(mkfParser.MakefileEvaluatorError, msg=makefileText):
+                evaluate(makefileText).getVariable('A')
+
+    def test_quotes_and_backslashes_are_kept(self):
+        evaluator = evaluate('C_DEFS = -DVER=\\"1.0\\" -DNAME="a"\n')
+        self.assertEqual(evaluator.getVariable('C_DEFS'), '-DVER=\\"1.0\\" -DNAME="a"')
+
+
+class TestShellEchoOutput(unittest.TestCase):
+    def test_plain_words(self):
+        self.assertEqual(mkfParser.getShellEchoOutput("  -mcpu=cortex-m0   -mthumb "), "-mcpu=cortex-m0 -mthumb")
+        self.assertEqual(mkfParser.getShellEchoOutput(""), "")
+
+    def test_escaped_quotes(self):
+        self.assertEqual(mkfParser.getShellEchoOutput('-DVER=\\"1.0\\"'), '-DVER="1.0"')
+
+    def test_quote_removal(self):
+        self.assertEqual(mkfParser.getShellEchoOutput('-MF"build/main.d"'), "-MFbuild/main.d")
+        self.assertEqual(mkfParser.getShellEchoOutput("-DNAME='\"a b\"'"), '-DNAME="a b"')
+        self.assertEqual(mkfParser.getShellEchoOutput('"a  b"'), "a  b")
+
+    def test_backslashes(self):
+        self.assertEqual(mkfParser.getShellEchoOutput('path\\ with\\ spaces'), "path with spaces")
+        self.assertEqual(mkfParser.getShellEchoOutput("'C:\\gcc'"), "C:\\gcc")  # literal in single quotes
+        self.assertEqual(mkfParser.getShellEchoOutput('"C:\\gcc \\\\ \\""'), 'C:\\gcc \\ "')
+
+    def test_shell_syntax_is_not_evaluated(self):
+        for text in ['-DX=$HOME', '"$(pwd)"', '`pwd`', '*.c', 'a;b', '#comment', '~/gcc', '"unbalanced', 'trailing\\']:
+            with self.assertRaises(mkfParser.MakefileEvaluatorError, msg=text):
+                mkfParser.getShellEchoOutput(text)
+
+        self.assertEqual(mkfParser.getShellEchoOutput("'$HOME' a#b"), "$HOME a#b")
+
+
+@unittest.skipUnless(shutil.which('make'), "'make' is not available")
+class TestEvaluatorMatchesMake(unittest.TestCase):
+    def getMakeOutput(self, makefileText, variableName):
+        makefileText += "print-%:\n\t@echo VARIABLE=$($*)\n"
+        process = subprocess.run(['make', '-f', '-', 'print-' + variableName], input=makefileText.encode('utf-8'),
+                                 stdout=subprocess.PIPE, check=True)
+        return process.stdout.decode('utf-8').rstrip('\n')[len("VARIABLE="):]
+
+    def assertSameAsMake(self, makefileText, variableName):
+        evaluator = evaluate(makefileText)
+        automaticVariables = {'@': 'print-' + variableName, '*': variableName}
+        value = mkfParser.getShellEchoOutput(evaluator.getVariable(variableName, automaticVariables))
+        self.assertEqual(value, self.getMakeOutput(makefileText, variableName))
+
+    def test_quoted_defines(self):
+        self.assertSameAsMake('C_DEFS = -DVER=\\"1.0\\" -DNAME=\'"a"\' -MF"$(@:%.o=%.d)"\n', 'C_DEFS')
+
+    def test_example_makefile(self):
+        with open(exampleMakefilePath, 'r') as makefile:
+            makefileText = makefile.read()
+        for variableName in ['C_SOURCES', 'C_DEFS', 'C_INCLUDES', 'CFLAGS', 'LDFLAGS']:
+            self.assertSameAsMake(makefileText, variableName)
+
+
+class TestMakefileDocument(unittest.TestCase):
+    makefileText = ("# header\n"
+                    "######################################\n"
+                    "# target\n"
+                    "######################################\n"
+                    "TARGET = test\n"
+                    "C_SOURCES =  \\\n"
+                    "Core/Src/main.c \\\n"
+                    "Core/Src/gpio.c\n"
+                    "LIBS = -lc\n")
+
+    def test_variable_items(self):
+        document = mkfParser.MakefileDocument(self.makefileText.splitlines(True))
+        self.assertEqual(document.getVariableItems('C_SOURCES'), ["Core/Src/main.c", "Core/Src/gpio.c"])
+        self.assertEqual(document.getVariableItems('TARGET'), ["test"])
+        self.assertFalse(document.hasVariable('C_DEFS'))
+
+    def test_append_to_variable(self):
+        document = mkfParser.MakefileDocument(self.makefileText.splitlines(True))
+        document.appendToVariable('C_SOURCES', ["user.c"])
+        document.appendToVariable('LIBS', ["-lm", "-lnosys"])
+
+        evaluator = mkfParser.MakefileEvaluator(document.getLines(), environment={})
+        self.assertEqual(evaluator.getVariable('C_SOURCES').split(), ["user.c", "Core/Src/main.c", "Core/Src/gpio.c"])
+        self.assertEqual(evaluator.getVariable('LIBS').split(), ["-lc", "-lm", "-lnosys"])
+
+
+if __name__ == '__main__':
+    unittest.main()